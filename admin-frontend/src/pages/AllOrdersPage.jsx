@@ -5,6 +5,9 @@ import styles from './AllOrdersPage.module.css';
 const AllOrdersPage = () => {
     const [orders, setOrders] = useState([]);
     const [loading, setLoading] = useState(true);
+    // URL of the next page of results (null when there are no more)
+    const [nextUrl, setNextUrl] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     
     // State for all filters
     const [startDate, setStartDate] = useState('');
@@ -28,11 +31,27 @@ const AllOrdersPage = () => {
         const url = `/orders/all/?${queryString}`;
 
         apiClient.get(url)
-          .then(res => setOrders(res.data))
+          .then(res => {
+            setOrders(res.data.results);
+            setNextUrl(res.data.next);
+          })
           .catch(() => alert('Failed to load orders'))
           .finally(() => setLoading(false));
     };
 
+    // The server pages by cursor, so "Load more" just follows the `next` link
+    const handleLoadMore = () => {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        apiClient.get(nextUrl)
+          .then(res => {
+            setOrders(prev => [...prev, ...res.data.results]);
+            setNextUrl(res.data.next);
+          })
+          .catch(() => alert('Failed to load more orders'))
+          .finally(() => setLoadingMore(false));
+    };
+
     // Fetch orders only on the initial component mount
     useEffect(() => {
         fetchOrders();
@@ -168,6 +187,14 @@ const AllOrdersPage = () => {
                     </tbody>
                 </table>
             </div>
+
+            {!loading && nextUrl && (
+                <div className={styles.loadMore}>
+                    <button className={styles.filterButton} onClick={handleLoadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
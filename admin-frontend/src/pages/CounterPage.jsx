@@ -3,6 +3,7 @@ import apiClient from '../api/axiosConfig';
 import styles from '../Pages/CounterPage.module.css';
 import { FiPlus, FiMinus, FiSearch, FiX } from 'react-icons/fi';
 import PrintableBill from '../components/PrintableBill';
+import { useIdempotencyKey } from '../hooks/useIdempotencyKey';
 
 // Re-introduced for UI preview purposes. The backend remains the source of truth for the final bill.
 const TAX_RATE = 0.05;
@@ -51,6 +52,7 @@ const PaymentPromptModal = ({ isOpen, onClose, onFinalizePayment }) => {
 
 
 const CounterPage = () => {
+    const idempotency = useIdempotencyKey();
     const [posDishes, setPosDishes] = useState([]);
     const [cart, setCart] = useState([]);
     const [loading, setLoading] = useState(true);
@@ -217,7 +219,10 @@ const CounterPage = () => {
         };
 
         try {
-            const resp = await apiClient.post('/orders/create-and-pay/', orderData);
+            const resp = await apiClient.post('/orders/create-and-pay/', orderData, {
+                headers: { 'Idempotency-Key': idempotency.keyFor(orderData) },
+            });
+            idempotency.reset();
             const amount = resp.data.total_amount || 0;
             alert(`Payment confirmed for ₹${parseFloat(amount).toFixed(2)}!`);
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import apiClient from '../api/axiosConfig';
 import useWebSocket, { ReadyState } from 'react-use-websocket';
 import './KitchenDashboard.css';
@@ -65,12 +65,18 @@ const KitchenDashboard = () => {
   const [wsConnected, setWsConnected] = useState(true);
 
   const socketUrl = 'ws://127.0.0.1:8000/ws/orders/';
-  const { lastMessage } = useWebSocket(socketUrl, {
+  const { lastMessage, sendJsonMessage } = useWebSocket(socketUrl, {
     onOpen: () => setWsConnected(true),
     onClose: () => setWsConnected(false),
     shouldReconnect: () => true
   });
 
+  // Mirror of `orders` so incoming patches can be checked against the current versions.
+  const ordersRef = useRef([]);
+  useEffect(() => {
+    ordersRef.current = orders;
+  }, [orders]);
+
   const fetchOrders = useCallback(async () => {
     try {
       const response = await apiClient.get('/orders/kitchen-display/');
@@ -94,29 +100,47 @@ const KitchenDashboard = () => {
   }, [wsConnected, fetchOrders]);
 
   useEffect(() => {
-    if (lastMessage !== null) {
-      const data = JSON.parse(lastMessage.data);
-      if (data.type === 'order_update') {
-        const updatedOrder = data.order;
-        setOrders(prevOrders => {
-          const existingOrderIndex = prevOrders.findIndex(order => order.id === updatedOrder.id);
-          let newOrders = [...prevOrders];
-          if (['Pending', 'Preparing', 'Ready'].includes(updatedOrder.status)) {
-            if (existingOrderIndex !== -1) {
-              newOrders[existingOrderIndex] = updatedOrder;
-            } else {
-              newOrders.push(updatedOrder);
-            }
+    if (lastMessage === null) return;
+    const data = JSON.parse(lastMessage.data);
+    const activeStatuses = ['Pending', 'Preparing', 'Ready'];
+    const byCreatedAt = (a, b) => new Date(a.created_at) - new Date(b.created_at);
+
+    const upsertOrder = (updatedOrder) => {
+      setOrders(prevOrders => {
+        const existingOrderIndex = prevOrders.findIndex(order => order.id === updatedOrder.id);
+        let newOrders = [...prevOrders];
+        if (activeStatuses.includes(updatedOrder.status)) {
+          if (existingOrderIndex !== -1) {
+            newOrders[existingOrderIndex] = updatedOrder;
           } else {
-            if (existingOrderIndex !== -1) {
-              newOrders.splice(existingOrderIndex, 1);
-            }
+            newOrders.push(updatedOrder);
+          }
+        } else {
+          if (existingOrderIndex !== -1) {
+            newOrders.splice(existingOrderIndex, 1);
           }
-          return newOrders.sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
-        });
+        }
+        return newOrders.sort(byCreatedAt);
+      });
+    };
+
+    if (data.type === 'snapshot') {
+      // Full state, sent on connect and whenever we ask for it.
+      setOrders([...data.orders].sort(byCreatedAt));
+      setLoading(false);
+    } else if (data.type === 'order_update') {
+      upsertOrder(data.order);
+    } else if (data.type === 'order_patch') {
+      // Only the changed fields; apply them if we hold the version they are based on.
+      const current = ordersRef.current.find(order => order.id === data.order_id);
+      if (current && current.version === data.base_version) {
+        upsertOrder({ ...current, ...data.changes, version: data.version });
+      } else if (current || activeStatuses.includes(data.changes.status)) {
+        // We missed an update (or never had this order): resync from a snapshot.
+        sendJsonMessage({ type: 'request_snapshot' });
       }
     }
-  }, [lastMessage]);
+  }, [lastMessage, sendJsonMessage]);
 
   const updateOrderStatus = async (orderId, newStatus) => {
     try {
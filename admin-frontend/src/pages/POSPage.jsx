@@ -2,8 +2,10 @@ import React, { useState, useEffect } from 'react';
 import apiClient from '../api/axiosConfig';
 import styles from './POSPage.module.css';
 import { FiXCircle } from 'react-icons/fi';
+import { useIdempotencyKey } from '../hooks/useIdempotencyKey';
 
 const POSPage = () => {
+    const idempotency = useIdempotencyKey();
     const [tables, setTables] = useState([]);
     const [menu, setMenu] = useState([]);
     const [categories, setCategories] = useState([]);
@@ -76,7 +78,10 @@ const POSPage = () => {
 
         try {
             // --- FIX: Use the correct URL for staff-placed POS orders ---
-            await apiClient.post('/orders/pos-place/', orderData);
+            await apiClient.post('/orders/pos-place/', orderData, {
+                headers: { 'Idempotency-Key': idempotency.keyFor(orderData) },
+            });
+            idempotency.reset();
             alert(`Order placed successfully for Table ${selectedTable.table_number}!`);
             setCurrentOrder([]);
             setSelectedTable(null);
@@ -0,0 +1,103 @@
+# accounts/async_api.py
+"""
+Helpers for the native async read views (the async_views.py modules of the
+orders, billing and menu apps).
+
+DRF's APIView only runs sync code, so those views are plain Django coroutines.
+`async_api_view` gives them what @api_view/@permission_classes give the sync
+views: the same JWT authentication (the user is fetched with the async ORM),
+the same 401/405 error bodies and the same JSON rendering.
+"""
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with an awaitable authenticate()."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        # Same checks as JWTAuthentication.get_user().
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise exceptions.AuthenticationFailed(
+                    "The user's password has been changed.", code="password_changed"
+                )
+        return user
+
+
+authentication = AsyncJWTAuthentication()
+
+
+def json_response(data, status=200, headers=None):
+    """Renders `data` exactly like DRF's JSONRenderer does."""
+    return JsonResponse(
+        data, status=status, headers=headers, safe=False, encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':'), 'allow_nan': False},
+    )
+
+
+def _error(exc, request):
+    headers = None
+    if isinstance(exc, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)):
+        headers = {'WWW-Authenticate': authentication.authenticate_header(request)}
+    data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+    return json_response(data, status=exc.status_code, headers=headers)
+
+
+def async_api_view(methods=('GET',), login_required=True):
+    """
+    Wraps an async view: answers 405 for other methods and authenticates the
+    bearer token into request.user. With login_required=False anonymous
+    requests are let through (like IsAuthenticatedOrReadOnly on a GET), but
+    a bad token is still rejected.
+    """
+    allowed = set(methods)
+    if 'GET' in allowed:
+        allowed.add('HEAD')
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in allowed:
+                    raise exceptions.MethodNotAllowed(request.method)
+                user = await authentication.aauthenticate(request)
+                if user is None and login_required:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as exc:
+                return _error(exc, request)
+            request.user = user or AnonymousUser()
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
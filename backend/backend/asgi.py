@@ -1,15 +1,17 @@
 # backend/asgi.py
 
+import asyncio
 import os
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import orders.routing # We will create this file next
+from orders import broadcast
 
 
 
-application = ProtocolTypeRouter({
+router = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
         URLRouter(
@@ -17,3 +19,9 @@ application = ProtocolTypeRouter({
         )
     ),
 })
+
+
+async def application(scope, receive, send):
+    # The broadcast sends have to run on this loop (see orders.broadcast).
+    broadcast.use_event_loop(asyncio.get_running_loop())
+    return await router(scope, receive, send)
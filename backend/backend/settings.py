@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
     'billing',
     'accounts',
     'inventory',
+    'reports',
     
 ]
 MEDIA_URL = '/media/'
@@ -79,12 +81,53 @@ CHANNEL_LAYERS = {
     }
 }
 
+# In-memory board of active orders served to the kitchen/staff screens (orders/live_board.py).
+# Every LIVE_BOARD_CHECK_INTERVAL seconds a read checks it against the database
+# (changes made by other worker processes) and reloads it if it is behind; it
+# is reloaded regardless after LIVE_BOARD_MAX_AGE seconds.
+LIVE_BOARD_ENABLED = True
+LIVE_BOARD_CHECK_INTERVAL = 1
+LIVE_BOARD_MAX_AGE = 300
+
+# Idempotency-Key handling for the order-placing endpoints (orders/idempotency.py):
+# how long a successful response is replayed, how long a duplicate waits
+# for the first attempt to finish, and after how long an attempt that never
+# finished (its worker died) stops holding the key. Keys are stored in the
+# database; `manage.py purge_idempotency_keys` clears the expired ones.
+IDEMPOTENCY_KEY_TTL = 60 * 60
+IDEMPOTENCY_WAIT_TIMEOUT = 30
+IDEMPOTENCY_CLAIM_TIMEOUT = 5 * 60
+
+# Serve the most polled read endpoints (dish list, kitchen display, order
+# status, customer bills) from native async views instead of the DRF ones.
+ASYNC_READ_VIEWS = True
+
+# Write-batching of new orders for the rush (orders/ingestion.py). When on, placed
+# orders are written by one writer thread in groups of up to
+# ORDER_INGESTION_MAX_BATCH, one transaction per group; it waits at most
+# ORDER_INGESTION_MAX_WAIT seconds for a group to fill. A request gives up
+# (503) if its order is still queued after ORDER_INGESTION_TIMEOUT seconds.
+ORDER_INGESTION_BATCHING = False
+ORDER_INGESTION_MAX_BATCH = 20
+ORDER_INGESTION_MAX_WAIT = 0.005
+ORDER_INGESTION_TIMEOUT = 30
+
+# Active discounts are cached per process by code (discounts/cache.py); saves
+# and deletes clear the cache, and it is reloaded after this many seconds.
+DISCOUNT_CACHE_MAX_AGE = 60
+
+# `manage.py archive_closed_orders` moves paid bills older than this many
+# business days, with their orders, into the archive tables (orders/archive.py).
+ARCHIVE_AFTER_DAYS = 90
+
 ROOT_URLCONF = 'backend.urls'
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5174",      # Your admin frontend
     "http://localhost:5173",      # Your customer frontend
     "https://your-live-website.com", # Your future production URL
 ]
+# Let browsers send the Idempotency-Key header on order POSTs.
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 TEMPLATES = [
     {
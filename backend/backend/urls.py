@@ -36,6 +36,7 @@ urlpatterns = [
     path('api/accounts/', include('accounts.urls')),
     path('api/inventory/', include('inventory.urls')),
     path('api/discounts/', include('discounts.urls')), 
+    path('api/reports/', include('reports.urls')),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Bill
+from .models import Bill, ArchivedBill
 
 @admin.register(Bill)
 class BillAdmin(admin.ModelAdmin):
@@ -11,4 +11,9 @@ class BillAdmin(admin.ModelAdmin):
     readonly_fields = ('final_amount', 'created_at', 'paid_at')
 
     # You can add other fields to search_fields or fieldsets as needed
-    search_fields = ('table__table_number',)
\ No newline at end of file
+    search_fields = ('table__table_number',)
+
+@admin.register(ArchivedBill)
+class ArchivedBillAdmin(admin.ModelAdmin):
+    list_display = ('id', 'table', 'final_amount', 'paid_at')
+    search_fields = ('table__table_number',)
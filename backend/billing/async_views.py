@@ -0,0 +1,41 @@
+# billing/async_views.py
+"""
+Async versions of the customer bill endpoints, mounted instead of the sync
+views in billing/urls.py while settings.ASYNC_READ_VIEWS is on.
+"""
+from rest_framework import status
+
+from accounts.async_api import async_api_view, json_response
+from customers.models import Customer
+from .models import Bill
+from .serializers import BillSerializer
+
+
+@async_api_view()
+async def get_bill_details(request, bill_id):
+    try:
+        bill = await BillSerializer.setup_eager_loading(Bill.objects.all()).aget(id=bill_id)
+        customer = await Customer.objects.aget(phone_number=request.user.username)
+    except (Bill.DoesNotExist, Customer.DoesNotExist):
+        bill = customer = None
+
+    if bill is None or not any(order.customer_id == customer.id for order in bill.orders.all()):
+        return json_response(
+            {'error': 'Bill not found or you do not have permission.'}, status=status.HTTP_404_NOT_FOUND
+        )
+    return json_response(BillSerializer(bill).data)
+
+
+@async_api_view()
+async def customer_unpaid_bills(request):
+    try:
+        customer = await Customer.objects.aget(phone_number=request.user.username)
+    except Customer.DoesNotExist:
+        return json_response({'error': 'Customer profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    unpaid_bills = BillSerializer.setup_eager_loading(Bill.objects.filter(
+        orders__customer=customer,
+        is_paid=False
+    ).distinct().order_by('-created_at'))
+    unpaid_bills = [bill async for bill in unpaid_bills]
+    return json_response(BillSerializer(unpaid_bills, many=True).data)
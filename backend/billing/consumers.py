@@ -15,5 +15,7 @@ class BillingConsumer(AsyncWebsocketConsumer):
     async def bill_update(self, event):
         await self.send(text_data=json.dumps({
             'type': 'bill_update',
-            'message': event['message']
+            'message': event['message'],
+            'bill': event.get('bill'),
+            'bill_ids': event.get('bill_ids'),
         }))
\ No newline at end of file
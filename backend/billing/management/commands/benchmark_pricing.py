@@ -0,0 +1,136 @@
+# billing/management/commands/benchmark_pricing.py
+
+import random
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from billing import pricing
+
+DISCOUNTS = [
+    None,
+    SimpleNamespace(discount_type='PERCENTAGE', value=Decimal('10.00'), minimum_bill_amount=Decimal('0.00')),
+    SimpleNamespace(discount_type='PERCENTAGE', value=Decimal('12.50'), minimum_bill_amount=Decimal('300.00')),
+    SimpleNamespace(discount_type='FIXED', value=Decimal('75.00'), minimum_bill_amount=Decimal('500.00')),
+]
+
+
+def decimal_totals(subtotal, discount_amount, coin_discount):
+    """Bill.recalculate_and_save()'s old tax and final amount, from Decimal totals."""
+    discounted_subtotal = max(Decimal('0.00'), subtotal - (discount_amount + coin_discount))
+    tax_amount = discounted_subtotal * Decimal('0.05')
+    final_amount = discounted_subtotal + tax_amount
+    return (
+        tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+        final_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+    )
+
+
+def pricing_totals(subtotal, discount_amount, coin_discount):
+    """What Bill.derive_totals() does now."""
+    price = pricing.price_bill(
+        pricing.to_paise(subtotal), pricing.to_paise(discount_amount), pricing.to_paise(coin_discount)
+    )
+    return pricing.to_rupees(price.tax), pricing.to_rupees(price.final)
+
+
+def decimal_price(lines, discount, coins):
+    """The Decimal arithmetic the views and Bill.recalculate_and_save used before billing.pricing."""
+    subtotal = sum((price * quantity for price, quantity in lines), Decimal('0.00'))
+    discount_amount = Decimal('0.00')
+    if discount is not None:
+        if subtotal < discount.minimum_bill_amount:
+            raise pricing.DiscountNotApplicable()
+        if discount.discount_type == 'PERCENTAGE':
+            discount_amount = (subtotal * discount.value) / Decimal('100')
+        else:
+            discount_amount = discount.value
+        discount_amount = min(subtotal, discount_amount)
+    coin_discount = Decimal(coins) * Decimal('0.10')
+
+    total_discount = discount_amount + coin_discount
+    discounted_subtotal = max(Decimal('0.00'), subtotal - total_discount)
+    tax_amount = discounted_subtotal * Decimal('0.05')
+    final_amount = discounted_subtotal + tax_amount
+    return (
+        subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+        tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+        final_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of bill pricing: the old Decimal arithmetic against "
+        "billing.pricing, one cart at a time and with the price_bills() batch API, "
+        "on randomly generated carts. Reports bills/sec and how many results differ. "
+        "Touches no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bills', type=int, default=100000, help="Carts to price per run.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for the carts.")
+
+    def handle(self, *args, **options):
+        carts = self.carts(options['bills'], random.Random(options['seed']))
+
+        decimal_results, decimal_rate = self.time(lambda: [self.try_price(decimal_price, cart) for cart in carts], carts)
+        cart_results, cart_rate = self.time(lambda: [self.try_price(self.pricing_price, cart) for cart in carts], carts)
+
+        # The batch API prices bills whose subtotal and discounts are already known.
+        rows = [
+            (price.subtotal, price.discount, price.coin_discount)
+            for price in (self.try_price(pricing.price_cart, cart) for cart in carts)
+            if price is not None
+        ]
+        _, batch_rate = self.time(lambda: pricing.price_bills(rows), rows)
+        _, single_rate = self.time(lambda: [pricing.price_bill(*row) for row in rows], rows)
+
+        # A stored bill's tax and final amount from its Decimal columns, as the model does it.
+        stored = [tuple(pricing.to_rupees(paise) for paise in row) for row in rows]
+        old_totals, old_totals_rate = self.time(lambda: [decimal_totals(*row) for row in stored], stored)
+        new_totals, new_totals_rate = self.time(lambda: [pricing_totals(*row) for row in stored], stored)
+        if old_totals != new_totals:
+            self.stdout.write(self.style.WARNING("The stored-bill totals differ between the two paths."))
+
+        differ = sum(1 for old, new in zip(decimal_results, cart_results) if old != new)
+        self.stdout.write(
+            f"{len(carts)} carts.\n\n"
+            f"{'path':<34} {'bills/s':>12}\n"
+            f"{'cart, Decimal (old views)':<34} {decimal_rate:>12,.0f}\n"
+            f"{'cart, pricing.price_cart':<34} {cart_rate:>12,.0f}\n"
+            f"{'stored bill, Decimal (old model)':<34} {old_totals_rate:>12,.0f}\n"
+            f"{'stored bill, Bill.derive_totals':<34} {new_totals_rate:>12,.0f}\n"
+            f"{'paise, pricing.price_bill':<34} {single_rate:>12,.0f}\n"
+            f"{'paise, pricing.price_bills':<34} {batch_rate:>12,.0f}\n\n"
+            f"{differ} cart(s) priced differently: a percentage discount that comes to a fraction "
+            f"of a paisa is now rounded to the paisa before tax, instead of carrying the fraction."
+        )
+
+    def carts(self, count, rng):
+        prices = [Decimal(rng.randrange(4000, 60000, 50)) / 100 for _ in range(60)]
+        return [
+            (
+                [(rng.choice(prices), rng.randint(1, 4)) for _ in range(rng.randint(1, 8))],
+                rng.choice(DISCOUNTS),
+                rng.choice([0, 0, 0, 50, 120, 300]),
+            )
+            for _ in range(count)
+        ]
+
+    def pricing_price(self, lines, discount, coins):
+        price = pricing.price_cart(lines, discount, coins)
+        return tuple(pricing.to_rupees(paise) for paise in (price.subtotal, price.tax, price.final))
+
+    def try_price(self, function, cart):
+        try:
+            return function(*cart)
+        except pricing.DiscountNotApplicable:
+            return None
+
+    def time(self, run, items):
+        started = time.perf_counter()
+        result = run()
+        return result, len(items) / (time.perf_counter() - started)
@@ -0,0 +1,55 @@
+# billing/management/commands/verify_bill_totals.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q, Sum
+
+from billing import pricing
+from billing.models import Bill
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the running totals of the open (unpaid) bills against a full "
+        "re-aggregation of their orders and lists the bills that drifted. "
+        "With --repair the drifted bills are recalculated and saved. "
+        "Paid bills are settled and are not checked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Recalculate and save the bills that drifted.")
+
+    def handle(self, *args, **options):
+        # Every open bill re-added in one grouped query.
+        bills = list(Bill.objects.filter(is_paid=False).annotate(
+            aggregated=Sum(
+                F('orders__items__quantity') * F('orders__items__dish__price'),
+                filter=~Q(orders__status='Cancelled'),
+            )
+        ).order_by('id'))
+        # ...and priced in one batch.
+        prices = pricing.price_bills(
+            (pricing.to_paise(bill.aggregated or 0), pricing.to_paise(bill.discount_amount), pricing.to_paise(bill.coin_discount))
+            for bill in bills
+        )
+        drifted = []
+        for bill, price in zip(bills, prices):
+            stored = tuple(pricing.to_paise(amount) for amount in (bill.subtotal, bill.tax_amount, bill.final_amount))
+            if (price.subtotal, price.tax, price.final) != stored:
+                drifted.append(bill)
+                self.stdout.write(
+                    f"Bill #{bill.id}: stored subtotal {bill.subtotal} / final {bill.final_amount}, "
+                    f"orders add up to {pricing.to_rupees(price.subtotal)} / final {pricing.to_rupees(price.final)}"
+                )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"All {len(bills)} open bill(s) add up."))
+            return
+        if not options['repair']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drifted)} of {len(bills)} open bill(s) drifted; run again with --repair to fix them."
+            ))
+            return
+
+        for bill in drifted:
+            Bill.objects.get(pk=bill.pk).recalculate_and_save()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} of {len(bills)} open bill(s)."))
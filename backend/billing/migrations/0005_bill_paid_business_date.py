@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+from orders.business_day import business_date
+
+
+def backfill_paid_business_date(apps, schema_editor):
+    Bill = apps.get_model('billing', 'Bill')
+    paid_bills = Bill.objects.filter(paid_at__isnull=False).only('id', 'paid_at')
+    for bill in paid_bills.iterator():
+        bill.paid_business_date = business_date(bill.paid_at)
+        bill.save(update_fields=['paid_business_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_bill_final_amount'),
+        ('discounts', '0003_discount_minimum_bill_amount'),
+        ('tables', '0002_rename_number_table_table_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='paid_business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_paid_business_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['is_paid', 'paid_business_date'], name='bill_paid_bday_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:52
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_bill_paid_business_date'),
+        ('discounts', '0003_discount_minimum_bill_amount'),
+        ('tables', '0002_rename_number_table_table_number_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBill',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('coins_redeemed', models.PositiveIntegerField(default=0)),
+                ('coin_discount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('discount_request_pending', models.BooleanField(default=False)),
+                ('final_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('paid_business_date', models.DateField(blank=True, null=True)),
+                ('applied_discount', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='discounts.discount')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tables.table')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_paid', 'paid_business_date'], name='archived_bill_paid_bday_idx')],
+            },
+        ),
+    ]
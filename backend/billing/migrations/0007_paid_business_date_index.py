@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_archivedbill'),
+        ('discounts', '0004_discount_normalized_code'),
+        ('tables', '0002_rename_number_table_table_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedbill',
+            index=models.Index(fields=['paid_business_date'], name='archived_bill_bday_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['paid_business_date'], name='bill_bday_idx'),
+        ),
+    ]
@@ -2,7 +2,11 @@ from django.db import models
 from tables.models import Table
 from discounts.models import Discount
 from decimal import Decimal,InvalidOperation,ROUND_HALF_UP
-from django.db.models import Sum, F 
+from django.db import transaction
+from django.db.models import Sum, F
+from orders.business_day import business_date
+from . import pricing
+
 class Bill(models.Model):
     table = models.ForeignKey(Table, on_delete=models.CASCADE)
     
@@ -35,33 +39,121 @@ class Bill(models.Model):
     is_paid = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
-    def recalculate_and_save(self):
-        print(f"\n--- Recalculating Bill ID: {self.id} ---")
-        
-        # Let's check how many orders are linked to this bill AT THIS MOMENT
-        order_count = self.orders.count()
-        print(f"Found {order_count} orders linked to this bill.")
+    # The business day of paid_at (5 AM cutoff), kept in step by save().
+    paid_business_date = models.DateField(null=True, blank=True, editable=False)
 
-        subtotal_agg = self.orders.aggregate(
-            total=Sum(F('items__quantity') * F('items__dish__price'))
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_paid', 'paid_business_date'], name='bill_paid_bday_idx'),
+            # One day's payments (the Z-report). SQLite cannot seek the index
+            # above on `is_paid` as Django writes it (a bare column, not `= 1`).
+            models.Index(fields=['paid_business_date'], name='bill_bday_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.paid_business_date = business_date(self.paid_at) if self.paid_at else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'paid_at' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'paid_business_date'}
+        super().save(*args, **kwargs)
+
+    def derive_totals(self):
+        """
+        Re-derives tax_amount and final_amount from the running subtotal, the
+        discount and the coin discount. No queries.
+        """
+        price = pricing.price_bill(
+            pricing.to_paise(self.subtotal),
+            pricing.to_paise(self.discount_amount or 0),
+            pricing.to_paise(self.coin_discount or 0),
         )
-        subtotal = subtotal_agg['total'] or Decimal('0.00')
-        print(f"Calculated Subtotal: {subtotal}")
-
-        # ... (rest of the calculation logic is fine)
-        total_discount = (self.discount_amount or Decimal('0.00')) + (self.coin_discount or Decimal('0.00'))
-        discounted_subtotal = max(Decimal('0.00'), subtotal - total_discount)
-        TAX_RATE = Decimal('0.05')
-        tax_amount = discounted_subtotal * TAX_RATE
-        final_amount = discounted_subtotal + tax_amount
-        
-        self.subtotal = subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        self.tax_amount = tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        self.final_amount = final_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        
-        print(f"Final Amount to be saved: {self.final_amount}")
-        print("--- Finished Recalculating ---\n")
-        
+        self.tax_amount = pricing.to_rupees(price.tax)
+        self.final_amount = pricing.to_rupees(price.final)
+
+    def save_totals(self, *fields, discount=None):
+        """
+        Saves `fields` (e.g. coins just applied) together with the re-derived
+        totals. The subtotal is re-read under a row lock first, in case an
+        order was added to the bill since it was loaded.
+
+        With `discount`, the discount is applied too, its amount worked out
+        from that locked subtotal. Raises pricing.DiscountNotApplicable
+        (nothing is saved) if the bill is below the discount's minimum.
+        """
+        with transaction.atomic():
+            self.subtotal = Bill.objects.select_for_update().values_list('subtotal', flat=True).get(pk=self.pk)
+            if discount is not None:
+                self.discount_amount = pricing.to_rupees(pricing.discount_paise(discount, pricing.to_paise(self.subtotal)))
+                self.applied_discount = discount
+                fields = {*fields, 'applied_discount', 'discount_amount'}
+            self.derive_totals()
+            self.save(update_fields=[*fields, 'tax_amount', 'final_amount'])
+
+    def add_to_subtotal(self, amount):
+        """
+        Moves the running subtotal by `amount` (an order was linked to the
+        bill, moved off it, cancelled or restored) and re-derives the rest.
+        The change is an F() update, so concurrent orders add up.
+        """
+        if not amount:
+            return
+        with transaction.atomic():
+            Bill.objects.filter(pk=self.pk).update(subtotal=F('subtotal') + amount)
+            self.refresh_from_db(fields=['subtotal', 'discount_amount', 'coin_discount'])
+            self.derive_totals()
+            self.save(update_fields=['tax_amount', 'final_amount'])
+
+    def aggregate_subtotal(self):
+        """The subtotal re-added from scratch: every item of every order on the bill that is not cancelled."""
+        subtotal = self.orders.exclude(status='Cancelled').aggregate(
+            total=Sum(F('items__quantity') * F('items__dish__price'))
+        )['total'] or Decimal('0.00')
+        return pricing.to_rupees(pricing.to_paise(subtotal))
+
+    def recalculate_and_save(self):
+        """
+        The verify/repair path: re-aggregates the subtotal from the orders
+        instead of trusting the running total, re-derives the rest and saves.
+        Returns how far the stored subtotal was off (0 when it was right).
+        `manage.py verify_bill_totals` runs this for drifted bills.
+        """
+        subtotal = self.aggregate_subtotal()
+        drift = subtotal - self.subtotal
+        self.subtotal = subtotal
+        self.derive_totals()
         self.save()
+        return drift
+
+    def __str__(self):
+        return f"Bill for {self.table} - {'Paid' if self.is_paid else 'Unpaid'}"
+
+
+class ArchivedBill(models.Model):
+    """
+    A paid bill moved out of Bill by `manage.py archive_closed_orders`, with
+    the same columns and its original id. Its orders are ArchivedOrder rows.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    table = models.ForeignKey(Table, on_delete=models.CASCADE)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    coins_redeemed = models.PositiveIntegerField(default=0)
+    coin_discount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    applied_discount = models.ForeignKey(Discount, on_delete=models.SET_NULL, null=True, blank=True)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    discount_request_pending = models.BooleanField(default=False)
+    final_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    is_paid = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    paid_at = models.DateTimeField(null=True, blank=True)
+    paid_business_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_paid', 'paid_business_date'], name='archived_bill_paid_bday_idx'),
+            models.Index(fields=['paid_business_date'], name='archived_bill_bday_idx'),
+        ]
+
     def __str__(self):
-        return f"Bill for {self.table} - {'Paid' if self.is_paid else 'Unpaid'}"
\ No newline at end of file
+        return f"Archived bill #{self.id} for {self.table}"
+
@@ -0,0 +1,121 @@
+# billing/pricing.py
+"""
+The one place bill amounts are worked out.
+
+Everything is done in integer paise (1 rupee = 100 paise), so the rules are
+exact and the rounding is explicit:
+
+* a percentage discount is rounded half up to the paisa, and never exceeds
+  the subtotal; a fixed discount is capped at the subtotal;
+* a discount only applies once the subtotal reaches its minimum bill amount
+  (DiscountNotApplicable otherwise);
+* each loyalty coin is worth COIN_VALUE_PAISE;
+* tax is TAX_RATE_BP basis points of the subtotal after the discounts,
+  rounded half up to the paisa; the final amount is that plus the tax;
+* a paid bill earns one coin per full EARN_PAISE_PER_COIN of its final amount.
+
+The functions here take and return plain values; nothing touches the
+database. Views and models convert at the edges with to_paise() and
+to_rupees(). price_bills() prices many bills in one call, for reports and
+re-pricing.
+"""
+from collections import namedtuple
+from itertools import starmap
+from decimal import ROUND_HALF_UP, Decimal
+
+TAX_RATE_BP = 500          # 5% GST, in basis points
+COIN_VALUE_PAISE = 10      # one loyalty coin = ₹0.10
+EARN_PAISE_PER_COIN = 1000  # one coin earned per ₹10 paid
+
+_ONE = Decimal('1')
+
+
+class DiscountNotApplicable(Exception):
+    """The bill is below the discount's minimum bill amount."""
+    pass
+
+
+BillPrice = namedtuple('BillPrice', 'subtotal discount coin_discount tax final')
+BillPrice.__doc__ = "A priced bill, every amount in paise."
+
+
+def to_paise(amount):
+    """Rupees (Decimal, int or numeric string) to integer paise, rounded half up."""
+    if isinstance(amount, int):
+        return amount * 100
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    scaled = amount.scaleb(2)
+    paise = int(scaled)
+    if scaled == paise:  # the usual case: already whole paise
+        return paise
+    return int(scaled.quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paise):
+    """Integer paise to a two-place rupee Decimal."""
+    return Decimal(paise).scaleb(-2)
+
+
+def _share(amount, basis_points):
+    """`basis_points` / 10000 of `amount` (paise >= 0), rounded half up."""
+    return (amount * basis_points * 2 + 10000) // 20000
+
+
+def line_total(unit_price, quantity):
+    """Paise for `quantity` of a dish priced `unit_price` rupees."""
+    return to_paise(unit_price) * quantity
+
+
+def discount_paise(discount, subtotal):
+    """
+    What `discount` (anything with discount_type, value and
+    minimum_bill_amount, e.g. a discounts.Discount) takes off a subtotal of
+    `subtotal` paise. Raises DiscountNotApplicable below the minimum.
+    """
+    if subtotal < to_paise(discount.minimum_bill_amount or 0):
+        raise DiscountNotApplicable(
+            f"Bill subtotal must be at least ₹{discount.minimum_bill_amount} to use this discount."
+        )
+    if discount.discount_type == 'PERCENTAGE':
+        amount = _share(subtotal, to_paise(discount.value))  # percent * 100 = basis points
+    else:
+        amount = to_paise(discount.value)
+    return min(subtotal, amount)
+
+
+def coin_value(coins):
+    """Paise that `coins` loyalty coins are worth."""
+    return coins * COIN_VALUE_PAISE
+
+
+def coins_earned(final):
+    """Coins a bill with a final amount of `final` paise earns when paid."""
+    return max(0, final) // EARN_PAISE_PER_COIN
+
+
+def price_bill(subtotal, discount=0, coin_discount=0):
+    """Prices one bill from its subtotal and discounts (all paise)."""
+    discounted = max(0, subtotal - discount - coin_discount)
+    tax = _share(discounted, TAX_RATE_BP)
+    return BillPrice(subtotal, discount, coin_discount, tax, discounted + tax)
+
+
+def price_cart(lines, discount=None, coins=0):
+    """
+    Prices a cart: `lines` are (unit price in rupees, quantity) pairs,
+    `discount` an optional Discount and `coins` the loyalty coins redeemed.
+    Raises DiscountNotApplicable if the cart is below the discount's minimum.
+    """
+    subtotal = sum(line_total(price, quantity) for price, quantity in lines)
+    amount = discount_paise(discount, subtotal) if discount is not None else 0
+    return price_bill(subtotal, amount, coin_value(coins))
+
+
+def price_bills(rows):
+    """
+    Prices many bills at once. `rows` are (subtotal, discount, coin_discount)
+    tuples in paise; returns a BillPrice per row, in order. Each row goes
+    through price_bill(), so the two can never disagree.
+    """
+    return list(starmap(price_bill, rows))
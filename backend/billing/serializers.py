@@ -1,7 +1,7 @@
 # billing/serializers.py
 
 from rest_framework import serializers
-from django.db.models import Sum, F, DecimalField
+from django.db.models import Sum, F, DecimalField, Prefetch
 from .models import Bill
 from orders.models import OrderItem
 from discounts.serializers import DiscountSerializer
@@ -23,6 +23,19 @@ class BillSerializer(serializers.ModelSerializer):
             'discount_request_pending', 'bill_status','subtotal',
             'tax_amount',
         ]
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Loads the bills with their table, discount, orders, items and dishes
+        so a list of bills serializes in a fixed number of queries: the
+        status and totals are then worked out from the prefetched orders.
+        """
+        from orders.serializers import order_items_prefetch
+        order_model = queryset.model._meta.get_field('orders').related_model
+        return queryset.select_related('table', 'applied_discount').prefetch_related(
+            Prefetch('orders', queryset=order_model.objects.prefetch_related(order_items_prefetch(order_model)))
+        )
+
     def get_orders(self, obj):
         # Import is done locally, only when this function is called
         from orders.serializers import OrderSerializerForBilling
@@ -30,9 +43,19 @@ class BillSerializer(serializers.ModelSerializer):
         serializer = OrderSerializerForBilling(queryset, many=True)
         return serializer.data
     def get_total_amount(self, obj):
-        total = OrderItem.objects.filter(order__bill=obj).aggregate(
-            total=Sum(F('quantity') * F('dish__price'), output_field=DecimalField())
-        )['total']
+        # Lists load bill -> orders -> items -> dish up front; add those up in memory.
+        prefetched = getattr(obj, '_prefetched_objects_cache', {})
+        if 'orders' in prefetched and all(
+            'items' in getattr(order, '_prefetched_objects_cache', {}) for order in obj.orders.all()
+        ):
+            total = sum(
+                (item.quantity * item.dish.price for order in obj.orders.all() for item in order.items.all()),
+                Decimal('0.00')
+            )
+        else:
+            total = OrderItem.objects.filter(order__bill=obj).aggregate(
+                total=Sum(F('quantity') * F('dish__price'), output_field=DecimalField())
+            )['total']
         # --- FIX: Ensure the output is a standard number format ---
         return "{:.2f}".format(total or Decimal('0.00'))
 
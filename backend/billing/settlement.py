@@ -0,0 +1,92 @@
+# billing/settlement.py
+"""
+End-of-service close-out: settles many unpaid bills in one transaction.
+
+mark_bill_as_paid does one bill per request (lock, customer lookup, coin
+credit, rollup upsert and broadcast each time). settle_bills() does the same
+for a whole set of bills with a fixed number of statements, however many
+bills there are:
+
+* the bills are locked and read in one query and priced together with
+  pricing.price_bills(); a bill whose stored totals disagree is corrected in
+  the same bulk update;
+* the customer of each bill is the customer of its first order, as in
+  mark_bill_as_paid, read for all bills in one query;
+* the coins earned are credited with coins.credit_many(), one ledger insert
+  and one grouped balance UPDATE;
+* the bills are marked paid with one UPDATE (paid_business_date set
+  alongside, since save() is bypassed) and added to the sales rollup once
+  per (business_date, hour);
+* one summary bill_update is queued for after the commit.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from customers import coins
+from orders.business_day import business_date
+from orders.models import Order
+from orders.outbox import queue_settlement_event
+from reports.rollup import record_bills_paid
+from . import pricing
+from .models import Bill
+
+Settlement = namedtuple('Settlement', 'bill_ids total coins_awarded paid_at')
+Settlement.__doc__ = "The outcome of settle_bills(): the bills paid, their total in paise and {customer_id: coins}."
+
+
+def settle_bills(bill_ids=None, table_ids=None):
+    """
+    Marks every unpaid bill in `bill_ids`, or on the tables in `table_ids`,
+    as paid and awards the coins they earn. Bills that are already paid or
+    do not exist are left out. Returns a Settlement.
+    """
+    bills = Bill.objects.select_for_update().filter(is_paid=False)
+    if bill_ids is not None:
+        bills = bills.filter(id__in=bill_ids)
+    if table_ids is not None:
+        bills = bills.filter(table_id__in=table_ids)
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = list(bills.order_by('id').values_list(
+            'id', 'subtotal', 'discount_amount', 'coin_discount', 'tax_amount', 'final_amount'
+        ))
+        if not rows:
+            return Settlement([], 0, {}, None)
+        settled = [row[0] for row in rows]
+
+        prices = pricing.price_bills(
+            (pricing.to_paise(subtotal), pricing.to_paise(discount or 0), pricing.to_paise(coin_discount or 0))
+            for _, subtotal, discount, coin_discount, _, _ in rows
+        )
+        stale = [
+            Bill(id=row[0], tax_amount=pricing.to_rupees(price.tax), final_amount=pricing.to_rupees(price.final))
+            for row, price in zip(rows, prices)
+            if (pricing.to_paise(row[4]), pricing.to_paise(row[5])) != (price.tax, price.final)
+        ]
+        if stale:
+            Bill.objects.bulk_update(stale, ['tax_amount', 'final_amount'])
+
+        customers = {}
+        first_orders = Order.objects.filter(bill_id__in=settled).order_by('bill_id', 'id')
+        for bill_id, customer_id in first_orders.values_list('bill_id', 'customer_id'):
+            customers.setdefault(bill_id, customer_id)
+
+        coins_awarded = coins.credit_many(
+            (
+                (customers[bill_id], pricing.coins_earned(price.final), bill_id)
+                for bill_id, price in zip(settled, prices)
+                if customers.get(bill_id)
+            ),
+            'earned',
+        )
+
+        Bill.objects.filter(id__in=settled).update(
+            is_paid=True, paid_at=now, paid_business_date=business_date(now)
+        )
+        record_bills_paid(settled)
+        queue_settlement_event(settled, f"{len(settled)} bill(s) were paid.")
+
+    return Settlement(settled, sum(price.final for price in prices), coins_awarded, now)
@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from .views import unpaid_bills_list, mark_bill_as_paid,ApplyCoinsView
-from . import views
+from . import views, async_views
+
+# Native async versions of the customer bill reads (see billing/async_views.py).
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+
 urlpatterns = [
     path('unpaid/', views.unpaid_bills_list, name='unpaid-bills'),
     path('<int:bill_id>/mark-as-paid/', views.mark_bill_as_paid, name='mark-as-paid'),
+    path('settle/', views.settle_bills_view, name='settle-bills'),
     path('<int:bill_id>/apply-discount/', views.apply_discount, name='apply-discount'),
     path('recent/', views.recent_bills_list, name='recent-bills'),
 
     # Customer URLs
-    path('myunpaid/', views.customer_unpaid_bills, name='customer-unpaid-bills'),
-    path('customer/<int:bill_id>/', views.get_bill_details, name='customer-bill-details'),
+    path('myunpaid/', read_views.customer_unpaid_bills, name='customer-unpaid-bills'),
+    path('customer/<int:bill_id>/', read_views.get_bill_details, name='customer-bill-details'),
     path('bills/<int:bill_id>/remove-coins/', views.remove_coins, name="remove_coins"),
     path('<int:bill_id>/remove-discount/', views.admin_remove_discount, name='admin_remove_discount'),
     # --- NEW: Customer Discount URLs ---
@@ -7,17 +7,20 @@ from rest_framework import status, permissions
 from rest_framework.views import APIView
 from django.utils import timezone
 from customers.models import Customer
+from customers import coins
 from .models import Bill
 from discounts.models import Discount
+from discounts.cache import discounts
 from .serializers import BillSerializer
+from . import pricing
+from .settlement import settle_bills
 from decimal import Decimal,InvalidOperation,ROUND_HALF_UP
 from customers.serializers import CustomerSerializer
 from django.shortcuts import get_object_or_404
-from django.db.models import F
 from django.db import transaction
-from channels.layers import get_channel_layer
-from orders.serializers import DashboardOrderSerializer 
-from asgiref.sync import async_to_sync
+from orders.outbox import queue_bill_event
+from reports.rollup import record_bill_paid
+from orders.business_day import business_date, business_day_range
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,41 +33,20 @@ logger = logging.getLogger(__name__)
 # billing/views.py
 def broadcast_bill_and_order_updates(message, bill):
     """
-    Broadcasts updates to both the billing channel and the order/dashboard channel.
+    Queues one bill_update for the billing screen and the customers on the
+    bill. It is serialized once and sent after commit by orders.broadcast.
     """
-    channel_layer = get_channel_layer()
-    
-    # 1. Broadcast to the general billing page
-    async_to_sync(channel_layer.group_send)(
-        'unpaid_bills',
-        {'type': 'bill_update', 'message': message}
-    )
-    
-    # 2. Broadcast an order_update message for each affected order to update the dashboard
-    for order in bill.orders.all():
-        serialized_order = DashboardOrderSerializer(order).data
-        order_message = {'type': 'order_update', 'order': serialized_order}
-        
-        async_to_sync(channel_layer.group_send)('kitchen_orders', order_message)
-        
-        if order.customer:
-            async_to_sync(channel_layer.group_send)(f'customer_{order.customer.id}', order_message)
+    queue_bill_event(bill.id, message)
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def unpaid_bills_list(request):
-    unpaid_bills = Bill.objects.filter(is_paid=False).order_by('created_at')
+    unpaid_bills = BillSerializer.setup_eager_loading(Bill.objects.filter(is_paid=False).order_by('created_at'))
     serializer = BillSerializer(unpaid_bills, many=True)
     return Response(serializer.data)
 
 def update_bill_amounts(bill):
-    subtotal = Decimal('0.00')
-    for order in bill.orders.all():
-        for item in order.items.all():
-            subtotal += item.dish.price * item.quantity
-    tax = subtotal * Decimal('0.05')
-    bill.subtotal = subtotal
-    bill.tax_amount = tax
+    # Full re-aggregation from the orders; the running subtotal normally makes this unnecessary.
     bill.recalculate_and_save()
 
 @api_view(['PATCH'])
@@ -81,8 +63,7 @@ def mark_bill_as_paid(request, bill_id):
                 logger.warning(f"FAILED: Bill #{bill_id} not found or already paid.")
                 return Response({'error': 'Bill not found or already paid.'}, status=status.HTTP_404_NOT_FOUND)
 
-            # Recalculate totals to ensure they are final
-            bill.recalculate_and_save()
+            # The totals are kept current as orders are linked, so they are final already.
 
             # Find the associated customer
             customer = bill.orders.first().customer if bill.orders.exists() else None
@@ -92,6 +73,7 @@ def mark_bill_as_paid(request, bill_id):
                 bill.is_paid = True
                 bill.paid_at = timezone.now()
                 bill.save(update_fields=['is_paid', 'paid_at'])
+                record_bill_paid(bill)
                 return Response({'message': 'Bill marked as paid, but no customer was found.'})
 
             logger.info(f"Customer found -> {customer.phone_number}")
@@ -102,19 +84,20 @@ def mark_bill_as_paid(request, bill_id):
                 bill.is_paid = True
                 bill.paid_at = timezone.now()
                 bill.save(update_fields=['is_paid', 'paid_at'])
+                record_bill_paid(bill)
                 return Response({'message': f'Bill #{bill.id} paid, but amount was zero. No coins awarded.'})
 
-            coins_earned = int(bill.final_amount / 10)
+            coins_earned = pricing.coins_earned(pricing.to_paise(bill.final_amount))
             logger.info(f"Coins to award -> {coins_earned}")
 
-            # ✨ FIX 2: Use F() expression to prevent race conditions
-            customer.loyalty_coins = F('loyalty_coins') + coins_earned
-            customer.save(update_fields=['loyalty_coins'])
+            # ✨ FIX 2: An atomic ledger credit, no read-modify-write
+            coins.credit(customer.pk, coins_earned, 'earned', bill_id=bill.id)
 
             # Mark the bill as paid
             bill.is_paid = True
             bill.paid_at = timezone.now()
             bill.save(update_fields=['is_paid', 'paid_at'])
+            record_bill_paid(bill)
             
             # Refresh customer from DB to get the updated coin value for the response
             customer.refresh_from_db()
@@ -130,6 +113,43 @@ def mark_bill_as_paid(request, bill_id):
         logger.error(f"CRITICAL ERROR processing bill #{bill_id}: {str(e)}")
         return Response({'error': 'An unexpected error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def settle_bills_view(request):
+    """
+    End-of-service close-out: marks many bills paid in one request.
+    Body: {"bill_ids": [...]} or {"table_ids": [...]} (all unpaid bills of
+    those tables). See billing.settlement.
+    """
+    ids = {}
+    for key in ('bill_ids', 'table_ids'):
+        value = request.data.get(key)
+        if value is None:
+            continue
+        try:
+            if not isinstance(value, list):
+                raise TypeError(key)
+            ids[key] = [int(pk) for pk in value]
+        except (TypeError, ValueError):
+            return Response({'error': f'{key} must be a list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids.get('bill_ids') and not ids.get('table_ids'):
+        return Response({'error': 'Provide bill_ids or table_ids.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        settlement = settle_bills(**ids)
+    except Exception as e:
+        logger.error(f"CRITICAL ERROR settling bills {ids}: {str(e)}")
+        return Response({'error': 'An unexpected error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    logger.info(f"Settled {len(settlement.bill_ids)} bill(s), awarded {sum(settlement.coins_awarded.values())} coins.")
+    return Response({
+        'message': f'{len(settlement.bill_ids)} bill(s) marked as paid.',
+        'settled': settlement.bill_ids,
+        'skipped': sorted(set(ids.get('bill_ids', [])) - set(settlement.bill_ids)),
+        'total': str(pricing.to_rupees(settlement.total)),
+        'coins_awarded': settlement.coins_awarded,
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def apply_discount(request, bill_id):
@@ -143,37 +163,16 @@ def apply_discount(request, bill_id):
         return Response({'error': 'Discount code is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        discount = Discount.objects.get(code__iexact=code, is_active=True)
+        discount = discounts.get(code)
     except Discount.DoesNotExist:
         return Response({'error': 'Invalid or inactive discount code.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # --- FIX STARTS HERE ---
-
-    # 1. Get a fresh, reliable subtotal directly from the model
-    # (Assuming you have a method on your Bill model to calculate totals)
-    bill.recalculate_and_save() 
-    subtotal = bill.subtotal
-
-    # 2. Add the missing validation check
-    if subtotal < discount.minimum_bill_amount:
-        return Response({
-            'error': f"Bill subtotal must be at least ₹{discount.minimum_bill_amount} to use this discount."
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # --- END OF FIX ---
-
-    # Now, calculate the discount using the reliable subtotal
-    if discount.discount_type == 'PERCENTAGE':
-        discount_amount = (subtotal * discount.value) / Decimal('100')
-    else:
-        discount_amount = discount.value
-
-    # Apply the discount
-    bill.applied_discount = discount
-    bill.discount_amount = min(subtotal, discount_amount)
-    
-    # Recalculate final totals and save
-    bill.recalculate_and_save()
+    # Apply the discount to the bill's running subtotal, as read under the
+    # row lock; below the discount's minimum bill amount it is refused.
+    try:
+        bill.save_totals(discount=discount)
+    except pricing.DiscountNotApplicable as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Broadcast the real-time update
     broadcast_bill_and_order_updates(f"Discount '{discount.code}' applied to bill #{bill.id}.",bill)
@@ -184,10 +183,10 @@ def apply_discount(request, bill_id):
 @permission_classes([IsAuthenticated])
 def get_bill_details(request, bill_id):
     try:
-        bill = Bill.objects.get(id=bill_id)
+        bill = BillSerializer.setup_eager_loading(Bill.objects.all()).get(id=bill_id)
         customer = Customer.objects.get(phone_number=request.user.username)
         
-        if not bill.orders.filter(customer=customer).exists():
+        if not any(order.customer_id == customer.id for order in bill.orders.all()):
             raise Bill.DoesNotExist
 
         serializer = BillSerializer(bill)
@@ -203,10 +202,10 @@ def customer_unpaid_bills(request):
     try:
         customer = Customer.objects.get(phone_number=request.user.username)
         
-        unpaid_bills = Bill.objects.filter(
+        unpaid_bills = BillSerializer.setup_eager_loading(Bill.objects.filter(
             orders__customer=customer, 
             is_paid=False
-        ).distinct().order_by('-created_at')
+        ).distinct().order_by('-created_at'))
         
         serializer = BillSerializer(unpaid_bills, many=True)
         return Response(serializer.data)
@@ -234,23 +233,14 @@ def customer_apply_discount(request, bill_id):
         if not code:
             return Response({'error': 'Discount code is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        discount = Discount.objects.get(code__iexact=code, is_active=True)
+        discount = discounts.get(code)
 
         if discount.requires_staff_approval:
             bill.discount_request_pending = True
-            bill.recalculate_and_save()
+            bill.save(update_fields=['discount_request_pending'])
             return Response({'message': 'Discount requested. A staff member will verify it at your table.'})
         else:
-            total_amount = Decimal(BillSerializer(bill).data.get('total_amount', 0))
-            if discount.discount_type == 'PERCENTAGE':
-                discount_amount = (total_amount * discount.value) / 100
-            else:
-                discount_amount = discount.value
-            discount_amount = min(total_amount, discount_amount)
-
-            bill.applied_discount = discount
-            bill.discount_amount = discount_amount
-            bill.recalculate_and_save()
+            bill.save_totals(discount=discount)
             broadcast_bill_and_order_updates(f"Discount update for bill #{bill.id}.",bill)
             return Response(BillSerializer(bill).data)
 
@@ -258,6 +248,8 @@ def customer_apply_discount(request, bill_id):
         return Response({'error': 'Bill not found or you do not have permission.'}, status=status.HTTP_404_NOT_FOUND)
     except Discount.DoesNotExist:
         return Response({'error': 'Invalid or inactive discount code.'}, status=status.HTTP_400_BAD_REQUEST)
+    except pricing.DiscountNotApplicable as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
 
 @api_view(['POST'])
@@ -275,7 +267,7 @@ def customer_remove_discount(request, bill_id):
         bill.applied_discount = None
         bill.discount_amount = Decimal('0.00')
         bill.discount_request_pending = False
-        bill.recalculate_and_save()
+        bill.save_totals('applied_discount', 'discount_amount', 'discount_request_pending')
         broadcast_bill_and_order_updates(f"Discount removed from bill #{bill.id}.",bill)
         return Response(BillSerializer(bill).data)
 
@@ -286,14 +278,26 @@ def customer_remove_discount(request, bill_id):
 @permission_classes([IsAdminUser])
 def recent_bills_list(request):
     """
-    Returns a list of all bills created on the current day.
+    Returns a list of all bills created on the current business day.
     """
-    today = timezone.now().date()
-    todays_bills = Bill.objects.filter(created_at__date=today).order_by('-created_at')
+    start, end = business_day_range(business_date())
+    todays_bills = BillSerializer.setup_eager_loading(
+        Bill.objects.filter(created_at__gte=start, created_at__lt=end).order_by('-created_at')
+    )
     serializer = BillSerializer(todays_bills, many=True)
     return Response(serializer.data)
 
 
+def refund_bill_coins(bill, customer, coins_on_bill=None):
+    """Gives the coins redeemed on `bill` back to whoever redeemed them."""
+    coins_on_bill = bill.coins_redeemed if coins_on_bill is None else coins_on_bill
+    if not coins_on_bill:
+        return
+    if not coins.refund_bill(bill.id):
+        # Redeemed before the coin ledger existed: refund the customer asking, as before.
+        coins.credit(customer.pk, coins_on_bill, 'refunded', bill_id=bill.id)
+
+
 class ApplyCoinsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -318,25 +322,31 @@ class ApplyCoinsView(APIView):
         if coins_to_apply <= 0:
             return Response({"error": "Coins must be greater than 0"}, status=400)
 
-        if coins_to_apply > customer.loyalty_coins:
-            return Response({"error": "Not enough coins available"}, status=400)
-
-        # 🔥 Convert coins → rupee value
-        COIN_VALUE = Decimal('0.10')  # adjust as needed
-        bill.coin_discount = Decimal(coins_to_apply) * COIN_VALUE
-        bill.coins_redeemed = coins_to_apply   # <-- Add this line to save number of coins redeemed
-
-        bill.recalculate_and_save() 
+        try:
+            with transaction.atomic():
+                # Claim the bill's coin slot as we saw it; a concurrent change to it makes this a no-op.
+                claimed = Bill.objects.filter(
+                    pk=bill.pk, is_paid=False, coins_redeemed=bill.coins_redeemed
+                ).update(coins_redeemed=coins_to_apply)
+                if not claimed:
+                    return Response({"error": "The bill changed meanwhile, please try again."}, status=409)
+                # Coins already on the bill go back to whoever redeemed them; then take the new ones.
+                refund_bill_coins(bill, customer)
+                coins.debit(customer.pk, coins_to_apply, 'redeemed', bill_id=bill.id)
+
+                # 🔥 Convert coins → rupee value
+                bill.coin_discount = pricing.to_rupees(pricing.coin_value(coins_to_apply))
+                bill.coins_redeemed = coins_to_apply   # <-- Add this line to save number of coins redeemed
+                bill.save_totals('coin_discount', 'coins_redeemed')
+        except coins.InsufficientCoins as e:
+            return Response({"error": str(e)}, status=400)
 
-        # Deduct used coins from customer balance
-        customer.loyalty_coins -= coins_to_apply
-        customer.save()
         broadcast_bill_and_order_updates(f"Coins applied to bill #{bill.id}.",bill) 
         return Response({
             "message": f"{coins_to_apply} coins applied successfully",
             "coins_value": str(bill.coin_discount),
             "new_bill_details": BillSerializer(bill).data,
-            "remaining_coins": customer.loyalty_coins,
+            "remaining_coins": coins.balance(customer.pk),
         }, status=200)
     
 @api_view(['POST'])
@@ -354,19 +364,23 @@ def remove_coins(request, bill_id):
     if coins_redeemed == 0:
         return Response({"error": "No coins applied to remove."}, status=400)
     
-    # Remove coin discount and coins redeemed
-    bill.coin_discount = Decimal('0.00')
-    bill.coins_redeemed = 0
-    bill.recalculate_and_save()
-
-
-    # Refund coins to customer
-    customer.loyalty_coins += coins_redeemed
-    customer.save()
+    with transaction.atomic():
+        # Only one of two concurrent removals gets to clear the bill (and refund).
+        cleared = Bill.objects.filter(pk=bill.pk, is_paid=False, coins_redeemed=coins_redeemed).update(coins_redeemed=0)
+        if not cleared:
+            return Response({"error": "No coins applied to remove."}, status=400)
+
+        # Remove coin discount and coins redeemed
+        bill.coin_discount = Decimal('0.00')
+        bill.coins_redeemed = 0
+        bill.save_totals('coin_discount', 'coins_redeemed')
+
+        # Refund the coins to whoever redeemed them
+        refund_bill_coins(bill, customer, coins_redeemed)
     broadcast_bill_and_order_updates(f"Coins removed from bill #{bill.id}.",bill)
     return Response({
         "message": f"Removed {coins_redeemed} coins from the bill.",
-        "remaining_coins": customer.loyalty_coins,
+        "remaining_coins": coins.balance(customer.pk),
         "bill": BillSerializer(bill).data,
     })
 
@@ -378,7 +392,7 @@ def admin_remove_discount(request, bill_id):
         bill.applied_discount = None
         bill.discount_amount = Decimal('0.00')
         bill.discount_request_pending = False
-        bill.recalculate_and_save()
+        bill.save_totals('applied_discount', 'discount_amount', 'discount_request_pending')
         broadcast_bill_and_order_updates(f"Admin removed discount from bill #{bill.id}.",bill)
         return Response(BillSerializer(bill).data)
     except Bill.DoesNotExist:
@@ -404,24 +418,17 @@ def preview_discount(request):
         return Response({'valid': False, 'error': 'Invalid subtotal value.'}, status=400)
 
     try:
-        discount = Discount.objects.get(code__iexact=code, is_active=True)
+        discount = discounts.get(code)
     except Discount.DoesNotExist:
         return Response({'valid': False, 'error': 'Invalid or inactive discount code.'}, status=400)
 
-    # --- ADD THIS VALIDATION ---
-    if subtotal < discount.minimum_bill_amount:
+    try:
+        discount_amount = pricing.to_rupees(pricing.discount_paise(discount, pricing.to_paise(subtotal)))
+    except pricing.DiscountNotApplicable:
         return Response({
             'valid': False, 
             'error': f"Cart total must be at least ₹{discount.minimum_bill_amount} to use this discount."
         }, status=400)
-    # --- END OF VALIDATION ---
-
-    if discount.discount_type == 'PERCENTAGE':
-        discount_amount = (subtotal * discount.value) / Decimal('100')
-    else:
-        discount_amount = discount.value
-
-    discount_amount = min(subtotal, discount_amount)
 
     discount_metadata = {
         'code': discount.code,
@@ -1,4 +1,73 @@
-from django.contrib import admin
-from .models import Customer
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
-admin.site.register(Customer)
\ No newline at end of file
+from . import coins
+from .models import Customer, CoinTransaction
+
+
+class CoinAdjustmentForm(forms.Form):
+    coins = forms.IntegerField(help_text="Positive to add coins, negative to take them away.")
+
+    def clean_coins(self):
+        value = self.cleaned_data['coins']
+        if value == 0:
+            raise forms.ValidationError("Enter a non-zero number of coins.")
+        return value
+
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ('phone_number', 'loyalty_coins', 'last_login')
+    search_fields = ('phone_number',)
+    # The balance is a cache of the coin ledger; change it with the
+    # "Adjust loyalty coins" action so the change is recorded there too.
+    readonly_fields = ('loyalty_coins',)
+    actions = ['adjust_coins']
+
+    @admin.action(description="Adjust loyalty coins")
+    def adjust_coins(self, request, queryset):
+        form = CoinAdjustmentForm(request.POST if 'apply' in request.POST else None)
+        if not form.is_valid():
+            return TemplateResponse(request, 'admin/customers/customer/adjust_coins.html', {
+                **self.admin_site.each_context(request),
+                'title': "Adjust loyalty coins",
+                'opts': self.model._meta,
+                'customers': queryset,
+                'form': form,
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            })
+
+        amount = form.cleaned_data['coins']
+        adjusted = 0
+        for customer in queryset:
+            try:
+                if amount > 0:
+                    coins.credit(customer.pk, amount, 'adjustment')
+                else:
+                    coins.debit(customer.pk, -amount, 'adjustment')
+                adjusted += 1
+            except coins.InsufficientCoins:
+                self.message_user(
+                    request, f"{customer} has fewer than {-amount} coins; left unchanged.", messages.WARNING
+                )
+        if adjusted:
+            self.message_user(request, f"Adjusted the balance of {adjusted} customer(s) by {amount:+d} coins.")
+
+
+@admin.register(CoinTransaction)
+class CoinTransactionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customer', 'amount', 'reason', 'bill_id', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('customer__phone_number',)
+
+    # The ledger is append-only and written through customers.coins.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
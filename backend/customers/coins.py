@@ -0,0 +1,124 @@
+# customers/coins.py
+"""
+Loyalty coin balances, kept as an append-only ledger (CoinTransaction).
+
+Every change is a ledger entry plus one atomic UPDATE of the cached
+Customer.loyalty_coins balance, in the same transaction. Credits add with an
+F() expression; debits are conditional (`loyalty_coins >= coins`), so two
+phones redeeming at once cannot spend the same coins: the second UPDATE
+matches no row and raises InsufficientCoins. Nothing reads the balance,
+changes it in Python and saves it back, so there is no lost update, and
+no other Customer column (such as the auto_now last_login) is rewritten.
+
+`manage.py reconcile_coin_balances` re-adds the ledger in batches and fixes
+any cached balance that no longer matches it.
+"""
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import CoinTransaction, Customer
+
+
+class InsufficientCoins(Exception):
+    """The customer's balance does not cover the coins being taken."""
+    pass
+
+
+def balance(customer_id):
+    """The cached balance, freshly read."""
+    return Customer.objects.values_list('loyalty_coins', flat=True).get(pk=customer_id)
+
+
+def credit(customer_id, coins, reason, bill_id=None):
+    """Adds `coins` to the customer's balance and records why."""
+    if coins <= 0:
+        return
+    with transaction.atomic():
+        Customer.objects.filter(pk=customer_id).update(loyalty_coins=F('loyalty_coins') + coins)
+        CoinTransaction.objects.create(customer_id=customer_id, amount=coins, reason=reason, bill_id=bill_id)
+
+
+def credit_many(credits, reason):
+    """
+    Credits many customers at once: `credits` are (customer_id, coins,
+    bill_id) entries. Each becomes a ledger entry (one bulk insert) and the
+    balances move in a single UPDATE, grouped per customer. Returns
+    {customer_id: coins credited}.
+    """
+    totals = {}
+    entries = []
+    for customer_id, amount, bill_id in credits:
+        if amount <= 0:
+            continue
+        totals[customer_id] = totals.get(customer_id, 0) + amount
+        entries.append(CoinTransaction(customer_id=customer_id, amount=amount, reason=reason, bill_id=bill_id))
+    if not totals:
+        return totals
+    with transaction.atomic():
+        Customer.objects.filter(pk__in=totals).update(loyalty_coins=F('loyalty_coins') + Case(
+            *(When(pk=customer_id, then=Value(amount)) for customer_id, amount in totals.items()),
+            default=Value(0),
+        ))
+        CoinTransaction.objects.bulk_create(entries)
+    return totals
+
+
+def debit(customer_id, coins, reason, bill_id=None):
+    """Takes `coins` from the customer's balance, or raises InsufficientCoins."""
+    if coins <= 0:
+        return
+    with transaction.atomic():
+        taken = Customer.objects.filter(pk=customer_id, loyalty_coins__gte=coins).update(
+            loyalty_coins=F('loyalty_coins') - coins
+        )
+        if not taken:
+            raise InsufficientCoins("Not enough coins available")
+        CoinTransaction.objects.create(customer_id=customer_id, amount=-coins, reason=reason, bill_id=bill_id)
+
+
+def refund_bill(bill_id):
+    """
+    Gives every customer back the coins they still have redeemed on a bill
+    (redeemed minus already refunded, from the ledger). Returns
+    {customer_id: coins refunded}.
+    """
+    outstanding = CoinTransaction.objects.filter(
+        bill_id=bill_id, reason__in=['redeemed', 'refunded']
+    ).values('customer_id').annotate(net=Sum('amount'))
+    refunded = {}
+    for row in outstanding:
+        if row['net'] < 0:
+            credit(row['customer_id'], -row['net'], 'refunded', bill_id=bill_id)
+            refunded[row['customer_id']] = -row['net']
+    return refunded
+
+
+def ledger_balance():
+    """A Customer annotation: the sum of the customer's ledger entries."""
+    entries = CoinTransaction.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    return Coalesce(Subquery(entries.annotate(total=Sum('amount')).values('total')), Value(0))
+
+
+def reconcile(batch_size=1000, dry_run=False):
+    """
+    Compares every cached balance with its ledger, `batch_size` customers at
+    a time, and (unless dry_run) resets the ones that drifted. Returns
+    [(customer_id, cached, ledger)] for the drifted customers.
+    """
+    drifted = []
+    last_id = 0
+    while True:
+        batch = list(
+            Customer.objects.filter(pk__gt=last_id).order_by('pk').annotate(ledger=ledger_balance())
+            .values_list('pk', 'loyalty_coins', 'ledger')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        wrong = [(pk, cached, ledger) for pk, cached, ledger in batch if cached != ledger]
+        if wrong and not dry_run:
+            # One statement per batch, re-adding the ledger as it is at that moment.
+            Customer.objects.filter(pk__in=[pk for pk, _, _ in wrong]).update(loyalty_coins=ledger_balance())
+        drifted.extend(wrong)
+    return drifted
@@ -0,0 +1,29 @@
+# customers/management/commands/reconcile_coin_balances.py
+
+from django.core.management.base import BaseCommand
+
+from customers.coins import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-adds every customer's loyalty coin ledger, --batch-size customers per "
+        "query, and resets the cached Customer.loyalty_coins balances that no "
+        "longer match it. With --dry-run the drifted balances are only listed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Customers per batch.")
+        parser.add_argument('--dry-run', action='store_true', help="List the drifted balances without fixing them.")
+
+    def handle(self, *args, **options):
+        drifted = reconcile(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        for customer_id, cached, ledger in drifted:
+            self.stdout.write(f"Customer #{customer_id}: cached {cached}, ledger {ledger}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Every cached coin balance matches the ledger."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} balance(s) drifted; run without --dry-run to fix them."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Reset {len(drifted)} balance(s) from the ledger."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Every existing balance becomes the opening entry of its customer's ledger.
+    Customer = apps.get_model('customers', 'Customer')
+    CoinTransaction = apps.get_model('customers', 'CoinTransaction')
+    CoinTransaction.objects.bulk_create(
+        (
+            CoinTransaction(customer_id=customer_id, amount=coins, reason='opening')
+            for customer_id, coins in Customer.objects.filter(loyalty_coins__gt=0).values_list('id', 'loyalty_coins').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_loyalty_coins'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(help_text='Coins added (positive) or taken (negative).')),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('earned', 'Earned'), ('redeemed', 'Redeemed'), ('refunded', 'Refunded'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('bill_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coin_transactions', to='customers.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'id'], name='coin_txn_customer_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
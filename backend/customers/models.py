@@ -5,8 +5,41 @@ class Customer(models.Model):
     otp = models.CharField(max_length=6, blank=True, null=True)
     #table_number = models.PositiveIntegerField(null=True, blank=True)
     last_login = models.DateTimeField(auto_now=True)
+    # Cached balance of the customer's CoinTransaction ledger. Only changed
+    # through customers.coins, and reconciled by `manage.py reconcile_coin_balances`.
     loyalty_coins = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         # FIX: Removed the reference to the non-existent 'table_number'
-        return self.phone_number
\ No newline at end of file
+        return self.phone_number
+
+
+class CoinTransaction(models.Model):
+    """
+    One entry of the append-only loyalty coin ledger: coins earned on a paid
+    bill, redeemed on a bill, refunded, or the opening balance. A customer's
+    balance is the sum of their entries.
+    """
+    REASON_CHOICES = [
+        ('opening', 'Opening balance'),
+        ('earned', 'Earned'),
+        ('redeemed', 'Redeemed'),
+        ('refunded', 'Refunded'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='coin_transactions')
+    amount = models.IntegerField(help_text="Coins added (positive) or taken (negative).")
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    # A plain id rather than a foreign key, so archiving the bill (which
+    # moves it to another table) leaves the ledger alone.
+    bill_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'id'], name='coin_txn_customer_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.amount:+d} coins for {self.customer} ({self.reason})"
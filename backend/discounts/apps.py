@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DiscountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'discounts'
+
+    def ready(self):
+        # Keeps the discount cache in step with saves and deletes.
+        import discounts.signals
@@ -0,0 +1,60 @@
+# discounts/cache.py
+"""
+A process-local cache of the active discounts, keyed by normalized code.
+
+Every discount check (the billing views, the POS checkout and the POS cart's
+preview on each keystroke) looks a code up here instead of querying the
+database. The whole table of active discounts is small, so it is loaded in
+one query on first use. Saving or deleting a Discount clears it (see
+discounts.signals), and it is reloaded after DISCOUNT_CACHE_MAX_AGE seconds
+anyway, as a safety net for changes made by other processes or by bulk
+updates that send no signals.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Discount, normalize_code
+
+
+class DiscountCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_code = None
+        self.loaded_at = None
+        self.hits = 0
+        self.loads = 0
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'DISCOUNT_CACHE_MAX_AGE', 60)
+
+    def _codes(self):
+        with self._lock:
+            if self._by_code is None or time.monotonic() - self.loaded_at >= self.max_age:
+                self._by_code = {
+                    discount.normalized_code: discount
+                    for discount in Discount.objects.filter(is_active=True)
+                }
+                self.loaded_at = time.monotonic()
+                self.loads += 1
+            self.hits += 1
+            return self._by_code
+
+    def get(self, code):
+        """
+        The active discount with this code (any case, surrounding spaces
+        ignored). Raises Discount.DoesNotExist like Discount.objects.get().
+        """
+        discount = self._codes().get(normalize_code(code))
+        if discount is None:
+            raise Discount.DoesNotExist("Invalid or inactive discount code.")
+        return discount
+
+    def clear(self):
+        with self._lock:
+            self._by_code = None
+
+
+discounts = DiscountCache()
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+def fill_normalized_code(apps, schema_editor):
+    Discount = apps.get_model('discounts', 'Discount')
+    discounts = list(Discount.objects.all())
+    for discount in discounts:
+        discount.normalized_code = (discount.code or '').strip().upper()
+    Discount.objects.bulk_update(discounts, ['normalized_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discounts', '0003_discount_minimum_bill_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discount',
+            name='normalized_code',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_normalized_code, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+def rename_duplicates(apps, schema_editor):
+    # Codes that differ only in case or spaces could not be applied anyway
+    # (the lookup matched several). The oldest keeps its code; the others
+    # get their id appended, so each one is reachable again.
+    Discount = apps.get_model('discounts', 'Discount')
+    seen = set()
+    for discount in Discount.objects.order_by('id'):
+        if discount.normalized_code not in seen:
+            seen.add(discount.normalized_code)
+            continue
+        suffix = f"-{discount.id}"
+        discount.code = f"{discount.code.strip()[:20 - len(suffix)]}{suffix}"
+        discount.normalized_code = discount.code.upper()
+        discount.save(update_fields=['code', 'normalized_code'])
+        seen.add(discount.normalized_code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discounts', '0004_discount_normalized_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='discount',
+            name='normalized_code',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+    ]
@@ -1,7 +1,13 @@
 # discounts/models.py
 
+from django.core.exceptions import ValidationError
 from django.db import models
 
+def normalize_code(code):
+    """Discount codes are matched case-insensitively, ignoring surrounding spaces."""
+    return (code or '').strip().upper()
+
+
 class Discount(models.Model):
     """
     Represents a discount coupon or offer that can be applied to a bill.
@@ -12,6 +18,9 @@ class Discount(models.Model):
     ]
 
     code = models.CharField(max_length=20, unique=True, help_text="The code customers or staff will enter (e.g., STUDENT15, DIWALI20).")
+    # The code as it is looked up (see normalize_code), kept in step by save().
+    # Unique, so two codes differing only in case or spaces cannot coexist.
+    normalized_code = models.CharField(max_length=20, unique=True, editable=False)
     discount_type = models.CharField(max_length=10, choices=DISCOUNT_TYPE_CHOICES)
     value = models.DecimalField(max_digits=10, decimal_places=2, help_text="The percentage (e.g., 15 for 15%) or the fixed amount (e.g., 50 for ₹50).")
     minimum_bill_amount = models.DecimalField(
@@ -25,8 +34,25 @@ class Discount(models.Model):
     # This flag is for special offers like student discounts
     requires_staff_approval = models.BooleanField(default=False, help_text="If checked, this discount must be approved by a staff member.")
     is_hidden = models.BooleanField(default=False, help_text="If checked, this discount is hidden from everyone except admins.")
+
+    def clean(self):
+        super().clean()
+        if code_taken(self.code, exclude_pk=self.pk):
+            raise ValidationError({'code': "A discount with this code (ignoring case and spaces) already exists."})
+
+    def save(self, *args, **kwargs):
+        self.normalized_code = normalize_code(self.code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_code'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.discount_type == 'PERCENTAGE':
             return f"{self.code} ({self.value}% off)"
         return f"{self.code} (₹{self.value} off)"
 
+
+def code_taken(code, exclude_pk=None):
+    """Whether another discount already uses `code`, compared as it is looked up."""
+    return Discount.objects.filter(normalized_code=normalize_code(code)).exclude(pk=exclude_pk).exists()
@@ -1,7 +1,7 @@
 # discounts/serializers.py
 
 from rest_framework import serializers
-from .models import Discount
+from .models import Discount, code_taken
 
 class DiscountSerializer(serializers.ModelSerializer):
     """
@@ -20,3 +20,7 @@ class DiscountSerializer(serializers.ModelSerializer):
             'is_hidden'
         ]
 
+    def validate_code(self, value):
+        if code_taken(value, exclude_pk=self.instance.pk if self.instance else None):
+            raise serializers.ValidationError("A discount with this code (ignoring case and spaces) already exists.")
+        return value
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import discounts
+from .models import Discount
+
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+def clear_discount_cache(sender, **kwargs):
+    """
+    Drops the cached discounts, now and again once the change has committed
+    (so a reload that raced the transaction does not keep the old version).
+    """
+    discounts.clear()
+    transaction.on_commit(discounts.clear)
@@ -0,0 +1,35 @@
+# menu/async_views.py
+"""
+Async version of the public dish list (GET /api/menu/dishes/), mounted in
+front of the router in menu/urls.py while settings.ASYNC_READ_VIEWS is on.
+"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+
+from accounts.async_api import async_api_view, json_response
+from .models import Dish
+from .serializers import DishSerializer
+from .availability import select_availability, with_stock_availability
+from .views import DishViewSet
+
+# Creating a dish (POST on the same URL) stays on the DRF viewset.
+dish_list_create = DishViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+@csrf_exempt
+async def dish_list(request):
+    if request.method in ('GET', 'HEAD'):
+        return await _dish_list(request)
+    return await sync_to_async(dish_list_create)(request)
+
+
+@async_api_view(login_required=False)
+async def _dish_list(request):
+    # Same filtering as DishViewSet.get_queryset().
+    queryset = Dish.objects.filter(category__is_point_of_sale_only=False).order_by('category__name', 'name')
+    is_available_param = request.GET.get('is_available')
+    if is_available_param is not None:
+        queryset = queryset.filter(is_available=is_available_param.lower() == 'true')
+
+    dishes = [dish async for dish in select_availability(DishSerializer.setup_eager_loading(queryset))]
+    return json_response(with_stock_availability(dishes, DishSerializer(dishes, many=True).data))
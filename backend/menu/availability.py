@@ -0,0 +1,117 @@
+# menu/availability.py
+"""
+Keeps menu.DishAvailability (dish -> can it be made, limiting ingredient)
+in step with the pantry.
+
+Only the dishes a change can affect are recomputed:
+
+* orders.utils.reserve_stock / release_stock call refresh_for_ingredients()
+  with the ingredients they moved, inside the order's transaction;
+* saving an Ingredient, or saving or deleting a recipe line
+  (DishIngredient), does the same through menu.signals (a deleted line once
+  the deletion has committed, as its dish may be going with it).
+
+A refresh is one query for the recipe lines of the affected dishes (with
+their stock) and one for their current rows; only rows whose outcome
+changed are written, so an order that does not empty anything writes
+nothing. `manage.py rebuild_dish_availability` recomputes every dish, for
+stock changed behind the app's back (e.g. a raw UPDATE).
+
+The menu loads the index with its dishes (select_availability()), so
+listing dishes costs the same number of queries however big the menu is.
+The stock check is this module's alone; the views only add it on top of
+the serializer's own eager loading.
+"""
+from .models import Dish, DishAvailability, DishIngredient
+
+
+def _compute(recipe_lines):
+    """
+    {dish_id: (can_be_made, limiting ingredient id)} from (dish_id,
+    ingredient_id, quantity_required, current_stock) rows.
+    """
+    outcome = {}
+    tightest = {}
+    for dish_id, ingredient_id, required, stock in recipe_lines:
+        can_be_made, limiting = outcome.get(dish_id, (True, None))
+        can_be_made = can_be_made and stock >= required
+        if required > 0:
+            portions = (stock / required, ingredient_id)
+            if dish_id not in tightest or portions < tightest[dish_id]:
+                tightest[dish_id] = portions
+                limiting = ingredient_id
+        outcome[dish_id] = (can_be_made, limiting)
+    return outcome
+
+
+def _save(dish_ids, recipe_lines):
+    outcome = _compute(recipe_lines)
+    current = {
+        dish_id: (can_be_made, limiting)
+        for dish_id, can_be_made, limiting in DishAvailability.objects.filter(dish_id__in=dish_ids).values_list(
+            'dish_id', 'can_be_made', 'limiting_ingredient_id'
+        )
+    }
+    changed = []
+    for dish_id in dish_ids:
+        can_be_made, limiting = outcome.get(dish_id, (True, None))
+        if current.get(dish_id) != (can_be_made, limiting):
+            changed.append(DishAvailability(dish_id=dish_id, can_be_made=can_be_made, limiting_ingredient_id=limiting))
+    if changed:
+        DishAvailability.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=['dish'],
+            update_fields=['can_be_made', 'limiting_ingredient'],
+        )
+    return len(changed)
+
+
+def _recipe_lines(dishes):
+    return DishIngredient.objects.filter(dish_id__in=dishes).values_list(
+        'dish_id', 'ingredient_id', 'quantity_required', 'ingredient__current_stock'
+    )
+
+
+def refresh_dishes(dish_ids):
+    """Recomputes the given dishes (those of them that still exist). Returns how many rows changed."""
+    dish_ids = set(Dish.objects.filter(pk__in=list(dish_ids)).values_list('id', flat=True))
+    if not dish_ids:
+        return 0
+    return _save(dish_ids, _recipe_lines(dish_ids))
+
+
+def refresh_for_ingredients(ingredient_ids):
+    """Recomputes every dish that uses one of the given ingredients. Returns how many rows changed."""
+    if not ingredient_ids:
+        return 0
+    users = DishIngredient.objects.filter(ingredient_id__in=list(ingredient_ids)).values('dish_id')
+    recipe_lines = list(_recipe_lines(users))
+    return _save({line[0] for line in recipe_lines}, recipe_lines)
+
+
+def rebuild():
+    """Recomputes every dish. Returns how many rows changed."""
+    return _save(set(Dish.objects.values_list('id', flat=True)), _recipe_lines(Dish.objects.values('id')))
+
+
+def select_availability(queryset):
+    """Loads each dish's index row along with the dish, for can_be_made()."""
+    return queryset.select_related('availability')
+
+
+def can_be_made(dish):
+    """What the index says about a dish loaded with select_availability(); unknown means yes."""
+    try:
+        return dish.availability.can_be_made
+    except DishAvailability.DoesNotExist:
+        return True
+
+
+def with_stock_availability(dishes, data):
+    """
+    Marks dishes the pantry cannot cover as unavailable in their serialized
+    `data` (same order as `dishes`). A dish switched off by hand stays off.
+    """
+    for dish, dish_data in zip(dishes, data):
+        if dish_data['is_available'] and not can_be_made(dish):
+            dish_data['is_available'] = False
+    return data
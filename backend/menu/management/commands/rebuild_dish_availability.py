@@ -0,0 +1,18 @@
+# menu/management/commands/rebuild_dish_availability.py
+
+from django.core.management.base import BaseCommand
+
+from menu.availability import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the dish availability index (can each dish be made from the "
+        "current stock, and which ingredient limits it) for every dish. It is kept "
+        "up to date as orders and inventory edits move stock; run this after stock "
+        "was changed some other way."
+    )
+
+    def handle(self, *args, **options):
+        changed = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Dish availability rebuilt: {changed} dish(es) changed."))
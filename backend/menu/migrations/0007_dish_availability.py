@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    # One row per dish, from the stock as it is now (see menu.availability).
+    Dish = apps.get_model('menu', 'Dish')
+    DishIngredient = apps.get_model('menu', 'DishIngredient')
+    DishAvailability = apps.get_model('menu', 'DishAvailability')
+    rows = {dish_id: DishAvailability(dish_id=dish_id) for dish_id in Dish.objects.values_list('id', flat=True)}
+    tightest = {}
+    lines = DishIngredient.objects.values_list('dish_id', 'ingredient_id', 'quantity_required', 'ingredient__current_stock')
+    for dish_id, ingredient_id, required, stock in lines.iterator():
+        row = rows[dish_id]
+        row.can_be_made = row.can_be_made and stock >= required
+        if required > 0 and (dish_id not in tightest or (stock / required, ingredient_id) < tightest[dish_id]):
+            tightest[dish_id] = (stock / required, ingredient_id)
+            row.limiting_ingredient_id = ingredient_id
+    DishAvailability.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+        ('menu', '0006_alter_dish_food_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishAvailability',
+            fields=[
+                ('dish', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='menu.dish')),
+                ('can_be_made', models.BooleanField(default=True)),
+                ('limiting_ingredient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.ingredient')),
+            ],
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
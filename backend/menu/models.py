@@ -68,3 +68,24 @@ class Dish(models.Model):
             return self.image.url
         return ""
 
+
+
+class DishAvailability(models.Model):
+    """
+    Whether the pantry can currently cover one portion of a dish, kept per
+    dish by menu.availability whenever stock or a recipe changes, so the
+    menu does not compare stock against every recipe line on each load.
+
+    `limiting_ingredient` is the recipe line with the fewest portions left
+    in stock (the one that ran out, for a dish that cannot be made). A dish
+    without a recipe can always be made. The manual Dish.is_available switch
+    is separate; the menu shows a dish only if both allow it.
+    """
+    dish = models.OneToOneField(Dish, on_delete=models.CASCADE, primary_key=True, related_name='availability')
+    can_be_made = models.BooleanField(default=True)
+    limiting_ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    def __str__(self):
+        return f"{self.dish}: {'can be made' if self.can_be_made else 'out of stock'}"
@@ -44,6 +44,10 @@ class DishSerializer(serializers.ModelSerializer):
             'is_available', 'ingredients'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('category').prefetch_related('dishingredient_set__ingredient')
+
     def validate_food_type(self, value):
         label_to_value = {
             "Vegetarian": "veg",
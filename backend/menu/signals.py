@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from inventory.models import Ingredient
+from . import availability
+from .models import Dish, DishIngredient
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_stock_changed(sender, instance, **kwargs):
+    # Edited from the inventory screen or the admin; orders go through reserve_stock instead.
+    availability.refresh_for_ingredients([instance.pk])
+
+
+@receiver(post_save, sender=DishIngredient)
+def recipe_changed(sender, instance, **kwargs):
+    availability.refresh_dishes([instance.dish_id])
+
+
+@receiver(post_delete, sender=DishIngredient)
+def recipe_line_deleted(sender, instance, **kwargs):
+    # The line may be going because its dish (or category) is being deleted;
+    # the dish row is only removed after this signal, so wait for the commit
+    # and refresh the dish only if it is still there.
+    transaction.on_commit(lambda: availability.refresh_dishes([instance.dish_id]))
+
+
+@receiver(post_save, sender=Dish)
+def dish_created(sender, instance, created, **kwargs):
+    if created:
+        availability.refresh_dishes([instance.pk])
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework_nested import routers
-from . import views
+from . import views, async_views
 
 router = routers.DefaultRouter()
 
@@ -19,4 +20,8 @@ router.register(r'manage-dishes', views.ManageDishViewSet, basename='manage-dish
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(dishes_router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # The async dish list goes in front of the router's list/create route.
+    urlpatterns.insert(0, path('dishes/', async_views.dish_list, name='dish-list-async'))
@@ -10,6 +10,7 @@ import json
 import zipfile
 from django.core.files.base import ContentFile
 from .models import Category, Dish, DishIngredient
+from .availability import select_availability, with_stock_availability
 from .serializers import (
     CategorySerializer, 
     DishSerializer, 
@@ -75,25 +76,11 @@ class DishViewSet(viewsets.ModelViewSet):
         Helper method to check inventory for a given queryset of dishes
         and return the serialized data with an updated 'is_available' flag.
         """
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-
-        for dish_data in data:
-            if not dish_data['is_available']:
-                continue # Respect manual 'unavailable' setting
-
-            try:
-                dish = Dish.objects.get(id=dish_data['id'])
-                can_be_made = True
-                for recipe_item in dish.dishingredient_set.all():
-                    if recipe_item.ingredient.current_stock < recipe_item.quantity_required:
-                        can_be_made = False
-                        break
-                dish_data['is_available'] = can_be_made
-            except Dish.DoesNotExist:
-                dish_data['is_available'] = False
-        
-        return data
+        dishes = list(select_availability(DishSerializer.setup_eager_loading(queryset)))
+        serializer = self.get_serializer(dishes, many=True)
+
+        # Respect manual 'unavailable' settings; stock comes from the availability index.
+        return with_stock_availability(dishes, serializer.data)
 
     def list(self, request, *args, **kwargs):
         """
@@ -127,7 +114,6 @@ class DishViewSet(viewsets.ModelViewSet):
             self.perform_create(serializer)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
-            print("❌ Serializer errors:", serializer.errors)  # logs in console
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 
 admin.site.register(Order)
 admin.site.register(OrderItem)
+admin.site.register(ArchivedOrder)
+admin.site.register(ArchivedOrderItem)
@@ -0,0 +1,156 @@
+# orders/archive.py
+"""
+Moves closed history out of the live Bill / Order / OrderItem tables.
+
+A bill is archived once it has been paid for more than ARCHIVE_AFTER_DAYS
+business days and every one of its orders is served or cancelled. The bill,
+its orders and their items are copied to ArchivedBill / ArchivedOrder /
+ArchivedOrderItem with their original ids and deleted from the live tables
+in the same transaction, a batch of bills at a time. Cancelled orders that
+never got a bill are moved the same way (without one) once their business
+day is older than the same cutoff. The live tables then only hold recent
+and open work, which is what the "today" and "unpaid" queries scan.
+
+Readers that need the whole history (order_history, customer_order_history,
+the All Orders page and its CSV export, the sales rollup rebuild) query both
+tables; the archive models have the same field and relation names, so the
+same filters and serializers apply to either.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from billing.models import ArchivedBill, Bill
+from .business_day import business_date
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .utils import ACTIVE_ORDER_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def archive_cutoff(days=None):
+    """Bills paid before this business day are old enough to archive."""
+    if days is None:
+        days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 90)
+    return business_date() - timedelta(days=days)
+
+
+def archivable_bills(cutoff):
+    """Paid bills settled before `cutoff` with no order still in progress."""
+    return Bill.objects.filter(
+        is_paid=True, paid_business_date__lt=cutoff
+    ).exclude(
+        orders__status__in=ACTIVE_ORDER_STATUSES
+    )
+
+
+def archivable_unbilled_orders(cutoff):
+    """Cancelled orders from before `cutoff` that never got a bill."""
+    return Order.objects.filter(status='Cancelled', bill__isnull=True, business_date__lt=cutoff)
+
+
+def _copy(source_queryset, archive_model):
+    fields = [field.attname for field in archive_model._meta.concrete_fields]
+    rows = source_queryset.order_by().values_list(*fields)
+    archive_model.objects.bulk_create(
+        (archive_model(**dict(zip(fields, row))) for row in rows.iterator()),
+        batch_size=500,
+    )
+
+
+def archive_bills(bill_ids, cutoff):
+    """
+    Moves the given bills (those of them that are still archivable), their
+    orders and items into the archive tables in one transaction. Returns
+    (bills, orders, items) moved.
+    """
+    with transaction.atomic():
+        # Checked again inside the transaction, in case a bill changed since it was picked.
+        bill_ids = list(archivable_bills(cutoff).filter(id__in=bill_ids).values_list('id', flat=True))
+        if not bill_ids:
+            return 0, 0, 0
+        orders = Order.objects.filter(bill_id__in=bill_ids)
+        items = OrderItem.objects.filter(order__bill_id__in=bill_ids)
+        counts = (len(bill_ids), orders.count(), items.count())
+
+        _copy(Bill.objects.filter(id__in=bill_ids), ArchivedBill)
+        _copy(orders, ArchivedOrder)
+        _copy(items, ArchivedOrderItem)
+        # Deleting the bills cascades to their orders and items.
+        Bill.objects.filter(id__in=bill_ids).delete()
+    return counts
+
+
+def archive_unbilled_orders(order_ids, cutoff):
+    """
+    Moves the given unbilled cancelled orders (those of them that are still
+    archivable) and their items into the archive tables in one transaction.
+    Returns (orders, items) moved.
+    """
+    with transaction.atomic():
+        order_ids = list(archivable_unbilled_orders(cutoff).filter(id__in=order_ids).values_list('id', flat=True))
+        if not order_ids:
+            return 0, 0
+        orders = Order.objects.filter(id__in=order_ids)
+        items = OrderItem.objects.filter(order_id__in=order_ids)
+        counts = (len(order_ids), items.count())
+
+        _copy(orders, ArchivedOrder)
+        _copy(items, ArchivedOrderItem)
+        orders.delete()
+    return counts
+
+
+def archive_closed(days=None, batch_size=500, dry_run=False):
+    """
+    Archives every archivable bill, `batch_size` bills per transaction, then
+    the unbilled cancelled orders, `batch_size` orders per transaction.
+    Returns the totals moved (or that would be moved, with dry_run); the
+    unbilled orders are counted in 'orders' and, on their own, in
+    'unbilled_orders'.
+    """
+    cutoff = archive_cutoff(days)
+    totals = {'cutoff': cutoff, 'bills': 0, 'orders': 0, 'items': 0, 'unbilled_orders': 0}
+    if dry_run:
+        bills = archivable_bills(cutoff)
+        unbilled = archivable_unbilled_orders(cutoff)
+        totals['bills'] = bills.count()
+        totals['unbilled_orders'] = unbilled.count()
+        totals['orders'] = Order.objects.filter(bill__in=bills).count() + totals['unbilled_orders']
+        totals['items'] = (
+            OrderItem.objects.filter(order__bill__in=bills).count()
+            + OrderItem.objects.filter(order__in=unbilled).count()
+        )
+        return totals
+
+    last_id = 0
+    while True:
+        batch = list(
+            archivable_bills(cutoff).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1]
+        bills, orders, items = archive_bills(batch, cutoff)
+        totals['bills'] += bills
+        totals['orders'] += orders
+        totals['items'] += items
+        logger.info("Archived %s bill(s), %s order(s), %s item(s)", bills, orders, items)
+
+    last_id = 0
+    while True:
+        batch = list(
+            archivable_unbilled_orders(cutoff).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1]
+        orders, items = archive_unbilled_orders(batch, cutoff)
+        totals['orders'] += orders
+        totals['unbilled_orders'] += orders
+        totals['items'] += items
+        logger.info("Archived %s unbilled cancelled order(s), %s item(s)", orders, items)
+    return totals
+
@@ -0,0 +1,45 @@
+# orders/async_views.py
+"""
+Async versions of the order read endpoints the screens poll the most. They
+are mounted instead of the sync views in orders/urls.py while
+settings.ASYNC_READ_VIEWS is on, and answer with the same JSON.
+"""
+from rest_framework import status
+
+from accounts.async_api import async_api_view, json_response
+from customers.models import Customer
+from .live_board import board as live_board
+from .models import ArchivedOrder, Order
+from .serializers import OrderSerializer
+from .utils import get_kitchen_display_orders, ACTIVE_ORDER_STATUSES
+
+
+@async_api_view()
+async def kitchen_display_orders(request):
+    board_orders = await live_board.aselect(ACTIVE_ORDER_STATUSES, today_only=True, exclude_pos=True)
+    if board_orders is not None:
+        return json_response(board_orders)
+
+    # Everything the serializer touches is loaded up front; a lazy query here
+    # would raise SynchronousOnlyOperation.
+    orders = OrderSerializer.setup_eager_loading(get_kitchen_display_orders())
+    orders = [order async for order in orders]
+    return json_response(OrderSerializer(orders, many=True).data)
+
+
+@async_api_view()
+async def get_order_status(request, order_id):
+    try:
+        customer = await Customer.objects.aget(phone_number=request.user.username)
+        try:
+            order = await OrderSerializer.setup_eager_loading(
+                Order.objects.filter(id=order_id, customer=customer)
+            ).aget()
+        except Order.DoesNotExist:
+            # An old order may have been moved to the archive.
+            order = await OrderSerializer.setup_eager_loading(
+                ArchivedOrder.objects.filter(id=order_id, customer=customer)
+            ).aget()
+    except (Customer.DoesNotExist, Order.DoesNotExist, ArchivedOrder.DoesNotExist):
+        return json_response({'error': 'Order not found or permission denied.'}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(OrderSerializer(order).data)
@@ -0,0 +1,322 @@
+# orders/broadcast.py
+"""
+The one place order updates leave the server over WebSockets.
+
+Order-mutating views never call the channel layer themselves: saving an
+Order queues an event in orders.outbox, and after commit the outbox's
+publisher thread hands the changed order ids to publish_order_events().
+Each order is serialized once per message shape and sent once to every
+audience group, and every send is counted in `stats` so the fan-out per
+logical event can be checked (see the /api/orders/broadcast-stats/
+endpoint).
+
+Updates are delta-encoded. Every published change bumps Order.version.
+Sockets get a full snapshot when they connect (see orders.consumers). After
+that, each change is sent as an `order_patch` that holds only the top-level
+fields that differ from the previous version (`base_version`). A client
+applies a patch only when its copy of the order is at `base_version`; if
+not, it has missed something and sends {"type": "request_snapshot"}. When
+this process does not know the previous payload (first update after a
+restart, or the previous one was sent by another worker), the full order
+goes out as an `order_update` instead.
+
+Every published order is also handed to the in-memory live board
+(orders.live_board) that the polling endpoints read from.
+
+Bill changes (a discount, coins, the payment) go out the same way, queued
+with orders.outbox.queue_bill_event(): one `bill_update` per bill and
+transaction, serialized once and sent once to each audience group. A batch
+settlement sends a single summary bill_update for all of its bills.
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict, deque
+
+from channels.layers import get_channel_layer
+from django.db.models import F, Q
+
+from .live_board import BOARD_STATUSES, board as live_board
+
+logger = logging.getLogger(__name__)
+
+KITCHEN_GROUP = 'kitchen_orders'
+BILLING_GROUP = 'unpaid_bills'
+
+
+def customer_group(customer_id):
+    return f'customer_{customer_id}'
+
+
+def _order_serializer():
+    # Imported lazily to avoid a circular import with orders.serializers.
+    from .serializers import OrderSerializer
+    return OrderSerializer
+
+
+# The canonical message shape for each audience. Kitchen screens and the
+# customer's order tracker both render what their REST endpoints return
+# (kitchen-display/ and status/<id>/), which is OrderSerializer, so an order
+# is serialized once and the same payload goes to both groups.
+AUDIENCES = {
+    'kitchen': _order_serializer,
+    'customer': _order_serializer,
+}
+
+
+class BroadcastStats:
+    """Process-wide counters of logical order events and the messages they caused."""
+
+    def __init__(self, history=50):
+        self._lock = threading.Lock()
+        self._history = history
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events = 0
+            self.messages = 0
+            self.serializations = 0
+            self.messages_by_audience = Counter()
+            self.recent_events = deque(maxlen=self._history)
+
+    def record(self, order_id, messages_by_audience, serializations, kind='order'):
+        sent = sum(messages_by_audience.values())
+        with self._lock:
+            self.events += 1
+            self.messages += sent
+            self.serializations += serializations
+            self.messages_by_audience.update(messages_by_audience)
+            self.recent_events.append({f'{kind}_id': order_id, 'messages': sent})
+        logger.debug("%s #%s broadcast: %s message(s), %s serialization(s)", kind.title(), order_id, sent, serializations)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'events': self.events,
+                'messages': self.messages,
+                'serializations': self.serializations,
+                'messages_per_event': round(self.messages / self.events, 2) if self.events else 0,
+                'messages_by_audience': dict(self.messages_by_audience),
+                'recent_events': list(self.recent_events),
+            }
+
+
+stats = BroadcastStats()
+
+
+def order_update_message(payload):
+    return {
+        'type': 'order_update',  # This corresponds to the method name in the consumer
+        'order': payload,
+    }
+
+
+def order_patch_message(order_id, version, base_version, changes):
+    return {
+        'type': 'order_patch',
+        'order_id': order_id,
+        'version': version,
+        'base_version': base_version,
+        'changes': changes,
+    }
+
+
+# The last payload published per (message shape, order), used as the base
+# for the next patch. Bounded so long-running workers do not grow forever.
+LAST_PAYLOAD_CACHE_SIZE = 2000
+_last_payloads = OrderedDict()
+_last_payloads_lock = threading.Lock()
+
+
+def _delta_message(serializer_class, order_id, payload):
+    """Builds a patch against the previously published payload, or a full update."""
+    key = (serializer_class, order_id)
+    with _last_payloads_lock:
+        previous = _last_payloads.pop(key, None)
+        _last_payloads[key] = payload
+        while len(_last_payloads) > LAST_PAYLOAD_CACHE_SIZE:
+            _last_payloads.popitem(last=False)
+
+    if previous is None or previous.get('version') != payload['version'] - 1:
+        return order_update_message(payload)
+
+    changes = {
+        field: value for field, value in payload.items()
+        if field != 'version' and previous.get(field) != value
+    }
+    return order_patch_message(order_id, payload['version'], previous['version'], changes)
+
+
+def publish_order_events(order_ids):
+    """Serializes the given orders in one batch and sends each one to its audiences."""
+    from .models import Order
+
+    if not order_ids:
+        return
+
+    # Each published change is a new version of the order. A single UPDATE
+    # keeps the counter correct across worker processes.
+    Order.objects.filter(id__in=order_ids).update(version=F('version') + 1)
+
+    orders = _order_serializer().setup_eager_loading(Order.objects.filter(id__in=order_ids))
+    for order in orders:
+        payloads = {}
+        messages = {}
+        sent = Counter()
+
+        groups = [('kitchen', KITCHEN_GROUP)]
+        if order.customer_id:
+            groups.append(('customer', customer_group(order.customer_id)))
+
+        for audience, group_name in groups:
+            serializer_class = AUDIENCES[audience]()
+            if serializer_class not in messages:
+                payloads[serializer_class] = serializer_class(order).data
+                messages[serializer_class] = _delta_message(serializer_class, order.id, payloads[serializer_class])
+            send_to_group(group_name, messages[serializer_class])
+            sent[audience] += 1
+
+        stats.record(order.id, sent, len(messages))
+        live_board.apply(order, payloads)
+
+
+def bill_update_message(message, payload):
+    return {
+        'type': 'bill_update',
+        'message': message,
+        'bill': payload,
+    }
+
+
+def publish_bill_event(bill_id, message):
+    """
+    Sends one bill_update for a bill whose discount, coins or payment changed:
+    serialized once, sent once to the billing screens and once to each
+    customer with an order on the bill. Orders of the bill still on the
+    kitchen display are republished as order events, so the kitchen and the
+    live board see the new bill too.
+    """
+    from billing.models import Bill
+    from billing.serializers import BillSerializer
+
+    bill = BillSerializer.setup_eager_loading(Bill.objects.filter(id=bill_id)).first()
+    if bill is None:
+        return
+    orders = bill.orders.all()
+    message = bill_update_message(message, BillSerializer(bill).data)
+
+    sent = Counter()
+    send_to_group(BILLING_GROUP, message)
+    sent['billing'] += 1
+    for customer_id in sorted({order.customer_id for order in orders if order.customer_id}):
+        send_to_group(customer_group(customer_id), message)
+        sent['customer'] += 1
+    stats.record(bill.id, sent, 1, kind='bill')
+
+    publish_order_events([order.id for order in orders if order.status in BOARD_STATUSES])
+
+
+def publish_settlement_event(bill_ids, message):
+    """
+    The summary of a batch settlement (billing.settlement): a single
+    bill_update listing the paid bills goes to the billing screens, and one
+    to each customer with an order on any of them, instead of one message
+    per bill. Orders of those bills still on the kitchen display are
+    republished in one batch.
+    """
+    from .models import Order
+
+    if not bill_ids:
+        return
+    orders = list(Order.objects.filter(bill_id__in=bill_ids).values_list('id', 'customer_id', 'status'))
+    message = bill_update_message(message, None)
+    message['bill_ids'] = list(bill_ids)
+
+    sent = Counter()
+    send_to_group(BILLING_GROUP, message)
+    sent['billing'] += 1
+    for customer_id in sorted({customer_id for _, customer_id, _ in orders if customer_id}):
+        send_to_group(customer_group(customer_id), message)
+        sent['customer'] += 1
+    stats.record(list(bill_ids), sent, 0, kind='settlement')
+
+    publish_order_events([order_id for order_id, _, status in orders if status in BOARD_STATUSES])
+
+
+def kitchen_snapshot():
+    """The full state a kitchen socket starts from: every order on the kitchen display."""
+    from .utils import get_kitchen_display_orders
+
+    serializer_class = AUDIENCES['kitchen']()
+    orders = serializer_class.setup_eager_loading(get_kitchen_display_orders())
+    return serializer_class(orders, many=True).data
+
+
+def customer_snapshot(customer_id):
+    """The full state a customer socket starts from: their active and unpaid orders."""
+    from .models import Order
+    from .utils import ACTIVE_ORDER_STATUSES
+
+    serializer_class = AUDIENCES['customer']()
+    orders = Order.objects.filter(customer_id=customer_id).filter(
+        Q(status__in=ACTIVE_ORDER_STATUSES) | Q(status='Served', bill__is_paid=False)
+    ).order_by('created_at')
+    return serializer_class(serializer_class.setup_eager_loading(orders), many=True).data
+
+
+# The ASGI server's event loop, recorded by backend.asgi. The in-memory
+# channel layer only works from the loop its consumers run on.
+_server_loop = None
+# Sends scheduled from the loop's own thread, kept until they finish.
+_pending_sends = set()
+SEND_TIMEOUT = 5
+
+
+def use_event_loop(loop):
+    """Records the event loop the ASGI server runs the consumers on."""
+    global _server_loop
+    _server_loop = loop
+
+
+def _send_done(task):
+    _pending_sends.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Channel layer send failed", exc_info=task.exception())
+
+
+def send_to_group(group_name, message):
+    """
+    Hands a message to the channel layer.
+
+    Under the ASGI server the send runs on the server's event loop; the
+    outbox's publisher thread waits for it so a failure is logged. Elsewhere
+    (management commands, scripts) it is sent on a loop of its own.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    loop = _server_loop
+    if loop is None or not loop.is_running():
+        # asyncio.run rather than async_to_sync: the outbox's exit flush runs
+        # after the thread pools async_to_sync needs have shut down.
+        asyncio.run(channel_layer.group_send(group_name, message))
+        return
+
+    try:
+        on_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        on_loop = False
+    if on_loop:
+        task = loop.create_task(channel_layer.group_send(group_name, message))
+        _pending_sends.add(task)
+        task.add_done_callback(_send_done)
+        return
+
+    future = asyncio.run_coroutine_threadsafe(channel_layer.group_send(group_name, message), loop)
+    try:
+        future.result(timeout=SEND_TIMEOUT)
+    except Exception:
+        future.cancel()
+        logger.exception("Sending to group %s failed", group_name)
@@ -0,0 +1,32 @@
+# orders/business_day.py
+"""
+The restaurant's "business day". Service runs past midnight, so anything
+before BUSINESS_DAY_CUTOFF_HOUR (local time) still belongs to the previous
+day: an order at 1:30 AM on the 11th is part of the 10th's business.
+
+Kept free of model imports so any app can use it.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+BUSINESS_DAY_CUTOFF_HOUR = 5
+
+
+def business_date(value=None):
+    """The business day an aware datetime (default: now) belongs to."""
+    value = timezone.localtime(value) if value is not None else timezone.localtime()
+    return (value - timedelta(hours=BUSINESS_DAY_CUTOFF_HOUR)).date()
+
+
+def business_day_start(day=None):
+    """The moment a business day (default: the current one) opens."""
+    if day is None:
+        day = business_date()
+    return timezone.make_aware(datetime.combine(day, time(hour=BUSINESS_DAY_CUTOFF_HOUR)))
+
+
+def business_day_range(first_day, last_day=None):
+    """[start, end) datetimes covering the business days first_day..last_day inclusive."""
+    last_day = last_day or first_day
+    return business_day_start(first_day), business_day_start(last_day) + timedelta(days=1)
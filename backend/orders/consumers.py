@@ -1,19 +1,72 @@
 # orders/consumers.py
 
 import json
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from decimal import Decimal
+from rest_framework.exceptions import AuthenticationFailed
+from accounts.async_api import authentication
+from customers.models import Customer
+from .broadcast import kitchen_snapshot, customer_snapshot
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
             # Convert Decimal to a string to ensure it's JSON serializable
             return str(obj)
         return super(DecimalEncoder, self).default(obj)
-class OrderConsumer(AsyncWebsocketConsumer):
+
+
+class OrderStreamMixin:
+    """
+    The versioned order protocol shared by the kitchen and customer sockets
+    (see orders.broadcast):
+
+    * on connect the client gets {'type': 'snapshot', 'orders': [...]},
+    * then 'order_patch' messages carrying only the changed fields, or an
+      'order_update' with the full order when no patch base is available,
+    * a client that sees a gap sends {'type': 'request_snapshot'} and gets
+      a fresh snapshot back.
+    """
+
+    async def get_snapshot(self):
+        """The serialized orders this socket starts from; each consumer defines its own."""
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content, cls=DecimalEncoder))
+
+    async def send_snapshot(self):
+        orders = await self.get_snapshot()
+        await self.send_json({'type': 'snapshot', 'orders': orders})
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            content = json.loads(text_data or '{}')
+        except json.JSONDecodeError:
+            return
+        if content.get('type') == 'request_snapshot':
+            await self.send_snapshot()
+
+    # Called for 'order_update' messages sent to the group: a full order.
+    async def order_update(self, event):
+        await self.send_json({
+            'type': 'order_update',
+            'order': event['order']
+        })
+
+    # Called for 'order_patch' messages sent to the group: only what changed.
+    async def order_patch(self, event):
+        await self.send_json({
+            'type': 'order_patch',
+            'order_id': event['order_id'],
+            'version': event['version'],
+            'base_version': event['base_version'],
+            'changes': event['changes'],
+        })
+
+
+class OrderConsumer(OrderStreamMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        print("OrderConsumer.connect called!")
-        print(f"WebSocket connect called: {self.channel_name}")
-        
         # This group name is where all order updates will be sent.
         self.room_group_name = 'kitchen_orders'
 
@@ -24,45 +77,70 @@ class OrderConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        await self.send_snapshot()
 
     async def disconnect(self, close_code):
-        print("OrderConsumer.disconnect called!")
-        print(f"WebSocket disconnect called: {self.channel_name}")
-        
         # Leave the room group
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    # This method is called when a message is sent to the 'kitchen_orders' group.
-    async def order_update(self, event):
-        print("OrderConsumer.order_update called!")
+    async def get_snapshot(self):
+        return await database_sync_to_async(kitchen_snapshot)()
 
-        # Lazy import here to avoid AppRegistryNotReady error
-        from .serializers import OrderSerializer
 
-        # The 'event' dictionary contains the data sent from the signal.
-        order_data = event['order']
+async def socket_user(scope):
+    """
+    The user behind a socket: the session user (AuthMiddlewareStack), or the
+    one whose JWT access token is passed as ?token= (browsers cannot set an
+    Authorization header on a WebSocket). None if neither checks out.
+    """
+    user = scope.get('user')
+    if user is not None and user.is_authenticated:
+        return user
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    try:
+        return await authentication.aget_user(authentication.get_validated_token(token.encode()))
+    except AuthenticationFailed:
+        return None
 
-        # Send the order data to the WebSocket client (the frontend).
-        await self.send(text_data=json.dumps({
-            'type': 'order_update',
-            'order': order_data
-        }, cls=DecimalEncoder)) 
 
-class CustomerConsumer(AsyncWebsocketConsumer):
+class CustomerConsumer(OrderStreamMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.customer_id = self.scope['url_route']['kwargs']['customer_id']
+        self.room_group_name = None
+
+        # The snapshot and updates carry the customer's orders and phone
+        # number, so only that customer may listen.
+        user = await socket_user(self.scope)
+        if user is None or not await Customer.objects.filter(
+            pk=self.customer_id, phone_number=user.username
+        ).aexists():
+            await self.close()
+            return
+
         self.room_group_name = f'customer_{self.customer_id}'
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
+        await self.send_snapshot()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if self.room_group_name:
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-    async def order_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'order_update',
-            'order': event['order']
-        }, cls=DecimalEncoder))
\ No newline at end of file
+    async def get_snapshot(self):
+        return await database_sync_to_async(customer_snapshot)(self.customer_id)
+
+    # Called for 'bill_update' messages: a bill with one of this customer's
+    # orders got a discount, coins or was paid (see publish_bill_event), or a
+    # batch settlement paid several bills at once ('bill_ids', no 'bill').
+    async def bill_update(self, event):
+        await self.send_json({
+            'type': 'bill_update',
+            'message': event['message'],
+            'bill': event['bill'],
+            'bill_ids': event.get('bill_ids'),
+        })
@@ -0,0 +1,148 @@
+# orders/idempotency.py
+"""
+Idempotency-Key support for the order-creating endpoints.
+
+A client that may retry a POST (customer phones on flaky Wi-Fi, a double
+tapped "Pay" button) sends the same `Idempotency-Key` header on every attempt.
+The first attempt runs the view as usual. Its successful response is kept
+for IDEMPOTENCY_KEY_TTL seconds, and any replay of the key gets that response
+back (with an `Idempotent-Replayed: true` header) without running the view
+again. A replay that arrives while the first attempt is still running waits
+for it instead of placing a second order.
+
+Keys are scoped to the user and the endpoint. Reusing a key with a different
+request body is rejected. Failed attempts are not stored, so the client can
+retry them with the same key.
+
+The keys live in the orders.IdempotencyKey table, whose unique (user, path,
+key) constraint decides which attempt gets to run, so retries that land on
+different worker processes are caught too. A claim whose attempt never
+finished (the worker died) is given up after IDEMPOTENCY_CLAIM_TIMEOUT
+seconds.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# How often a waiting duplicate looks at the first attempt's row again.
+POLL_INTERVAL = 0.1
+
+
+def _seconds_from_now(seconds):
+    return timezone.now() + timedelta(seconds=seconds)
+
+
+def _claim(user, path, key, fingerprint):
+    """
+    Claims the key. Returns ('run', row) when the caller should run the
+    view, or ('replay', row) / ('mismatch', row) / ('wait', row) when someone
+    already has it.
+    """
+    IdempotencyKey.objects.filter(user=user, path=path, key=key, expires_at__lte=timezone.now()).delete()
+    try:
+        with transaction.atomic():
+            row = IdempotencyKey.objects.create(
+                user=user, path=path, key=key, fingerprint=fingerprint,
+                expires_at=_seconds_from_now(getattr(settings, 'IDEMPOTENCY_CLAIM_TIMEOUT', 5 * 60)),
+            )
+        return 'run', row
+    except IntegrityError:
+        pass
+
+    row = IdempotencyKey.objects.filter(user=user, path=path, key=key).first()
+    if row is None:
+        # Released (a failed attempt) or expired between the insert and the read.
+        return 'wait', None
+    if row.fingerprint != fingerprint:
+        return 'mismatch', row
+    if row.status_code is not None:
+        return 'replay', row
+    return 'wait', row
+
+
+def _finish(row, response):
+    if response is None:
+        # Failed attempts are simply forgotten so the key can be retried.
+        row.delete()
+        return
+    row.status_code, row.response = response
+    row.expires_at = _seconds_from_now(getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60))
+    row.save(update_fields=['status_code', 'response', 'expires_at'])
+
+
+def purge_expired():
+    """Deletes the keys that can no longer be replayed. Returns how many."""
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(row):
+    return Response(row.response, status=row.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view):
+    """
+    Makes a function view honour the Idempotency-Key header. Put it under
+    @api_view/@permission_classes so it runs after authentication.
+    Requests without the header are not affected.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        path = request.path[:255]
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 30)
+
+        while True:
+            outcome, row = _claim(request.user, path, key, fingerprint)
+            if outcome == 'run':
+                break
+            if outcome == 'replay':
+                return _replay(row)
+            if outcome == 'mismatch':
+                return Response(
+                    {'error': f'This {IDEMPOTENCY_HEADER} was already used with a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            # Another request with this key is running: wait for it, then look again.
+            if time.monotonic() >= deadline:
+                return Response(
+                    {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(POLL_INTERVAL)
+
+        stored = None
+        try:
+            response = view(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                stored = (response.status_code, response.data)
+            return response
+        finally:
+            _finish(row, stored)
+
+    return wrapper
@@ -0,0 +1,228 @@
+# orders/ingestion.py
+"""
+Write-batching ingestion of new orders for the dinner rush.
+
+Normally each place_order / place_pos_order request writes its order in its
+own transaction, and on SQLite every one of those transactions queues for
+the single database write lock. With ORDER_INGESTION_BATCHING on, a request
+that has validated its order hands the serializer to this queue instead and
+waits. One writer thread takes whatever has queued up (up to
+ORDER_INGESTION_MAX_BATCH orders, waiting at most ORDER_INGESTION_MAX_WAIT
+seconds for more) and writes the whole group in one transaction. Each order
+gets its own savepoint, so an order that runs out of stock fails on its own.
+Once the group commits, every waiting request gets back its order (or its
+error) and answers as before.
+
+Like the live board, the queue lives in the process memory. Orders placed
+from inside an open transaction (management commands, tests) bypass it and
+are written directly, because the writer could not see that transaction.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .utils import update_inventory_for_order
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionTimeout(Exception):
+    """The order was still queued when the caller stopped waiting; it was not written."""
+    pass
+
+
+def write_order(serializer):
+    """Saves a validated OrderWriteSerializer and takes its stock out of the pantry."""
+    order = serializer.save()
+    update_inventory_for_order(order, action='deduct')
+    return order
+
+
+class _Job:
+    __slots__ = ('serializer', 'state', 'order', 'error', 'done', 'queued_at')
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.state = 'queued'  # -> 'taken' by the writer, or 'abandoned' by the caller
+        self.order = None
+        self.error = None
+        self.done = threading.Event()
+        self.queued_at = time.monotonic()
+
+
+class OrderIngestionQueue:
+    def __init__(self, history=50):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._history = history
+        self.reset()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'ORDER_INGESTION_BATCHING', False)
+
+    @property
+    def max_batch(self):
+        return getattr(settings, 'ORDER_INGESTION_MAX_BATCH', 20)
+
+    @property
+    def max_wait(self):
+        return getattr(settings, 'ORDER_INGESTION_MAX_WAIT', 0.005)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'ORDER_INGESTION_TIMEOUT', 30)
+
+    def reset(self):
+        with self._lock:
+            self.submitted = 0
+            self.written = 0
+            self.failed = 0
+            self.abandoned = 0
+            self.batches = 0
+            self.max_depth = 0
+            self.batch_sizes = Counter()
+            self.write_seconds = 0.0
+            self.wait_seconds = 0.0
+            self.recent_batches = []
+
+    # --- Callers ---
+
+    def place(self, serializer):
+        """
+        Writes a validated OrderWriteSerializer and returns the new order,
+        through the queue when batching is on. Raises what writing the order
+        raised (e.g. InsufficientStockError), or IngestionTimeout.
+        """
+        if not self.enabled or transaction.get_connection().in_atomic_block:
+            with transaction.atomic():
+                return write_order(serializer)
+
+        job = _Job(serializer)
+        self._ensure_writer()
+        self._queue.put(job)
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+        if not job.done.wait(self.timeout):
+            with self._lock:
+                if job.state == 'queued':
+                    job.state = 'abandoned'
+                    self.abandoned += 1
+                    raise IngestionTimeout("The order queue is backed up; the order was not placed. Please retry.")
+            # The writer already has it; its group is being written right now.
+            job.done.wait()
+
+        if job.error is not None:
+            raise job.error
+        return job.order
+
+    # --- The writer ---
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name='order-ingestion', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Order ingestion writer failed on a batch of %s", len(batch))
+
+    def _take(self, job):
+        with self._lock:
+            if job.state != 'queued':
+                return False
+            job.state = 'taken'
+            return True
+
+    def _collect(self):
+        """Blocks for the first order, then gathers more for up to max_wait seconds."""
+        batch = []
+        while not batch:
+            job = self._queue.get()
+            if self._take(job):
+                batch.append(job)
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if self._take(job):
+                batch.append(job)
+        return batch
+
+    def _write(self, batch):
+        started = time.monotonic()
+        try:
+            # Inside the try: if even this fails, the callers must still get
+            # an error and be released rather than wait forever.
+            close_old_connections()
+            with transaction.atomic():
+                # Registered first, so the callers are released as soon as the
+                # group commits, before the order broadcasts queued after it run.
+                transaction.on_commit(lambda: self._release(batch))
+                for job in batch:
+                    try:
+                        with transaction.atomic():
+                            job.order = write_order(job.serializer)
+                    except Exception as e:
+                        job.error = e
+        except Exception as e:
+            # The group's commit failed: none of its orders were written.
+            for job in batch:
+                job.order, job.error = None, e
+        finally:
+            self._release(batch)
+        finished = time.monotonic()
+
+        failed = sum(1 for job in batch if job.error is not None)
+        with self._lock:
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            self.written += len(batch) - failed
+            self.failed += failed
+            self.write_seconds += finished - started
+            self.wait_seconds += sum(started - job.queued_at for job in batch)
+            self.recent_batches = (self.recent_batches + [{
+                'size': len(batch), 'failed': failed, 'ms': round((finished - started) * 1000, 1),
+            }])[-self._history:]
+
+    def _release(self, batch):
+        for job in batch:
+            job.done.set()
+
+    def snapshot(self):
+        with self._lock:
+            taken = self.written + self.failed
+            return {
+                'enabled': self.enabled,
+                'writer_alive': self._writer is not None and self._writer.is_alive(),
+                'depth': self._queue.qsize(),
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'written': self.written,
+                'failed': self.failed,
+                'abandoned': self.abandoned,
+                'batches': self.batches,
+                'average_batch_size': round(taken / self.batches, 2) if self.batches else 0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'average_write_ms': round(self.write_seconds / self.batches * 1000, 2) if self.batches else 0,
+                'average_queue_wait_ms': round(self.wait_seconds / taken * 1000, 2) if taken else 0,
+                'recent_batches': list(self.recent_batches),
+            }
+
+
+ingestion = OrderIngestionQueue()
@@ -0,0 +1,304 @@
+# orders/live_board.py
+"""
+An in-memory board of the active (Pending / Preparing / Ready) orders.
+
+The kitchen display, kitchen queue, live orders and staff screens poll for the
+same handful of active orders every few seconds. Instead of querying and
+serializing them on every poll, this process keeps them in memory, already
+serialized and indexed by status and business day:
+
+* the board loads itself from the database on first use;
+* orders.broadcast hands it every order it publishes, so creates, status
+  changes and cancellations land on the board right after they commit;
+* a status change is also applied by the saving thread itself on commit
+  (see orders.signals), so this process never serves the old status while
+  the outbox has yet to publish the change;
+* other worker processes publish their own changes, so at most every
+  LIVE_BOARD_CHECK_INTERVAL seconds a read first compares the board with
+  the database in one aggregate query (count, ids and versions of the
+  active orders; every published change bumps Order.version) and reloads
+  it when they differ. LIVE_BOARD_MAX_AGE is the safety net for writes
+  made behind the app's back (e.g. a raw UPDATE);
+* `select()` returns None when the board is disabled (LIVE_BOARD_ENABLED =
+  False) or cannot be loaded, and the views then read from the database
+  as before;
+* `verify()` re-reads the active orders and compares them with the board
+  (see the /api/orders/live-board/ endpoint).
+
+Each process keeps its own board; the check above keeps a board at most
+a check interval behind the changes made by the other processes.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Sum
+
+from .business_day import business_date
+
+logger = logging.getLogger(__name__)
+
+BOARD_STATUSES = ('Pending', 'Preparing', 'Ready')
+
+
+def _shapes():
+    # Imported lazily to avoid a circular import with orders.serializers.
+    from .serializers import OrderSerializer, RecentOrderSerializer
+    return {'order': OrderSerializer, 'recent': RecentOrderSerializer}
+
+
+class _Entry:
+    __slots__ = ('id', 'status', 'business_date', 'is_pos_order', 'created_at', 'version', 'payloads')
+
+    def __init__(self, order, payloads):
+        self.id = order.id
+        self.status = order.status
+        self.business_date = order.business_date
+        self.is_pos_order = order.is_pos_order
+        self.created_at = order.created_at
+        self.version = order.version
+        self.payloads = payloads
+
+
+class LiveBoard:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        self.loaded_at = None
+        self.checked_at = None
+        self.hits = 0
+        self.fallbacks = 0
+        self.loads = 0
+        self.checks = 0
+
+    def _clear(self):
+        self._entries = {}
+        self._by_status = defaultdict(set)
+        self._by_day = defaultdict(set)
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'LIVE_BOARD_ENABLED', True)
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'LIVE_BOARD_MAX_AGE', 300)
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'LIVE_BOARD_CHECK_INTERVAL', 1)
+
+    def _is_fresh(self, now):
+        return self.loaded_at is not None and now - self.loaded_at < self.max_age
+
+    def is_warm(self):
+        """Whether the board can answer without looking at the database first."""
+        now = time.monotonic()
+        return self._is_fresh(now) and now - self.checked_at < self.check_interval
+
+    # --- Loading and updates ---
+
+    def _active_orders(self):
+        from .models import Order
+        from .serializers import OrderSerializer
+        return OrderSerializer.setup_eager_loading(Order.objects.filter(status__in=BOARD_STATUSES))
+
+    def _matches_database(self):
+        """
+        Whether the board still holds the active orders of the database, at
+        the same versions. False when it was never loaded or is too old.
+        """
+        from .models import Order
+
+        now = time.monotonic()
+        if not self._is_fresh(now):
+            return False
+        totals = Order.objects.filter(status__in=BOARD_STATUSES).aggregate(
+            orders=Count('id'), ids=Sum('id'), versions=Sum('version')
+        )
+        with self._lock:
+            board = {
+                'orders': len(self._entries),
+                'ids': sum(self._entries),
+                'versions': sum(entry.version for entry in self._entries.values()),
+            }
+            self.checks += 1
+        if board != {name: value or 0 for name, value in totals.items()}:
+            logger.debug("Live board is behind the database; reloading")
+            return False
+        self.checked_at = now
+        return True
+
+    def _serialize(self, order, known_payloads=None):
+        known_payloads = known_payloads or {}
+        return {
+            shape: known_payloads.get(serializer_class) or serializer_class(order).data
+            for shape, serializer_class in _shapes().items()
+        }
+
+    def load(self):
+        """Replaces the board with the active orders as they are in the database."""
+        with self._lock:
+            entries = [_Entry(order, self._serialize(order)) for order in self._active_orders()]
+            self._clear()
+            for entry in entries:
+                self._put(entry)
+            self.loaded_at = self.checked_at = time.monotonic()
+            self.loads += 1
+        logger.debug("Live board loaded with %s active order(s)", len(entries))
+
+    def _put(self, entry):
+        self._entries[entry.id] = entry
+        self._by_status[entry.status].add(entry.id)
+        self._by_day[entry.business_date].add(entry.id)
+
+    def _remove(self, order_id):
+        entry = self._entries.pop(order_id, None)
+        if entry is not None:
+            self._by_status[entry.status].discard(order_id)
+            self._by_day[entry.business_date].discard(order_id)
+        return entry
+
+    def apply(self, order, known_payloads=None):
+        """
+        Brings one freshly read order up to date on the board: it is added or
+        replaced while active and dropped once it is served or cancelled.
+        `known_payloads` ({serializer class: data}) saves re-serializing what
+        the caller already has.
+        """
+        if self.loaded_at is None:
+            # Nothing to update yet; the first read loads everything.
+            return
+        active = order.status in BOARD_STATUSES
+        entry = _Entry(order, self._serialize(order, known_payloads)) if active else None
+        with self._lock:
+            current = self._entries.get(order.id)
+            if current is not None and current.version > order.version:
+                # A newer version of this order was applied by another thread.
+                return
+            self._remove(order.id)
+            if entry is not None:
+                self._put(entry)
+
+    def refresh(self, order_id):
+        """
+        Re-reads one order and applies it. The saving thread calls this on
+        commit when an order changes status, so this process serves the new
+        status right away rather than after the outbox has published it.
+        """
+        if not self.enabled or self.loaded_at is None:
+            return
+        from .models import Order
+        from .serializers import OrderSerializer
+        order = OrderSerializer.setup_eager_loading(Order.objects.filter(pk=order_id)).first()
+        if order is None:
+            self.discard(order_id)
+        else:
+            self.apply(order)
+
+    def discard(self, order_id):
+        with self._lock:
+            self._remove(order_id)
+
+    # --- Reads ---
+
+    def _ensure_loaded(self):
+        if not self.enabled:
+            return False
+        if self.is_warm():
+            return True
+        try:
+            if not self._matches_database():
+                self.load()
+            return True
+        except Exception:
+            logger.exception("Could not load the live board; reading from the database instead")
+            return False
+
+    def select(self, statuses, shape='order', today_only=False, exclude_pos=False, newest_first=False):
+        """
+        The serialized orders in `statuses`, oldest first (or newest first),
+        optionally limited to the current business day and to non-POS orders.
+        Returns None when the board cannot answer and the caller should use
+        the database.
+        """
+        if not self._ensure_loaded():
+            self.fallbacks += 1
+            return None
+        return self._pick(statuses, shape, today_only, exclude_pos, newest_first)
+
+    async def aselect(self, statuses, shape='order', today_only=False, exclude_pos=False, newest_first=False):
+        """
+        select() for the async views. A warm board is read right on the event
+        loop; only checking or (re)loading it, which reads the database,
+        goes through a worker thread.
+        """
+        if not (self.enabled and self.is_warm()):
+            if not await sync_to_async(self._ensure_loaded)():
+                self.fallbacks += 1
+                return None
+        return self._pick(statuses, shape, today_only, exclude_pos, newest_first)
+
+    def _pick(self, statuses, shape, today_only, exclude_pos, newest_first):
+        with self._lock:
+            ids = set().union(*(self._by_status[status] for status in statuses))
+            if today_only:
+                ids &= self._by_day[business_date()]
+            entries = [self._entries[order_id] for order_id in ids]
+            self.hits += 1
+        if exclude_pos:
+            entries = [entry for entry in entries if not entry.is_pos_order]
+        entries.sort(key=lambda entry: (entry.created_at, entry.id), reverse=newest_first)
+        return [entry.payloads[shape] for entry in entries]
+
+    # --- Consistency check ---
+
+    def verify(self, repair=False):
+        """
+        Compares the board with a fresh read of the active orders, payloads
+        included. With repair=True the board is reloaded afterwards.
+        """
+        fresh = {order.id: self._serialize(order) for order in self._active_orders()}
+        with self._lock:
+            loaded = self.loaded_at is not None
+            board = {order_id: entry.payloads for order_id, entry in self._entries.items()}
+
+        missing = sorted(set(fresh) - set(board))
+        unexpected = sorted(set(board) - set(fresh))
+        stale = sorted(
+            order_id for order_id in set(fresh) & set(board)
+            if fresh[order_id] != board[order_id]
+        )
+        report = {
+            'loaded': loaded,
+            'consistent': loaded and not (missing or unexpected or stale),
+            'active_orders': len(fresh),
+            'board_orders': len(board),
+            'missing': missing,
+            'unexpected': unexpected,
+            'stale': stale,
+        }
+        if repair:
+            self.load()
+            report['repaired'] = True
+        return report
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'warm': self.is_warm(),
+                'orders': len(self._entries),
+                'by_status': {status: len(ids) for status, ids in self._by_status.items() if ids},
+                'age_seconds': round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+                'loads': self.loads,
+                'checks': self.checks,
+                'hits': self.hits,
+                'fallbacks': self.fallbacks,
+            }
+
+
+board = LiveBoard()
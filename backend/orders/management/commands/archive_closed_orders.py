@@ -0,0 +1,52 @@
+# orders/management/commands/archive_closed_orders.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from orders.archive import archive_closed
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves paid bills older than --days business days (default: ARCHIVE_AFTER_DAYS), "
+        "with their served/cancelled orders and items, into the archive tables, along with "
+        "cancelled orders from before the same cutoff that never got a bill. "
+        "With --every HOURS it keeps running and archives again on that schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive bills paid more than this many business days ago.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Bills moved per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+        parser.add_argument('--every', type=float, metavar='HOURS', help="Run on a schedule, every HOURS hours.")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if not options['every']:
+            self.run_once(options)
+            return
+
+        self.stdout.write(f"Archiving every {options['every']} hour(s); stop with Ctrl+C.")
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(options)
+                time.sleep(options['every'] * 3600)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def run_once(self, options):
+        started = time.perf_counter()
+        totals = archive_closed(days=options['days'], batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['bills']} bill(s), {totals['orders']} order(s) "
+            f"({totals['unbilled_orders']} cancelled without a bill) and {totals['items']} item(s) "
+            f"from before {totals['cutoff']} ({time.perf_counter() - started:.1f}s)."
+        ))
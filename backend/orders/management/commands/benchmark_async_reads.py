@@ -0,0 +1,174 @@
+# orders/management/commands/benchmark_async_reads.py
+
+import asyncio
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing import async_views as billing_async_views, views as billing_views
+from billing.models import Bill
+from customers.models import Customer
+from inventory.models import Ingredient
+from menu import async_views as menu_async_views
+from menu.models import Category, Dish, DishIngredient
+from menu.views import DishViewSet
+from orders import async_views as orders_async_views, views as orders_views
+from orders.live_board import board as live_board
+from orders.models import Order, OrderItem
+from tables.models import Table
+
+# (name, URL pattern, sync view, async view)
+ENDPOINTS = [
+    ('dish list', 'dishes/', DishViewSet.as_view({'get': 'list'}), menu_async_views.dish_list),
+    ('kitchen display', 'kitchen-display/', orders_views.kitchen_display_orders, orders_async_views.kitchen_display_orders),
+    ('order status', 'status/<int:order_id>/', orders_views.get_order_status, orders_async_views.get_order_status),
+    ('unpaid bills', 'myunpaid/', billing_views.customer_unpaid_bills, billing_async_views.customer_unpaid_bills),
+    ('bill details', 'customer/<int:bill_id>/', billing_views.get_bill_details, billing_async_views.get_bill_details),
+]
+
+
+class BenchmarkURLConf:
+    urlpatterns = [
+        path(f'{variant}/{route}', view)
+        for _, route, sync_view, async_view in ENDPOINTS
+        for variant, view in (('sync', sync_view), ('async', async_view))
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the sync (DRF) and native async versions of the hot read endpoints "
+        "side by side through the ASGI handler, with --concurrency requests in flight. "
+        "It commits a small set of fixtures (a customer with bills and active orders, "
+        "a few dishes) and deletes them again at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and variant.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once.")
+        parser.add_argument('--orders', type=int, default=20, help="Active orders in the fixtures.")
+        parser.add_argument('--dishes', type=int, default=40, help="Dishes in the fixtures.")
+
+    def handle(self, *args, **options):
+        fixtures = self.fixtures(options['orders'], options['dishes'])
+        try:
+            # A plain event loop, as under uvicorn (async_to_sync would send
+            # every thread-sensitive call back to this thread).
+            with override_settings(ROOT_URLCONF=BenchmarkURLConf):
+                asyncio.run(self.run(fixtures, options['requests'], options['concurrency']))
+        finally:
+            self.cleanup(fixtures)
+
+    async def run(self, fixtures, requests, concurrency):
+        headers = {'Authorization': f"Bearer {fixtures['token']}", 'Accept': 'application/json'}
+        self.stdout.write(
+            f"{requests} requests per run, {concurrency} in flight.\n\n"
+            f"{'endpoint':<16} {'variant':<7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'threads':>8}"
+        )
+        for name, route, _, _ in ENDPOINTS:
+            url = route.replace('<int:order_id>', str(fixtures['order_id'])).replace(
+                '<int:bill_id>', str(fixtures['bill_id'])
+            )
+            bodies = {}
+            for variant in ('sync', 'async'):
+                bodies[variant] = await self.first_response(f'/{variant}/{url}', headers)
+                result = await self.load(f'/{variant}/{url}', headers, requests, concurrency)
+                self.stdout.write(
+                    f"{name:<16} {variant:<7} {result[0]:>8.0f} {result[1] * 1000:>8.1f} "
+                    f"{result[2] * 1000:>8.1f} {result[3]:>8}"
+                )
+            if bodies['sync'] != bodies['async']:
+                self.stdout.write(self.style.WARNING(f"  {name}: the sync and async responses differ"))
+
+    async def first_response(self, url, headers):
+        # Also warms up the URL resolver, the live board and the connections.
+        response = await AsyncClient().get(url, headers=headers)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} answered {response.status_code}: {response.content[:200]!r}")
+        return response.json()
+
+    async def load(self, url, headers, requests, concurrency):
+        pending = iter(range(requests))
+        latencies = []
+        peak_threads = threading.active_count()
+
+        async def worker():
+            nonlocal peak_threads
+            client = AsyncClient()
+            for _ in pending:
+                started = time.perf_counter()
+                # Like the ASGI handler does per request: sync code of one
+                # request shares a thread, separate requests get their own.
+                async with ThreadSensitiveContext():
+                    response = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} answered {response.status_code}")
+                peak_threads = max(peak_threads, threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return (
+            len(latencies) / elapsed,
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.95)],
+            peak_threads,
+        )
+
+    def fixtures(self, order_count, dish_count):
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        phone = f"b{uuid.uuid4().int % 10 ** 12:012d}"
+        user = User.objects.create(username=phone)
+        customer = Customer.objects.create(phone_number=phone)
+        category = Category.objects.create(name=tag)
+        ingredient = Ingredient.objects.create(name=tag, current_stock=Decimal('1000'), unit='pcs')
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"{tag}-{i}", price=Decimal('10.00'), category=category, food_type='veg')
+            for i in range(dish_count)
+        )
+        DishIngredient.objects.bulk_create(
+            DishIngredient(dish=dish, ingredient=ingredient, quantity_required=Decimal('1.00')) for dish in dishes
+        )
+        # bulk_create skips Table.save(), which would render a QR code image.
+        table = Table.objects.bulk_create([Table(table_number=random.randint(10 ** 8, 10 ** 9))])[0]
+
+        # A few unpaid bills, each with some of the active orders.
+        bills = [Bill.objects.create(table=table) for _ in range(max(1, order_count // 4))]
+        orders = Order.objects.bulk_create(
+            Order(
+                customer=customer, table_number=table.table_number, bill=bills[i % len(bills)],
+                status=random.choice(['Pending', 'Preparing', 'Ready']),
+            )
+            for i in range(order_count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, dish=dish, quantity=2)
+            for order in orders for dish in random.sample(dishes, min(3, len(dishes)))
+        )
+        live_board.load()
+        return {
+            'user': user, 'customer': customer, 'category': category, 'ingredient': ingredient,
+            'table': table, 'bills': bills, 'token': str(AccessToken.for_user(user)),
+            'order_id': orders[0].id, 'bill_id': bills[0].id,
+        }
+
+    def cleanup(self, fixtures):
+        Order.objects.filter(customer=fixtures['customer']).delete()
+        Bill.objects.filter(id__in=[bill.id for bill in fixtures['bills']]).delete()
+        fixtures['table'].delete()
+        fixtures['customer'].delete()
+        fixtures['user'].delete()
+        fixtures['category'].delete()
+        fixtures['ingredient'].delete()
+        live_board.load()
@@ -0,0 +1,128 @@
+# orders/management/commands/benchmark_order_ingestion.py
+
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from customers.models import Customer
+from inventory.models import Ingredient
+from menu.models import Category, Dish, DishIngredient
+from orders.ingestion import ingestion
+from orders.models import Order
+from orders.views import place_pos_order
+
+
+class Command(BaseCommand):
+    help = (
+        "Places POS orders from --concurrency threads at once, first with every order "
+        "in its own transaction and then through the write-batching ingestion queue, "
+        "and reports orders/sec for both. The fixtures and orders it commits are "
+        "deleted again at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=400, help="Orders to place per mode.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Threads placing orders at once.")
+        parser.add_argument('--items', type=int, default=3, help="Dishes per order.")
+
+    def handle(self, *args, **options):
+        fixtures = self.fixtures(options['items'])
+        try:
+            self.stdout.write(
+                f"{options['orders']} orders per mode, {options['concurrency']} threads, {options['items']} items each.\n\n"
+                f"{'mode':<9} {'orders/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}"
+            )
+            for mode, batching in (('direct', False), ('batched', True)):
+                ingestion.reset()
+                with override_settings(ORDER_INGESTION_BATCHING=batching):
+                    rate, p50, p95, errors = self.run(fixtures, options['orders'], options['concurrency'])
+                self.stdout.write(f"{mode:<9} {rate:>9.0f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {sum(errors.values()):>7}")
+                for message, count in errors.most_common(3):
+                    self.stdout.write(f"          {count} x {message[:100]}")
+                if batching:
+                    stats = ingestion.snapshot()
+                    self.stdout.write(
+                        f"          {stats['batches']} groups, {stats['average_batch_size']} orders per group "
+                        f"(sizes {stats['batch_sizes']}), max queue depth {stats['max_depth']}, "
+                        f"{stats['average_write_ms']} ms per group write"
+                    )
+        finally:
+            self.cleanup(fixtures)
+
+    def run(self, fixtures, count, concurrency):
+        factory = APIRequestFactory()
+        payload = {
+            'customer': fixtures['customer'].id,
+            'table_number': 1,
+            'items': [{'dish': dish.id, 'quantity': 1} for dish in fixtures['dishes']],
+        }
+        pending = iter(range(count))
+        lock = threading.Lock()
+        latencies = []
+        errors = Counter()
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if next(pending, None) is None:
+                            return
+                    request = factory.post('/api/orders/pos-place/', payload, format='json')
+                    force_authenticate(request, user=fixtures['staff'])
+                    started = time.perf_counter()
+                    response = place_pos_order(request)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 201:
+                            errors[str(response.data.get('error', response.data))] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        placed = len(latencies) - sum(errors.values())
+        return (
+            placed / elapsed,
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.95)],
+            errors,
+        )
+
+    def fixtures(self, item_count):
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        staff = User.objects.create(username=tag, is_staff=True)
+        customer = Customer.objects.create(phone_number=tag[-15:])
+        category = Category.objects.create(name=tag, is_point_of_sale_only=True)
+        ingredient = Ingredient.objects.create(name=tag, current_stock=Decimal('10000000'), unit='pcs')
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"{tag}-{i}", price=Decimal('10.00'), category=category, food_type='veg')
+            for i in range(item_count)
+        )
+        DishIngredient.objects.bulk_create(
+            DishIngredient(dish=dish, ingredient=ingredient, quantity_required=Decimal('1.00')) for dish in dishes
+        )
+        return {
+            'staff': staff, 'customer': customer, 'category': category,
+            'ingredient': ingredient, 'dishes': dishes,
+        }
+
+    def cleanup(self, fixtures):
+        Order.objects.filter(customer=fixtures['customer']).delete()
+        for name in ('customer', 'category', 'ingredient', 'staff'):
+            fixtures[name].delete()
@@ -0,0 +1,160 @@
+# orders/management/commands/benchmark_order_queries.py
+
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from customers.models import Customer
+from orders.business_day import business_date, business_day_start
+from orders.models import Order
+from orders.utils import ACTIVE_ORDER_STATUSES
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows the query plan and timing of the hot order queries, in their old "
+        "created_at__date form and their business_date/range form. With --orders N "
+        "it first inserts N synthetic orders spread over --days days, inside a "
+        "transaction that is rolled back at the end (unless --keep)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=0, help="Synthetic orders to insert first (e.g. 1000000).")
+        parser.add_argument('--days', type=int, default=365, help="Days of history the synthetic orders cover.")
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the best time is reported.")
+        parser.add_argument('--keep', action='store_true', help="Commit the synthetic orders instead of rolling back.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['orders']:
+                self.seed(options['orders'], options['days'], options['customers'])
+            self.stdout.write(f"{Order.objects.count()} orders in the table.\n")
+            queries = self.queries()
+
+            # "before" runs the old query forms against the table as it was,
+            # without the indexes added for them; "after" runs the new forms
+            # with the indexes back in place.
+            with self.without_order_indexes():
+                before = [self.measure(old, options['repeat']) for _, old, _ in queries]
+            after = [self.measure(new, options['repeat']) for _, _, new in queries]
+
+            for (title, _, _), old_result, new_result in zip(queries, before, after):
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.report('before', *old_result)
+                self.report('after', *new_result)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def queries(self):
+        now = timezone.now()
+        today = business_date()
+        customer = Order.objects.order_by('-id').values_list('customer_id', flat=True).first()
+        return [
+            (
+                "Today's order count (dashboard summary)",
+                Order.objects.filter(created_at__date=now.date()),
+                Order.objects.filter(business_date=today),
+            ),
+            (
+                "Today's active orders (live orders)",
+                Order.objects.filter(created_at__date=now.date(), status__in=ACTIVE_ORDER_STATUSES).order_by('created_at'),
+                Order.objects.filter(business_date=today, status__in=ACTIVE_ORDER_STATUSES).order_by('created_at'),
+            ),
+            (
+                "Kitchen display",
+                Order.objects.filter(
+                    status__in=ACTIVE_ORDER_STATUSES, created_at__gte=business_day_start(), is_pos_order=False
+                ).order_by('created_at'),
+                Order.objects.filter(
+                    business_date=today, status__in=ACTIVE_ORDER_STATUSES, is_pos_order=False
+                ).order_by('created_at'),
+            ),
+            (
+                "Kitchen queue (staff orders)",
+                Order.objects.filter(status__in=['Pending', 'Preparing']).order_by('created_at'),
+                Order.objects.filter(status__in=['Pending', 'Preparing']).order_by('created_at'),
+            ),
+            (
+                "A customer's order history",
+                Order.objects.filter(customer_id=customer).order_by('-created_at'),
+                Order.objects.filter(customer_id=customer).order_by('-created_at'),
+            ),
+        ]
+
+    @contextmanager
+    def without_order_indexes(self):
+        # Only used to render the DROP/CREATE INDEX statements; entering a
+        # schema editor is not allowed inside the benchmark's transaction on SQLite.
+        editor = connection.SchemaEditorClass(connection)
+        editor.deferred_sql = []
+        indexes = Order._meta.indexes
+        with connection.cursor() as cursor:
+            for index in indexes:
+                cursor.execute(str(index.remove_sql(Order, editor)))
+            try:
+                yield
+            finally:
+                for index in indexes:
+                    cursor.execute(str(index.create_sql(Order, editor)))
+
+    def measure(self, queryset, repeat):
+        queryset = queryset.values_list('id', flat=True)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(list(queryset.all()))  # a fresh clone, not the cached result
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, rows, queryset.explain()
+
+    def report(self, label, elapsed, rows, plan):
+        plan = plan.replace('\n', '\n             ')
+        self.stdout.write(f"  {label:<7} {elapsed * 1000:9.2f} ms  {rows} row(s)\n             {plan}")
+
+    def seed(self, count, days, customers):
+        tag = uuid.uuid4().hex[:6]
+        Customer.objects.bulk_create(
+            Customer(phone_number=f"b{tag}{i:07d}") for i in range(customers)
+        )
+        customer_ids = list(
+            Customer.objects.filter(phone_number__startswith=f"b{tag}").values_list('id', flat=True)
+        )
+
+        fields = [Order._meta.get_field(name) for name in (
+            'customer', 'created_at', 'status', 'table_number', 'is_pos_order', 'version', 'business_date',
+        )]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(Order._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+
+        now = timezone.now()
+        span = days * 24 * 3600
+        started = time.perf_counter()
+        rows = []
+        with connection.cursor() as cursor:
+            for i in range(count):
+                created_at = now - timedelta(seconds=random.randint(0, span))
+                # Most history is done with; only the last hours still have work in flight.
+                if now - created_at < timedelta(hours=3):
+                    order_status = random.choice(ACTIVE_ORDER_STATUSES + ['Served'])
+                else:
+                    order_status = 'Cancelled' if random.random() < 0.05 else 'Served'
+                values = (
+                    random.choice(customer_ids), created_at, order_status,
+                    random.randint(1, 20), random.random() < 0.3, 0, business_date(created_at),
+                )
+                rows.append([field.get_db_prep_save(value, connection) for field, value in zip(fields, values)])
+                if len(rows) == 10000 or i == count - 1:
+                    cursor.executemany(sql, rows)
+                    rows = []
+        self.stdout.write(f"Inserted {count} synthetic orders in {time.perf_counter() - started:.1f}s.")
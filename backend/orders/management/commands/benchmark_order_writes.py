@@ -0,0 +1,87 @@
+# orders/management/commands/benchmark_order_writes.py
+
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from customers.models import Customer
+from inventory.models import Ingredient
+from menu.models import Category, Dish, DishIngredient
+from orders.views import place_pos_order, repeat_order
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures queries and latency of placing a POS order and repeating it, "
+        "for tickets of growing size. Everything it writes is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, nargs='+', default=[1, 10, 50, 200],
+            help="Ticket sizes (distinct dishes per order) to measure.",
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per size; the best time is reported.")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            staff, dishes, customer = self.fixtures(max(options['items']))
+
+            self.stdout.write(f"{'items':>6} {'place queries':>14} {'place ms':>9} {'repeat queries':>15} {'repeat ms':>10}")
+            for size in options['items']:
+                payload = {
+                    'customer': customer.id,
+                    'table_number': 1,
+                    'items': [{'dish': dish.id, 'quantity': 1} for dish in dishes[:size]],
+                }
+                place = self.measure(options['repeat'], lambda: self.call(
+                    place_pos_order, factory.post('/api/orders/pos-place/', payload, format='json'), staff
+                ))
+                order_id = place[2].data['id']
+                again = self.measure(options['repeat'], lambda: self.call(
+                    repeat_order, factory.post(f'/api/orders/repeat/{order_id}/'), staff, order_id=order_id
+                ))
+                self.stdout.write(
+                    f"{size:>6} {place[0]:>14} {place[1] * 1000:>9.1f} {again[0]:>15} {again[1] * 1000:>10.1f}"
+                )
+
+            transaction.set_rollback(True)
+
+    def fixtures(self, dish_count):
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        staff = User.objects.create(username=tag, is_staff=True)
+        customer = Customer.objects.create(phone_number=tag[-15:])
+        category = Category.objects.create(name=tag, is_point_of_sale_only=True)
+        ingredient = Ingredient.objects.create(name=tag, current_stock=Decimal('1000000'), unit='pcs')
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"{tag}-{i}", price=Decimal('10.00'), category=category, food_type='veg')
+            for i in range(dish_count)
+        )
+        DishIngredient.objects.bulk_create(
+            DishIngredient(dish=dish, ingredient=ingredient, quantity_required=Decimal('1.00')) for dish in dishes
+        )
+        return staff, dishes, customer
+
+    def call(self, view, request, user, **kwargs):
+        force_authenticate(request, user=user)
+        response = view(request, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{view.__name__} failed: {response.status_code} {response.data}")
+        return response
+
+    def measure(self, runs, action):
+        best = None
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = action()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries.captured_queries), best, response
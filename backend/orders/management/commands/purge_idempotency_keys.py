@@ -0,0 +1,15 @@
+# orders/management/commands/purge_idempotency_keys.py
+
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the Idempotency-Key records that can no longer be replayed "
+        "(older than IDEMPOTENCY_KEY_TTL). Run it from cron, e.g. hourly."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Deleted {purge_expired()} expired idempotency key(s)."))
@@ -0,0 +1,133 @@
+# orders/management/commands/stress_stock_reservation.py
+
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+
+from customers.models import Customer
+from inventory.models import Ingredient
+from menu.models import Category, Dish, DishIngredient
+from orders.models import Order
+from orders.serializers import OrderWriteSerializer
+from orders.utils import update_inventory_for_order, InsufficientStockError
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency harness for stock reservation: fires many parallel orders at "
+        "one scarce ingredient and checks that its stock never goes negative. "
+        "It creates (and afterwards deletes) its own dish, ingredient and customer, "
+        "so point it at a scratch database rather than production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=20, help="Starting stock of the scarce ingredient.")
+        parser.add_argument('--workers', type=int, default=16, help="Number of threads placing orders at once.")
+        parser.add_argument('--orders-per-worker', type=int, default=5)
+        parser.add_argument('--quantity', type=int, default=1, help="Dishes per order.")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated rows for inspection.")
+
+    def handle(self, *args, **options):
+        tag = f"stress-{uuid.uuid4().hex[:8]}"
+        initial_stock = Decimal(options['stock'])
+        quantity = options['quantity']
+
+        category = Category.objects.create(name=tag, is_point_of_sale_only=True)
+        dish = Dish.objects.create(name=tag, price=Decimal('10.00'), category=category, food_type='veg')
+        ingredient = Ingredient.objects.create(name=tag, current_stock=initial_stock, unit='pcs')
+        DishIngredient.objects.create(dish=dish, ingredient=ingredient, quantity_required=Decimal('1.00'))
+        customer = Customer.objects.create(phone_number=tag[-15:])
+
+        results = {'placed': 0, 'out_of_stock': 0, 'db_locked': 0, 'other_errors': []}
+        results_lock = threading.Lock()
+        lowest_seen = [initial_stock]
+        start = threading.Barrier(options['workers'] + 1)
+        done = threading.Event()
+
+        def record(key):
+            with results_lock:
+                results[key] += 1
+
+        def place_orders():
+            try:
+                start.wait()
+                for _ in range(options['orders_per_worker']):
+                    serializer = OrderWriteSerializer(data={
+                        'customer': customer.id,
+                        'table_number': 0,
+                        'items': [{'dish': dish.id, 'quantity': quantity}],
+                    })
+                    serializer.is_valid(raise_exception=True)
+                    try:
+                        # Same steps as place_order / place_pos_order.
+                        with transaction.atomic():
+                            order = serializer.save()
+                            update_inventory_for_order(order, action='deduct')
+                        record('placed')
+                    except InsufficientStockError:
+                        record('out_of_stock')
+                    except OperationalError:
+                        # SQLite refuses concurrent writers it cannot queue; the order simply failed.
+                        record('db_locked')
+                    except Exception as e:
+                        with results_lock:
+                            results['other_errors'].append(str(e))
+            finally:
+                connection.close()
+
+        def watch_stock():
+            try:
+                while not done.is_set():
+                    stock = Ingredient.objects.filter(id=ingredient.id).values_list('current_stock', flat=True).first()
+                    if stock is not None and stock < lowest_seen[0]:
+                        lowest_seen[0] = stock
+                    time.sleep(0.005)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=place_orders) for _ in range(options['workers'])]
+        watcher = threading.Thread(target=watch_stock)
+        for thread in workers:
+            thread.start()
+        watcher.start()
+
+        started_at = time.perf_counter()
+        start.wait()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+        done.set()
+        watcher.join()
+
+        ingredient.refresh_from_db()
+        final_stock = ingredient.current_stock
+        orders_in_db = Order.objects.filter(customer=customer).count()
+        attempted = options['workers'] * options['orders_per_worker']
+
+        self.stdout.write(f"Attempted orders:       {attempted} in {elapsed:.2f}s")
+        self.stdout.write(f"Placed:                 {results['placed']} ({orders_in_db} rows in the database)")
+        self.stdout.write(f"Rejected, out of stock: {results['out_of_stock']}")
+        self.stdout.write(f"Rejected, db locked:    {results['db_locked']}")
+        self.stdout.write(f"Stock: {initial_stock} -> {final_stock} (lowest seen {min(lowest_seen[0], final_stock)})")
+
+        problems = list(results['other_errors'][:5])
+        if final_stock < 0 or lowest_seen[0] < 0:
+            problems.append("stock went negative")
+        if initial_stock - final_stock != results['placed'] * quantity:
+            problems.append("stock used does not match the number of placed orders")
+        if orders_in_db != results['placed']:
+            problems.append("a rejected order was left in the database")
+
+        if not options['keep']:
+            Order.objects.filter(customer=customer).delete()
+            customer.delete()
+            category.delete()  # cascades to the dish and its recipe line
+            ingredient.delete()
+
+        if problems:
+            raise CommandError("Stock reservation check FAILED: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Stock reservation check passed: no overselling."))
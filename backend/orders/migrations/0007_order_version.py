@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped each time an update for this order is broadcast; WebSocket patches are based on it.'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:28
+
+from datetime import timedelta
+
+import orders.business_day
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def backfill_business_date(apps, schema_editor):
+    # One UPDATE per business day, each a created_at range the
+    # (created_at, id) index can serve.
+    Order = apps.get_model('orders', 'Order')
+    bounds = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return
+    day = orders.business_day.business_date(bounds['first'])
+    last_day = orders.business_day.business_date(bounds['last'])
+    while day <= last_day:
+        start, end = orders.business_day.business_day_range(day)
+        Order.objects.filter(created_at__gte=start, created_at__lt=end).update(business_date=day)
+        day += timedelta(days=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_bill_paid_business_date'),
+        ('customers', '0003_customer_loyalty_coins'),
+        ('orders', '0008_order_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='business_date',
+            field=models.DateField(default=orders.business_day.business_date, help_text="The business day (5 AM cutoff) the order was placed on; lets 'today' queries use an index."),
+        ),
+        migrations.RunPython(backfill_business_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['business_date', 'status'], name='order_bday_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),
+        ),
+    ]
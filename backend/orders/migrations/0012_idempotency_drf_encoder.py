@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:35
+
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+def forget_stored_responses(apps, schema_editor):
+    # Responses stored with the old encoder would replay with Decimals as
+    # strings; they are only kept for an hour anyway.
+    apps.get_model('orders', 'IdempotencyKey').objects.filter(response__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='response',
+            field=models.JSONField(blank=True, encoder=rest_framework.utils.encoders.JSONEncoder, null=True),
+        ),
+        migrations.RunPython(forget_stored_responses, migrations.RunPython.noop),
+    ]
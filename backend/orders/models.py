@@ -1,7 +1,13 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Sum
+from rest_framework.utils.encoders import JSONEncoder
 from customers.models import Customer
 from menu.models import Dish
-from billing.models import Bill
+from billing.models import Bill, ArchivedBill
+from . import business_day
 
 ORDER_STATUS = [
     ('Pending', 'Pending'),
@@ -27,10 +33,64 @@ class Order(models.Model):
         null=True, 
         blank=True
     )
+    business_date = models.DateField(
+        default=business_day.business_date,
+        help_text="The business day (5 AM cutoff) the order was placed on; lets 'today' queries use an index."
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped each time an update for this order is broadcast; WebSocket patches are based on it."
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the order history walks (created_at, id),
+            # optionally narrowed to one status first.
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_id_idx'),
+            # "Today's orders", optionally narrowed by status.
+            models.Index(fields=['business_date', 'status'], name='order_bday_status_idx'),
+            # A customer's own order history, newest first.
+            models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),
+        ]
+
     def __str__(self):
         # Update the string representation to use the new field
         return f"Order #{self.id} (Table {self.table_number})"
 
+    def save(self, *args, **kwargs):
+        # The version belongs to orders.broadcast, which bumps it with an
+        # UPDATE after commit. A full save of a copy loaded before that must
+        # not write the old number back, so it leaves the column out.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'version'
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # Remember which bill total the order was counted in when loaded, so
+        # saving it can move that total (see orders.signals).
+        if 'bill_id' in order.__dict__ and 'status' in order.__dict__:
+            order._billed_to = order.billed_to
+        if 'status' in order.__dict__:
+            order._loaded_status = order.status
+        return order
+
+    @property
+    def billed_to(self):
+        """The id of the bill whose subtotal includes this order: its bill, unless it was cancelled."""
+        return None if self.status == 'Cancelled' else self.bill_id
+
+    def items_total(self):
+        """Sum of quantity * dish price over the order's items, in one query."""
+        return self.items.aggregate(
+            total=Sum(F('quantity') * F('dish__price'), output_field=models.DecimalField())
+        )['total'] or Decimal('0.00')
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
@@ -39,3 +99,71 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.dish.name} x{self.quantity}"
 
+
+class ArchivedOrder(models.Model):
+    """
+    A served or cancelled order of a paid bill, or a cancelled order that
+    never got one, moved out of Order by `manage.py archive_closed_orders`.
+    Same columns, same id; the history views and the sales reports read
+    both tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=ORDER_STATUS, default='Served')
+    table_number = models.PositiveIntegerField()
+    is_pos_order = models.BooleanField(default=False)
+    bill = models.ForeignKey(ArchivedBill, on_delete=models.CASCADE, related_name='orders', null=True, blank=True)
+    business_date = models.DateField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archived_order_created_id_idx'),
+            models.Index(fields=['customer', 'created_at'], name='archived_order_customer_idx'),
+            models.Index(fields=['business_date', 'status'], name='archived_order_bday_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} (Table {self.table_number})"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.dish.name} x{self.quantity}"
+
+
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key claimed by a request to an order-placing endpoint
+    (orders/idempotency.py). While the first attempt runs `response` is
+    empty; once it succeeded it holds the response to replay. Kept in the
+    database so every worker process sees the same keys.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    path = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Encoded the way DRF's JSONRenderer encodes (Decimal as float, full
+    # microseconds), so a replay renders the same body as the original.
+    response = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'path', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.path})"
@@ -0,0 +1,219 @@
+# orders/outbox.py
+"""
+Outbox for order (and bill) change events.
+
+Saving an Order no longer talks to the channel layer directly. The change is
+queued here into the current transaction's batch, and the batch is handed
+over once the transaction commits, as one unit: repeated saves of the same
+order become one event, the latest message per bill wins.
+
+Every queued event registers its own transaction.on_commit() hook, so
+Django itself drops the events of a rolled-back transaction or savepoint.
+The hooks of one commit run one after the other; each adds its event to
+the batch, and the hook of the last event queued hands the batch over.
+(If that last event was rolled back with a savepoint, the batch goes out
+with the thread's next event, or after BATCH_GRACE seconds at the latest.)
+Outside a transaction an event is handed over straight away.
+
+Committed batches go to a single background publisher thread, which calls
+orders.broadcast: it bumps the order versions, re-reads and serializes the
+committed state and sends it. None of that is part of the request; the
+request's commit only appends to an in-memory queue.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from functools import partial
+
+from django.db import connections, transaction
+
+from .broadcast import publish_bill_event, publish_order_events, publish_settlement_event
+
+logger = logging.getLogger(__name__)
+
+# How long a batch whose last hook never ran waits before it is published anyway.
+BATCH_GRACE = 0.5
+
+_local = threading.local()
+
+
+class _Batch:
+    """The events of one transaction."""
+
+    def __init__(self):
+        self.queued = 0  # on_commit hooks registered for this batch
+        self.committed_at = None  # when the first of them ran
+        self.submitted = False
+        # Dicts keep insertion order and ignore repeats of the same order / bill.
+        self.order_ids = {}
+        self.bills = {}  # bill id -> the latest message about it
+        self.settlements = []  # (bill ids, message) per batch settlement
+
+    def add(self, kind, key, message):
+        if kind == 'order':
+            self.order_ids[key] = None
+        elif kind == 'bill':
+            self.bills[key] = message
+        else:
+            self.settlements.append((key, message))
+
+
+class _Publisher:
+    """Publishes committed batches from one daemon thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._open = set()  # committed batches still waiting for their last hook
+
+    def submit(self, batch):
+        with self._lock:
+            if batch.submitted:
+                return
+            batch.submitted = True
+            self._open.discard(batch)
+        self._start()
+        self._queue.put(batch)
+
+    def add(self, batch, kind, key, message):
+        """Adds an event to a batch that has not been handed over yet; False if it has."""
+        with self._lock:
+            if batch.submitted:
+                return False
+            batch.add(kind, key, message)
+            return True
+
+    def hold(self, batch):
+        """Keeps a batch whose last hook may never run, to publish it after BATCH_GRACE."""
+        self._start()
+        with self._lock:
+            if not batch.submitted:
+                self._open.add(batch)
+
+    def flush(self):
+        """Waits until everything committed so far has been published."""
+        with self._lock:
+            held = list(self._open)
+        for batch in held:
+            self.submit(batch)
+        if self._thread is not None:
+            self._queue.join()
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name='orders-outbox', daemon=True)
+                thread.start()
+                self._thread = thread
+                # Don't lose what is still queued when a management command exits.
+                atexit.register(self.flush)
+
+    def _release_held(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [batch for batch in self._open if now - batch.committed_at >= BATCH_GRACE]
+        for batch in due:
+            self.submit(batch)
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._queue.get(timeout=BATCH_GRACE)
+            except queue.Empty:
+                self._release_held()
+                continue
+            try:
+                self._publish(batch)
+            except Exception:
+                logger.exception("Publishing a batch of order/bill events failed")
+            finally:
+                # This thread outlives any request, so don't keep its connection open.
+                connections.close_all()
+                self._queue.task_done()
+
+    def _publish(self, batch):
+        publish_order_events(list(batch.order_ids))
+        for bill_id, message in batch.bills.items():
+            publish_bill_event(bill_id, message)
+        for bill_ids, message in batch.settlements:
+            publish_settlement_event(bill_ids, message)
+
+
+_publisher = _Publisher()
+
+
+def flush():
+    """Blocks until every committed event has been published (for commands and scripts)."""
+    _publisher.flush()
+
+
+def _committed(batch, index, kind, key, message):
+    # Runs on commit, in the committing thread, once per surviving event.
+    if not _publisher.add(batch, kind, key, message):
+        # The batch already went out after BATCH_GRACE (other commit hooks
+        # were slow); this event follows on its own.
+        late = _Batch()
+        late.add(kind, key, message)
+        _publisher.submit(late)
+        return
+    if batch.committed_at is None:
+        batch.committed_at = time.monotonic()
+    if index == batch.queued - 1:
+        if getattr(_local, 'batch', None) is batch:
+            _local.batch = None
+        _publisher.submit(batch)
+    else:
+        _publisher.hold(batch)
+
+
+def _queue(kind, key, message=None):
+    if not transaction.get_connection().in_atomic_block:
+        # Nothing to wait for (this includes events queued by a commit hook).
+        batch = _Batch()
+        batch.add(kind, key, message)
+        _publisher.submit(batch)
+        return
+
+    batch = getattr(_local, 'batch', None)
+    if batch is not None and batch.committed_at is not None:
+        # That transaction committed, but its last event was rolled back
+        # with a savepoint, so nothing handed the batch over.
+        _publisher.submit(batch)
+        batch = None
+    if batch is None:
+        # (A batch left by a transaction that rolled back entirely has no
+        # committed events and is simply carried on.)
+        batch = _local.batch = _Batch()
+    index = batch.queued
+    batch.queued += 1
+    transaction.on_commit(partial(_committed, batch, index, kind, key, message))
+
+
+def queue_order_event(order_id):
+    """
+    Records that an order changed. The event is published after the commit
+    (straight away outside a transaction), once however many times the order
+    was saved in the transaction.
+    """
+    _queue('order', order_id)
+
+
+def queue_bill_event(bill_id, message):
+    """
+    Records that a bill changed (`message` is the text shown on the billing
+    screen). Like queue_order_event: published after commit, once per bill.
+    """
+    _queue('bill', bill_id, message)
+
+
+def queue_settlement_event(bill_ids, message):
+    """
+    Records that a batch of bills was settled together. Published after
+    commit as one summary bill_update (see publish_settlement_event).
+    """
+    _queue('settlement', list(bill_ids), message)
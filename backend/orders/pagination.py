@@ -0,0 +1,87 @@
+# orders/pagination.py
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for order lists, newest first.
+
+    The queryset must be ordered by ('-created_at', '-id'). Instead of an
+    OFFSET, each page continues strictly after the last (created_at, id) pair
+    of the previous one, so fetching page 500 costs the same as page 1 and
+    can be answered from the (created_at, id) indexes on Order.
+
+    Responses look like {"next": <url or null>, "results": [...]}; pass the
+    `next` URL back to get the following page.
+
+    A list of querysets (the live and the archived orders) can be paginated
+    as one stream: each gets the same cursor filter and limit, and the rows
+    are merged by (created_at, id). Ids are unique across those tables.
+    """
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(order):
+        raw = f"{order.created_at.isoformat()}|{order.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(order_id)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, order_id = self.decode_cursor(cursor)
+            querysets = [
+                queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+                for queryset in querysets
+            ]
+
+        # Fetch one extra row to know whether there is a next page.
+        page = [order for queryset in querysets for order in queryset[:page_size + 1]]
+        if len(querysets) > 1:
+            page.sort(key=lambda order: (order.created_at, order.id), reverse=True)
+            page = page[:page_size + 1]
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -1,7 +1,8 @@
 # orders/serializers.py
 
 from rest_framework import serializers
-from django.db.models import Sum, F, DecimalField
+from rest_framework.exceptions import ErrorDetail
+from django.db.models import Sum, F, DecimalField, Prefetch
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from decimal import Decimal
 from menu.models import Dish
@@ -73,6 +74,28 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['id', 'dish', 'quantity']
 
+def is_prefetched(obj, relation):
+    """True when `relation` was loaded with prefetch_related() for this instance."""
+    return relation in getattr(obj, '_prefetched_objects_cache', {})
+
+def get_order_items_total(order):
+    """
+    Sum of quantity * dish price for an order. Uses the prefetched items when
+    the order was loaded for a list, otherwise falls back to one aggregate query.
+    """
+    if is_prefetched(order, 'items'):
+        total = sum((item.quantity * item.dish.price for item in order.items.all()), Decimal('0.00'))
+    else:
+        total = order.items.aggregate(
+            total=Sum(F('quantity') * F('dish__price'), output_field=DecimalField())
+        )['total']
+    return total or 0.00
+
+def order_items_prefetch(order_model=Order):
+    """The items of each order with their dish; also works for ArchivedOrder querysets."""
+    item_model = order_model._meta.get_field('items').related_model
+    return Prefetch('items', queryset=item_model.objects.select_related('dish'))
+
 class MinimalBillSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bill
@@ -92,24 +115,53 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             'id', 'customer', 'status', 'created_at', 'items', 
-            'table_number', 'bill', 'payment_status', 'total_amount'
+            'table_number', 'bill', 'payment_status', 'total_amount', 'version'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Loads the orders together with their customer, items, dishes and bill
+        (including the bill's own orders) so that serializing a list costs the
+        same fixed number of queries no matter how many orders it contains.
+        """
+        order_model = queryset.model  # Order, or ArchivedOrder for the archive
+        return queryset.select_related(
+            'customer', 'bill__table', 'bill__applied_discount'
+        ).prefetch_related(
+            order_items_prefetch(order_model),
+            Prefetch('bill__orders', queryset=order_model.objects.prefetch_related(order_items_prefetch(order_model))),
+        )
+
     def get_payment_status(self, obj):
         if obj.bill and obj.bill.is_paid:
             return "Paid"
         return "Unpaid"
 
     def get_total_amount(self, obj):
-        total = obj.items.aggregate(
-            total=Sum(F('quantity') * F('dish__price'), output_field=DecimalField())
-        )['total']
-        return total or 0.00
+        return get_order_items_total(obj)
 
 # ====================================================================
 #  Write-Only Serializer (For POS and Customer Orders)
 # ====================================================================
+class DishIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts a dish id but only checks its type. The dishes of a whole order
+    are looked up together in OrderWriteSerializer.validate_items.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class OrderItemWriteSerializer(serializers.ModelSerializer):
+    dish = DishIdField(queryset=Dish.objects.all())
+
     class Meta:
         model = OrderItem
         fields = ['dish', 'quantity']
@@ -124,11 +176,28 @@ class OrderWriteSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['customer', 'table_number', 'items']
 
+    def validate_items(self, items):
+        # One query for every dish on the ticket instead of one per line.
+        dishes = Dish.objects.in_bulk({item['dish'] for item in items})
+        errors = []
+        for item in items:
+            dish = dishes.get(item['dish'])
+            if dish is None:
+                message = DishIdField.default_error_messages['does_not_exist'].format(pk_value=item['dish'])
+                errors.append({'dish': [ErrorDetail(message, code='does_not_exist')]})
+            else:
+                item['dish'] = dish
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, **item_data) for item_data in items_data
+        )
         return order
 
 # ====================================================================
@@ -148,16 +217,17 @@ class RecentOrderSerializer(serializers.ModelSerializer):
             'status', 'payment_status', 'created_at', 'items'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer', 'bill').prefetch_related(order_items_prefetch(queryset.model))
+
     def get_payment_status(self, obj):
         if hasattr(obj, 'bill') and obj.bill and obj.bill.is_paid:
             return "Paid"
         return "Unpaid"
 
     def get_total_amount(self, obj):
-        total = obj.items.aggregate(
-            total=Sum(F('quantity') * F('dish__price'), output_field=DecimalField())
-        )['total']
-        return total or 0.00
+        return get_order_items_total(obj)
     
     def get_discount_amount(self, obj):
         if hasattr(obj, 'bill') and obj.bill:
@@ -194,6 +264,10 @@ class DashboardOrderSerializer(serializers.ModelSerializer):
             'total_amount', 'tax_amount', 'total_discount', 'final_amount', 'bill'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer', 'bill').prefetch_related(order_items_prefetch(queryset.model))
+
     def get_total_discount(self, obj):
         # Safely access bill and its fields, providing defaults if they don't exist
         if hasattr(obj, 'bill') and obj.bill:
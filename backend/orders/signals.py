@@ -1,34 +1,78 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from billing.models import Bill
 from .models import Order
+from .outbox import queue_order_event
+from .live_board import board as live_board
 
-# DO NOT import the serializer at the top of the file
 
 @receiver(post_save, sender=Order)
 def order_status_update(sender, instance, **kwargs):
     """
-    Signal handler to send order updates to WebSocket groups
-    whenever an Order instance is saved.
+    Signal handler that queues a WebSocket update whenever an Order instance
+    is saved. The outbox merges repeated saves and publishes after commit.
+    """
+    queue_order_event(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def refresh_live_board(sender, instance, created, **kwargs):
+    """
+    Puts a status change on this process's live board as soon as it commits,
+    instead of waiting for the outbox publisher (which bumps the version
+    the board's staleness check looks at).
     """
-    # --- FIX 1: Import the serializer locally, inside the function ---
-    from .serializers import OrderSerializer
-
-    channel_layer = get_channel_layer()
-    
-    # Serialize the order instance to send as JSON
-    serializer = OrderSerializer(instance)
-    
-    message = {
-        'type': 'order_update', # This corresponds to the method name in the consumer
-        'order': serializer.data
-    }
-
-    # Broadcast to the general kitchen group
-    async_to_sync(channel_layer.group_send)('kitchen_orders', message)
-
-    # --- FIX 2: Also broadcast to the specific customer's group ---
-    if instance.customer:
-        customer_group_name = f'customer_{instance.customer.id}'
-        async_to_sync(channel_layer.group_send)(customer_group_name, message)
\ No newline at end of file
+    before = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if created or before is None or before == instance.status:
+        return
+    transaction.on_commit(partial(live_board.refresh, instance.pk), robust=True)
+
+
+_UNKNOWN = object()
+
+
+def _unpaid_bill(order, bill_id):
+    """The bill with `bill_id` if it is still open; the order's own bill object when it is that one."""
+    if bill_id is None:
+        return None
+    if Order.bill.is_cached(order) and order.bill is not None and order.bill.pk == bill_id:
+        bill = order.bill
+        return None if bill.is_paid else bill
+    return Bill.objects.filter(pk=bill_id, is_paid=False).first()
+
+
+@receiver(post_save, sender=Order)
+def keep_bill_subtotal(sender, instance, created, **kwargs):
+    """
+    Keeps the running subtotal of open bills in step: when an order is
+    linked to a bill, moved to another one, cancelled or restored, its total
+    is added to or taken off the bill. Paid bills are left as they were.
+    """
+    before = None if created else getattr(instance, '_billed_to', _UNKNOWN)
+    after = instance.billed_to
+    instance._billed_to = after
+    if before == after:
+        return
+
+    if before is _UNKNOWN:
+        # Not loaded through the ORM (e.g. bulk_create): add the bill up again.
+        bill = _unpaid_bill(instance, after)
+        if bill is not None:
+            bill.recalculate_and_save()
+        return
+
+    total = instance.items_total()
+    for bill_id, sign in ((before, -1), (after, 1)):
+        bill = _unpaid_bill(instance, bill_id)
+        if bill is not None:
+            bill.add_to_subtotal(sign * total)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """Deleted orders publish nothing, so take them off the live board directly."""
+    live_board.discard(instance.pk)
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
 from .views import MyTokenObtainPairView
+
+# Native async versions of the most polled reads (see orders/async_views.py).
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+
 urlpatterns = [
     path('pos-place/', views.place_pos_order, name='pos-place-order'),
     path('place/', views.place_order),
@@ -11,14 +16,17 @@ urlpatterns = [
     path('daily-sales-chart/', views.daily_sales_chart, name='daily-sales-chart'),
     path('recent-orders/', views.recent_orders, name='recent-orders'),
     path('dashboard-orders/', views.dashboard_recent_orders, name='dashboard-orders'),
-    path('kitchen-display/', views.kitchen_display_orders, name='kitchen-display'),
+    path('kitchen-display/', read_views.kitchen_display_orders, name='kitchen-display'),
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
      path('<int:order_id>/update-status/',views.update_order_status, name='update-order-status'),
      path('<int:order_id>/cancel/', views.cancel_order, name='cancel-order'),
       path('all/', views.all_orders_list, name='all-orders-list'),
       path('export-csv/', views.export_orders_csv, name='export-orders-csv'),
-      path('status/<int:order_id>/', views.get_order_status, name='order-status'),
+      path('status/<int:order_id>/', read_views.get_order_status, name='order-status'),
       path('my-history/',views.customer_order_history, name='customer-order-history'),
       path('live-orders/', views.live_orders_list, name='live-orders'),
       path('create-and-pay/', views.create_and_pay_order, name='create-and-pay'),
+      path('broadcast-stats/', views.broadcast_stats_view, name='broadcast-stats'),
+      path('live-board/', views.live_board_status, name='live-board'),
+      path('ingestion-stats/', views.ingestion_stats_view, name='ingestion-stats'),
 ]
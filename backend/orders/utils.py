@@ -1,26 +1,135 @@
 # orders/utils.py
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, When, F, Q, DecimalField
 from menu.models import DishIngredient # <-- Get the Recipe Book from the menu app
+from menu import availability
+from inventory.models import Ingredient
+from .models import Order
+from .business_day import business_date
 
-def update_inventory_for_order(order, action='deduct'):
-    # 1. Look at each dish the customer ordered.
+ACTIVE_ORDER_STATUSES = ['Pending', 'Preparing', 'Ready']
+
+
+class InsufficientStockError(Exception):
+    """Raised when an order needs more of an ingredient than is in the pantry."""
+    pass
+
+
+def get_ingredient_requirements(order):
+    """
+    Works out how much of each ingredient an order uses, as
+    {ingredient_id: total quantity}.
+
+    The recipe lines for every dish on the order are fetched in one query and
+    multiplied out in memory, instead of opening the Recipe Book per item.
+    """
+    # 1. How many of each dish did the customer order? (items may repeat a dish)
+    dish_quantities = defaultdict(int)
     for item in order.items.all():
-        # (e.g., The customer ordered "Spaghetti Carbonara")
-
-        # 2. For that dish, open the Recipe Book to find its specific recipe.
-        for recipe_item in DishIngredient.objects.filter(dish=item.dish):
-
-            # 3. Look at one line in the recipe (e.g., "100g of Pasta").
-            # recipe_item IS the connection between the dish and the ingredient.
-            
-            # This gets the actual "Pasta" ingredient from your inventory.
-            ingredient = recipe_item.ingredient 
-            quantity_needed = recipe_item.quantity_required * item.quantity
-
-            # 4. Finally, go to the Pantry (Inventory) and update the stock of "Pasta".
-            if action == 'deduct':
-                ingredient.current_stock -= quantity_needed
-            elif action == 'restore':
-                ingredient.current_stock += quantity_needed
-            
-            # Save the new stock level in the inventory.
-            ingredient.save()
\ No newline at end of file
+        dish_quantities[item.dish_id] += item.quantity
+
+    # 2. One trip to the Recipe Book for all of those dishes.
+    recipe_lines = DishIngredient.objects.filter(
+        dish_id__in=dish_quantities
+    ).values_list('dish_id', 'ingredient_id', 'quantity_required')
+
+    requirements = defaultdict(Decimal)
+    for dish_id, ingredient_id, quantity_required in recipe_lines:
+        requirements[ingredient_id] += quantity_required * dish_quantities[dish_id]
+    return dict(requirements)
+
+
+def _stock_change(requirements, sign):
+    """A single CASE expression that moves every affected ingredient's stock at once."""
+    return Case(
+        *[
+            When(id=ingredient_id, then=F('current_stock') + sign * quantity)
+            for ingredient_id, quantity in requirements.items()
+        ],
+        default=F('current_stock'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def reserve_stock(requirements):
+    """
+    Atomically takes `requirements` ({ingredient_id: quantity}) out of the pantry.
+
+    The deduction is one conditional UPDATE that only touches rows whose
+    current_stock still covers what is needed (current_stock >= needed). If
+    fewer rows than expected were updated, another order got there first: the
+    savepoint is rolled back and InsufficientStockError is raised, so the
+    whole order fails and stock can never go negative. Only the affected
+    ingredient rows are written; nothing locks the whole table. Dishes that
+    use those ingredients get their menu availability refreshed.
+    """
+    if not requirements:
+        return
+
+    enough_stock = Q()
+    for ingredient_id, quantity in requirements.items():
+        enough_stock |= Q(id=ingredient_id, current_stock__gte=quantity)
+
+    try:
+        with transaction.atomic():
+            updated = Ingredient.objects.filter(enough_stock).update(
+                current_stock=_stock_change(requirements, -1)
+            )
+            if updated != len(requirements):
+                raise InsufficientStockError()
+            availability.refresh_for_ingredients(requirements)
+    except InsufficientStockError:
+        # The partial deduction has been rolled back; name what ran out.
+        stock_levels = Ingredient.objects.filter(
+            id__in=requirements
+        ).values_list('id', 'name', 'current_stock')
+        short = [name for ingredient_id, name, current_stock in stock_levels
+                 if current_stock < requirements[ingredient_id]]
+        if short:
+            raise InsufficientStockError(f"Not enough stock for {', '.join(short)}.")
+        raise InsufficientStockError("Not enough stock to fulfil this order.")
+
+
+def release_stock(requirements):
+    """Puts previously reserved quantities back into the pantry."""
+    if not requirements:
+        return
+    Ingredient.objects.filter(id__in=requirements).update(
+        current_stock=_stock_change(requirements, 1)
+    )
+    availability.refresh_for_ingredients(requirements)
+
+
+def update_inventory_for_order(order, action='deduct'):
+    """
+    Deducts (or restores) the pantry stock used by an order.
+
+    All recipe lines are read in one query and summed per ingredient. A
+    deduction is a stock reservation (see reserve_stock) and raises
+    InsufficientStockError when any ingredient would go negative; call it
+    inside the transaction that creates the order so the order is rolled
+    back with it.
+    """
+    requirements = get_ingredient_requirements(order)
+
+    if action == 'deduct':
+        reserve_stock(requirements)
+    elif action == 'restore':
+        release_stock(requirements)
+    else:
+        raise ValueError(f"Unknown inventory action '{action}'.")
+
+
+def get_kitchen_display_orders():
+    """
+    All active (non-POS) orders since the start of the current "business day".
+    Used by the kitchen display endpoint and the kitchen WebSocket snapshot.
+    """
+    # Fetch all active orders of the current business day.
+    return Order.objects.filter(
+        business_date=business_date(),
+        status__in=ACTIVE_ORDER_STATUSES,
+        is_pos_order=False
+    ).order_by('created_at')
@@ -1,22 +1,24 @@
 # orders/views.py
 
 from django.utils import timezone
-from django.db.models import Sum, F, DecimalField, Case, When, Value, IntegerField
-from django.db import models, transaction
+from django.db.models import Sum, Case, When, Value, IntegerField
+from django.db import transaction
 from datetime import timedelta, datetime, date
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from discounts.models import Discount
+from discounts.cache import discounts
 # Import all models needed
-from .models import Order, OrderItem, ORDER_STATUS
+from .models import Order, OrderItem, ArchivedOrder, ORDER_STATUS
 from customers.models import Customer
-from menu.models import Dish, DishIngredient
+from customers import coins
+from menu.models import Dish
 from billing.models import Bill
 from tables.models import Table
-from inventory.models import Ingredient
 from decimal import Decimal
 # Import all serializers needed
 from .serializers import (
@@ -27,14 +29,39 @@ from .serializers import (
     DashboardOrderSerializer
 )
 from billing.serializers import BillSerializer
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from .utils import update_inventory_for_order
+from billing import pricing
+from .utils import update_inventory_for_order, get_kitchen_display_orders, ACTIVE_ORDER_STATUSES
+from .broadcast import stats as broadcast_stats
+from .live_board import board as live_board
+from .idempotency import idempotent
+from .ingestion import ingestion, IngestionTimeout
+from .pagination import OrderKeysetPagination
+from .business_day import business_date
+import logging
+from reports.rollup import daily_totals, record_bill_paid, record_order_cancelled, record_order_restored
 import csv
-from django.http import HttpResponse
+from collections import deque
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_new_order(order):
+    """
+    OrderSerializer data for an order that was just written. The order is read
+    back with the list eager loading, so the response costs the same few
+    queries however many items it has.
+    """
+    order = OrderSerializer.setup_eager_loading(Order.objects.filter(pk=order.pk)).get()
+    return OrderSerializer(order).data
+
+
 # --- VIEW 1: For Customer Self-Service Orders ---
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def place_order(request):
     """
     Handles orders placed by customers through the customer-facing app.
@@ -62,12 +89,12 @@ def place_order(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        with transaction.atomic():
-            order = serializer.save()
-            update_inventory_for_order(order, action='deduct') 
-            
-
-            return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+        # Saves the order and deducts its stock in one transaction; with order
+        # batching on, that is the writer's transaction for the next group.
+        order = ingestion.place(serializer)
+        return Response(serialize_new_order(order), status=status.HTTP_201_CREATED)
+    except IngestionTimeout as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -75,6 +102,7 @@ def place_order(request):
 # --- VIEW 2: For Staff POS Orders ---
 @api_view(['POST'])
 @permission_classes([IsAdminUser]) # Only staff can access this
+@idempotent
 def place_pos_order(request):
     """
     Handles orders placed by staff through the admin POS interface.
@@ -88,12 +116,12 @@ def place_pos_order(request):
         serializer.validated_data['customer'] = customer
 
     try:
-        with transaction.atomic():
-            order = serializer.save()
-            # --- FIX: Corrected inventory deduction logic ---
-            update_inventory_for_order(order, action='deduct') 
-
-            return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+        # Saves the order and deducts its stock in one transaction; with order
+        # batching on, that is the writer's transaction for the next group.
+        order = ingestion.place(serializer)
+        return Response(serialize_new_order(order), status=status.HTTP_201_CREATED)
+    except IngestionTimeout as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -118,28 +146,13 @@ def cancel_order(request, order_id):
         with transaction.atomic():
             update_inventory_for_order(order, action='restore') 
             order.status = 'Cancelled'
-            order.save()
+            order.save(update_fields=['status'])
+            record_order_cancelled(order)
         # --- Transaction Block Ends and is Committed Here ---
+        # The save above is broadcast to the kitchen and the customer by
+        # orders.broadcast once the transaction has committed.
 
-        # --- Broadcasting is now safely done AFTER the transaction ---
-        channel_layer = get_channel_layer()
-        serialized_order = OrderSerializer(order).data
-
-        # Broadcast to admin/kitchen group
-        async_to_sync(channel_layer.group_send)(
-            'kitchen_orders',
-            {'type': 'order_update', 'order': serialized_order}
-        )
-
-        # Broadcast to specific customer group
-        if order.customer:
-            customer_group = f"customer_{order.customer.id}"
-            async_to_sync(channel_layer.group_send)(
-                customer_group,
-                {'type': 'order_update', 'order': serialized_order}
-            )
-
-        return Response(serialized_order, status=status.HTTP_200_OK)
+        return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
             
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -150,7 +163,13 @@ def cancel_order(request, order_id):
 def order_history(request, phone_number):
     try:
         customer = Customer.objects.get(phone_number=phone_number)
-        orders = Order.objects.filter(customer=customer).order_by('-created_at')
+        # Live and archived orders, newest first.
+        orders = [
+            order
+            for model in (Order, ArchivedOrder)
+            for order in OrderSerializer.setup_eager_loading(model.objects.filter(customer=customer))
+        ]
+        orders.sort(key=lambda order: order.created_at, reverse=True)
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
     except Customer.DoesNotExist:
@@ -160,44 +179,56 @@ def order_history(request, phone_number):
 @api_view(['POST'])
 def repeat_order(request, order_id):
     try:
-        old_order = Order.objects.get(id=order_id)
-        new_order = Order.objects.create(customer=old_order.customer)
-        for item in old_order.items.all():
-            OrderItem.objects.create(order=new_order, dish=item.dish, quantity=item.quantity)
-        serializer = OrderSerializer(new_order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    except Order.DoesNotExist:
+        try:
+            old_order = Order.objects.get(id=order_id)
+        except Order.DoesNotExist:
+            # Repeating an order from long ago: it may be in the archive.
+            old_order = ArchivedOrder.objects.get(id=order_id)
+        # One transaction, so the order is broadcast once with all of its items.
+        with transaction.atomic():
+            new_order = Order.objects.create(
+                customer=old_order.customer, table_number=old_order.table_number
+            )
+            # Copy the items set-wise: one read, one multi-row INSERT.
+            OrderItem.objects.bulk_create(
+                OrderItem(order=new_order, dish_id=dish_id, quantity=quantity)
+                for dish_id, quantity in old_order.items.values_list('dish_id', 'quantity')
+            )
+        return Response(serialize_new_order(new_order), status=status.HTTP_201_CREATED)
+    except (Order.DoesNotExist, ArchivedOrder.DoesNotExist):
         return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def kitchen_orders(request):
+    board_orders = live_board.select(['Pending', 'Preparing'])
+    if board_orders is not None:
+        return Response(board_orders)
+
     orders = Order.objects.filter(status__in=['Pending', 'Preparing']).order_by('created_at')
+    orders = OrderSerializer.setup_eager_loading(orders)
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def dashboard_summary(request):
-    today = timezone.now().date()
+    today = business_date()
     seven_days_ago = today - timedelta(days=6)
 
     # --- Metrics for Summary Cards ---
-    todays_orders_count = Order.objects.filter(created_at__date=today).count()
+    todays_orders_count = Order.objects.filter(business_date=today).count()
     pending_orders_count = Order.objects.filter(
         status='Pending', 
-        created_at__date=today  # <-- ADD THIS CONDITION
+        business_date=today  # <-- ADD THIS CONDITION
     ).count()
     total_dishes_count = Dish.objects.count()
 
-    # --- CORRECTED REVENUE CALCULATION (PAID TODAY) ---
-    paid_revenue_today = Bill.objects.filter(
-        is_paid=True,
-        paid_at__date=today
-    ).exclude(orders__status='Cancelled').aggregate(
-        total=Sum('final_amount')
-    )['total'] or Decimal('0.00')
+    # --- Paid revenue and discounts come from the sales rollup (reports app) ---
+    week = daily_totals(seven_days_ago, today, fields=('revenue', 'discounts'))
+    paid_revenue_today = week[today]['revenue']
+    total_discounts_today = week[today]['discounts']
 
     # --- UNPAID REVENUE CALCULATION ---
     unpaid_revenue = Bill.objects.filter(
@@ -206,32 +237,6 @@ def dashboard_summary(request):
         total=Sum('final_amount')
     )['total'] or Decimal('0.00')
 
-    total_discounts_today = Bill.objects.filter(
-        is_paid=True,
-        paid_at__date=today
-    ).exclude(orders__status='Cancelled').aggregate(
-        total=Sum('discount_amount')
-    )['total'] or Decimal('0.00')
-    
-    # --- CORRECTED WEEKLY SALES FOR THE GRAPH ---
-    # This is the most important change. We query Orders directly.
-    weekly_sales_data = Order.objects.filter(
-        bill__is_paid=True,
-        bill__paid_at__date__gte=seven_days_ago
-    ).exclude(status='Cancelled') \
-    .annotate(date=models.functions.TruncDate('bill__paid_at')) \
-    .values('date') \
-    .annotate(daily_revenue=Sum('bill__final_amount')) \
-    .order_by('date')
-
-    # Format data for the chart
-    sales_map = { (seven_days_ago + timedelta(days=i)).strftime('%Y-%m-%d'): 0 
-                  for i in range(7) }
-    for entry in weekly_sales_data:
-        sales_map[entry['date'].strftime('%Y-%m-%d')] = float(entry['daily_revenue'])
-    
-    chart_data = [{'date': date, 'revenue': revenue} for date, revenue in sales_map.items()]
-
     data = {
         'todays_orders': todays_orders_count,
         'pending_orders': pending_orders_count,
@@ -239,44 +244,31 @@ def dashboard_summary(request):
         'paid_revenue_today': paid_revenue_today,
         'unpaid_revenue': unpaid_revenue,
         'total_discounts_today': total_discounts_today,
-        'weekly_sales': chart_data,
+        'weekly_sales': _sales_chart(week),
     }
     return Response(data)
 
+
+def _sales_chart(totals):
+    # Format data for the chart
+    return [
+        {'date': day.strftime('%Y-%m-%d'), 'revenue': float(values['revenue'])}
+        for day, values in totals.items()
+    ]
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def daily_sales_chart(request):
-    today = timezone.now().date()
+    """Paid revenue per business day for the last 7 days, read from the sales rollup."""
+    today = business_date()
     seven_days_ago = today - timedelta(days=6)
-
-    # --- CORRECTED QUERY ---
-    # We query Orders, not OrderItems, to get an accurate sales record.
-    sales_data = Order.objects.filter(
-        bill__is_paid=True,                    # Condition 1: The bill must be paid
-        bill__paid_at__date__gte=seven_days_ago  # Condition 2: Paid within the last 7 days
-    ).exclude(
-        status='Cancelled'                     # Condition 3: The order must NOT be cancelled
-    ).annotate(
-        date=models.functions.TruncDate('bill__paid_at') # Group by the actual payment date
-    ).values('date').annotate(
-        daily_revenue=Sum('bill__final_amount')        # Sum the final paid amount
-    ).order_by('date')
-
-    # --- This part remains the same ---
-    date_range = [seven_days_ago + timedelta(days=i) for i in range(7)]
-    sales_map = {date.strftime('%Y-%m-%d'): 0 for date in date_range}
-
-    for entry in sales_data:
-        # The key is 'date' and the value is 'daily_revenue' from our query
-        sales_map[entry['date'].strftime('%Y-%m-%d')] = float(entry['daily_revenue'])
-
-    chart_data = [{'date': date, 'revenue': revenue} for date, revenue in sales_map.items()]
-    return Response(chart_data)
+    return Response(_sales_chart(daily_totals(seven_days_ago, today)))
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def recent_orders(request):
-    today = timezone.now().date()
+    today = business_date()
     status_order = Case(
         When(status='Pending', then=Value(1)),
         When(status='Preparing', then=Value(2)),
@@ -285,10 +277,11 @@ def recent_orders(request):
         default=Value(5),
         output_field=IntegerField(),
     )
-    orders = Order.objects.filter(created_at__date=today).annotate(
+    orders = Order.objects.filter(business_date=today).annotate(
         status_order=status_order
     ).order_by('status_order', '-created_at')
-    serializer = OrderSerializer(orders, many=True) 
+    orders = OrderSerializer.setup_eager_loading(orders)
+    serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 
@@ -298,27 +291,14 @@ def kitchen_display_orders(request):
     """
     A view for staff to see all active orders that require action.
     --- FIX: Now uses a "business day" logic to handle late-night orders. ---
+    Answered from the in-memory live board; the query below is the fallback.
     """
-    now = timezone.now()
-    
-    # Define the cutoff hour for a new "business day" (e.g., 5 AM)
-    cutoff_hour = 5 
-
-    if now.hour < cutoff_hour:
-        # If it's currently between midnight and 5 AM, the business day started yesterday at 5 AM.
-        start_of_business_day = now.replace(hour=cutoff_hour, minute=0, second=0, microsecond=0) - timedelta(days=1)
-    else:
-        # If it's after 5 AM, the business day started today at 5 AM.
-        start_of_business_day = now.replace(hour=cutoff_hour, minute=0, second=0, microsecond=0)
+    board_orders = live_board.select(ACTIVE_ORDER_STATUSES, today_only=True, exclude_pos=True)
+    if board_orders is not None:
+        return Response(board_orders)
 
-    active_statuses = ['Pending', 'Preparing', 'Ready']
-    
-    # Fetch all active orders since the start of the current business day.
-    orders = Order.objects.filter(
-        status__in=active_statuses,
-        created_at__gte=start_of_business_day,
-        is_pos_order=False
-    ).order_by('created_at')
+    orders = get_kitchen_display_orders()
+    orders = OrderSerializer.setup_eager_loading(orders)
     
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
@@ -328,78 +308,80 @@ def kitchen_display_orders(request):
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def update_order_status(request, order_id):
-    print(f"\n--- TRIGGERED update_order_status for Order ID: {order_id} ---")
-    
     try:
         order = Order.objects.get(id=order_id)
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
     new_status = request.data.get('status')
-    print(f"New status requested: '{new_status}'")
-    
+    logger.debug("Order #%s: status change to %r requested", order_id, new_status)
+
     valid_statuses = [s[0] for s in ORDER_STATUS]
     if new_status not in valid_statuses:
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         with transaction.atomic():
+            was_cancelled = order.status == 'Cancelled'
+            # The bill the cancellation took out of the sales figures, if any.
+            cancelled_bill = order.bill if was_cancelled else None
             order.status = new_status
             
             if new_status and new_status.lower() == 'served':
-                print("Status is 'Served'. Handling bill creation/linking...")
                 table, _ = Table.objects.get_or_create(table_number=order.table_number)
                 active_bill, created = Bill.objects.get_or_create(table=table, is_paid=False)
-                print(f"Retrieved Bill ID: {active_bill.id}. Was it newly created? {created}")
-                
-                print("1. Linking order to bill...")
+                logger.debug("Order #%s served onto bill #%s (new bill: %s)", order.id, active_bill.id, created)
                 order.bill = active_bill
                 
-                print("2. Saving the order to commit the link...")
-                order.save() 
-                
-                print("3. Calling recalculate_and_save() on the bill...")
-                active_bill.recalculate_and_save()
-                print("4. Finished calling recalculate_and_save().")
+                # Saving the link also adds the order's total to the bill's
+                # running subtotal (orders.signals.keep_bill_subtotal).
+                order.save(update_fields=['status', 'bill'])
             else:
-                order.save()
-        
-        print("--- update_order_status finished successfully ---")
-        
-        channel_layer = get_channel_layer()
-        serialized_order = DashboardOrderSerializer(order).data
-        message = {'type': 'order_update', 'order': serialized_order}
+                order.save(update_fields=['status'])
+                if new_status == 'Cancelled' and not was_cancelled:
+                    record_order_cancelled(order)
+
+            if was_cancelled and new_status != 'Cancelled':
+                record_order_restored(order, cancelled_bill)
         
-        async_to_sync(channel_layer.group_send)('kitchen_orders', message)
-        if order.customer:
-            async_to_sync(channel_layer.group_send)(f'customer_{order.customer.id}', message)
+        # No manual group_send here: the order's post_save already queued the
+        # one canonical broadcast (see orders.broadcast).
         
         # --- THIS IS THE FIX FOR THE CRASH ---
-        return Response(serialized_order)
+        return Response(DashboardOrderSerializer(order).data)
 
     except Exception as e:
-        print(f"!!! ERROR in update_order_status: {str(e)} !!!")
+        logger.exception(f"ERROR in update_order_status for order #{order_id}: {str(e)}")
         return Response({'error': f'An unexpected error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
-@api_view(['GET'])
-@permission_classes([IsAdminUser])
-def all_orders_list(request):
-    queryset = Order.objects.all().select_related('bill', 'customer').order_by('-created_at')
-    
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-    status_filter = request.query_params.get('status')
-    payment_filter = request.query_params.get('payment_status')
+def _start_of_day(value, param_name):
+    """Parses a YYYY-MM-DD query param into an aware datetime at local midnight."""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({param_name: 'Use the YYYY-MM-DD format.'})
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def filter_order_history(queryset, params):
+    """
+    Applies the All Orders page filters (start_date, end_date, status,
+    payment_status). Dates become a created_at range rather than
+    created_at__date lookups so the (created_at, id) index can be used.
+    """
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    status_filter = params.get('status')
+    payment_filter = params.get('payment_status')
 
     if start_date:
-        queryset = queryset.filter(created_at__date__gte=start_date)
+        queryset = queryset.filter(created_at__gte=_start_of_day(start_date, 'start_date'))
     if end_date:
-        queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = queryset.filter(created_at__lt=_start_of_day(end_date, 'end_date') + timedelta(days=1))
     
-    # --- ADD THIS LOGIC ---
     if status_filter:
         queryset = queryset.filter(status=status_filter)
     
@@ -409,10 +391,29 @@ def all_orders_list(request):
             queryset = queryset.filter(bill__is_paid=True)
         elif payment_filter == 'Unpaid':
             queryset = queryset.filter(bill__is_paid=False)
-    # --- END OF NEW LOGIC ---
+    return queryset
 
-    serializer = DashboardOrderSerializer(queryset, many=True)
-    return Response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def all_orders_list(request):
+    """
+    Order history for the admin "All Orders" page, newest first, one page at
+    a time. Follow the `next` link (a keyset cursor on created_at, id) for
+    older orders; `page_size` defaults to 50.
+    """
+    # Pages run across the live and the archived orders.
+    querysets = [
+        DashboardOrderSerializer.setup_eager_loading(
+            filter_order_history(model.objects.all(), request.query_params)
+        ).order_by('-created_at', '-id')
+        for model in (Order, ArchivedOrder)
+    ]
+
+    paginator = OrderKeysetPagination()
+    page = paginator.paginate_queryset(querysets, request)
+    serializer = DashboardOrderSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -420,10 +421,16 @@ def all_orders_list(request):
 def get_order_status(request, order_id):
     try:
         customer = Customer.objects.get(phone_number=request.user.username)
-        order = Order.objects.get(id=order_id, customer=customer)
+        try:
+            order = OrderSerializer.setup_eager_loading(Order.objects.filter(id=order_id, customer=customer)).get()
+        except Order.DoesNotExist:
+            # An old order may have been moved to the archive.
+            order = OrderSerializer.setup_eager_loading(
+                ArchivedOrder.objects.filter(id=order_id, customer=customer)
+            ).get()
         serializer = OrderSerializer(order)
         return Response(serializer.data)
-    except Order.DoesNotExist:
+    except (Customer.DoesNotExist, Order.DoesNotExist, ArchivedOrder.DoesNotExist):
         return Response({'error': 'Order not found or permission denied.'}, status=status.HTTP_404_NOT_FOUND)
     except AttributeError:
         return Response({'error': 'Invalid user profile.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -443,9 +450,15 @@ def customer_order_history(request):
             default=Value(6),
             output_field=IntegerField(),
         )
-        orders = Order.objects.filter(customer=customer).annotate(
-            status_order=status_order
-        ).order_by('status_order', '-created_at')
+        # Live and archived orders (the archive only holds Served/Cancelled ones).
+        orders = [
+            order
+            for model in (Order, ArchivedOrder)
+            for order in OrderSerializer.setup_eager_loading(
+                model.objects.filter(customer=customer).annotate(status_order=status_order)
+            )
+        ]
+        orders.sort(key=lambda order: (order.status_order, -order.created_at.timestamp()))
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
     except Customer.DoesNotExist:
@@ -456,11 +469,16 @@ def live_orders_list(request):
     """
     Returns a list of all active orders from today for the dashboard.
     """
-    today = timezone.now().date()
+    board_orders = live_board.select(ACTIVE_ORDER_STATUSES, shape='recent', today_only=True)
+    if board_orders is not None:
+        return Response(board_orders)
+
+    today = business_date()
     active_orders = Order.objects.filter(
-        created_at__date=today,
+        business_date=today,
         status__in=['Pending', 'Preparing', 'Ready']
     ).order_by('created_at')
+    active_orders = RecentOrderSerializer.setup_eager_loading(active_orders)
     
     # We can reuse the RecentOrderSerializer for this
     serializer = RecentOrderSerializer(active_orders, many=True)
@@ -474,7 +492,7 @@ def dashboard_recent_orders(request):
     Provides a detailed list of today's orders specifically for the admin dashboard,
     including full financial details from the associated bill.
     """
-    today = timezone.now().date()
+    today = business_date()
     
     # You can reuse your ordering logic if you wish
     status_order = Case(
@@ -486,10 +504,10 @@ def dashboard_recent_orders(request):
         output_field=IntegerField(),
     )
     
-    all_todays_orders = Order.objects.filter(
-        created_at__date=today,
+    all_todays_orders = DashboardOrderSerializer.setup_eager_loading(Order.objects.filter(
+        business_date=today,
         bill__isnull=False
-    ).select_related('bill', 'customer').order_by('-created_at')
+    )).order_by('-created_at')
 
     # Use a dictionary to keep only the first order we see for each unique bill
     unique_orders_dict = {}
@@ -505,6 +523,7 @@ def dashboard_recent_orders(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])  # requires JWT token
+@idempotent
 def create_and_pay_order(request):
     """
     Creates a new order and an associated bill from POS data,
@@ -526,58 +545,38 @@ def create_and_pay_order(request):
             table, _ = Table.objects.get_or_create(table_number=order.table_number)
             bill = Bill.objects.create(table=table)
             order.bill = bill
-            order.save()
+            order.save(update_fields=['bill'])
 
-            # --- Calculate totals directly here ---
-            subtotal = sum(item.dish.price * item.quantity for item in order.items.all())
-            bill.subtotal = subtotal
-
-            # Apply discount if provided
+            # Apply discount if provided (to the running subtotal the linked order put on the bill)
+            discount = None
             discount_code = data.get("discount_code")
             if discount_code:
                 try:
-                    discount = Discount.objects.get(code__iexact=discount_code, is_active=True)
-                    if subtotal < discount.minimum_bill_amount:
-                        raise Exception(f"Bill total must be at least ₹{discount.minimum_bill_amount} to use this discount.")
-                    bill.applied_discount = discount
-                    if discount.discount_type == "PERCENTAGE":
-                        discount_amount = (subtotal * discount.value) / Decimal("100")
-                    else:
-                        discount_amount = discount.value
-                    bill.discount_amount = min(subtotal, discount_amount)
+                    discount = discounts.get(discount_code)
                 except Discount.DoesNotExist:
                     raise Exception("Invalid or inactive discount code.")
 
             # Tax and total
-            discounted_subtotal = bill.subtotal - bill.discount_amount
-            TAX_RATE = Decimal("0.05")
-            bill.tax_amount = discounted_subtotal * TAX_RATE
-            bill.final_amount = discounted_subtotal + bill.tax_amount
-            bill.save()
+            try:
+                bill.save_totals(discount=discount)
+            except pricing.DiscountNotApplicable:
+                raise Exception(f"Bill total must be at least ₹{discount.minimum_bill_amount} to use this discount.")
 
             # Step 3: Deduct inventory
-            for item in order.items.all():
-                for recipe_item in item.dish.dishingredient_set.all():
-                    ingredient = recipe_item.ingredient
-                    quantity_needed = recipe_item.quantity_required * item.quantity
-                    if ingredient.current_stock < quantity_needed:
-                        raise Exception(f"Not enough stock for {ingredient.name}.")
-                    ingredient.current_stock -= quantity_needed
-                    ingredient.save()
+            update_inventory_for_order(order, action='deduct')
 
             # Step 4: Award loyalty points
             if customer and bill.final_amount > 0:
-                points_earned = int(bill.final_amount / 10)
-                if points_earned > 0:
-                    customer.loyalty_coins += points_earned
-                    customer.save()
+                points_earned = pricing.coins_earned(pricing.to_paise(bill.final_amount))
+                coins.credit(customer.pk, points_earned, 'earned', bill_id=bill.id)
 
             # Step 5: Finalize statuses
             order.status = "Served"
             bill.is_paid = True
             bill.paid_at = timezone.now()
-            order.save()
+            order.save(update_fields=['status'])
             bill.save()
+            record_bill_paid(bill)
 
             # Step 6: Return serialized bill
             serialized_bill = BillSerializer(bill)
@@ -590,44 +589,128 @@ def create_and_pay_order(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def export_orders_csv(request):
-    # This logic is identical to the filtering in your all_orders_list view
-    queryset = Order.objects.all().select_related('bill', 'customer').order_by('-created_at')
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-    status_filter = request.query_params.get('status')
-    payment_filter = request.query_params.get('payment_status')
-
-    if start_date:
-        queryset = queryset.filter(created_at__date__gte=start_date)
-    if end_date:
-        queryset = queryset.filter(created_at__date__lte=end_date)
-    if status_filter:
-        queryset = queryset.filter(status=status_filter)
-    if payment_filter:
-        if payment_filter == 'Paid':
-            queryset = queryset.filter(bill__is_paid=True)
-        elif payment_filter == 'Unpaid':
-            # We need to handle cases where a bill might not exist yet
-            queryset = queryset.filter(bill__is_paid=False)
+    """
+    Streams the filtered order history as CSV. Rows are read from the
+    database in chunks and written out as they arrive, so memory stays flat
+    and the first bytes go out before the last row is read, however large
+    the date range.
+    """
+    # Same filters as the all_orders_list view, over the live and archived orders
+    querysets = [filter_order_history(model.objects.all(), request.query_params) for model in (Order, ArchivedOrder)]
 
-    # --- CSV Generation Logic ---
-    response = HttpResponse(content_type='text/csv')
+    # An async iterator: under ASGI Django would read a sync one to the end
+    # (in a worker thread) before sending anything.
+    response = StreamingHttpResponse(_order_csv_rows(querysets), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="orders_{timezone.now().strftime("%Y-%m-%d")}.csv"'
+    return response
 
-    writer = csv.writer(response)
-    # Write the header row
-    writer.writerow(['Order ID', 'Customer Phone', 'Table', 'Status', 'Payment Status', 'Final Amount', 'Date'])
-
-    # Write data rows
-    for order in queryset:
-        writer.writerow([
-            order.id,
-            order.customer.phone_number if order.customer else 'N/A',
-            order.table_number,
-            order.status,
-            'Paid' if order.bill and order.bill.is_paid else 'Unpaid',
-            order.bill.final_amount if order.bill else '0.00',
-            order.created_at.strftime('%Y-%m-%d %H:%M')
-        ])
-
-    return response
\ No newline at end of file
+
+class Echo:
+    """A file-like object that hands back what it is asked to write, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+# Rows fetched from the database per round trip, and written out per yield.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'id', 'customer__phone_number', 'table_number', 'status',
+    'bill__is_paid', 'bill__final_amount', 'created_at',
+)
+
+
+async def _history_chunks(queryset):
+    """
+    The rows of `queryset`, newest first, as lists of plain tuples of up to
+    EXPORT_CHUNK_SIZE. Each chunk is its own keyset query on (created_at, id),
+    run in a worker thread, so no cursor is held open between chunks.
+    """
+    queryset = queryset.order_by('-created_at', '-id').values_list(*EXPORT_FIELDS)
+    chunk = await sync_to_async(list)(queryset[:EXPORT_CHUNK_SIZE])
+    while chunk:
+        yield chunk
+        if len(chunk) < EXPORT_CHUNK_SIZE:
+            return
+        last_id, last_created = chunk[-1][0], chunk[-1][6]
+        chunk = await sync_to_async(list)(queryset.filter(
+            Q(created_at__lt=last_created) | Q(created_at=last_created, id__lt=last_id)
+        )[:EXPORT_CHUNK_SIZE])
+
+
+async def _newest_first(querysets):
+    """Merges the row streams of `querysets` (each newest first) into one, newest first."""
+    streams = [_history_chunks(queryset) for queryset in querysets]
+    buffers = [deque() for _ in streams]
+    live = list(range(len(streams)))
+
+    while True:
+        # Every stream that still has rows needs one in hand to compare.
+        for index in list(live):
+            if not buffers[index]:
+                chunk = await anext(streams[index], None)
+                if chunk is None:
+                    live.remove(index)
+                else:
+                    buffers[index].extend(chunk)
+        if not live:
+            return
+        newest = max(live, key=lambda index: (buffers[index][0][6], buffers[index][0][0]))
+        yield buffers[newest].popleft()
+
+
+async def _order_csv_rows(querysets):
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Order ID', 'Customer Phone', 'Table', 'Status', 'Payment Status', 'Final Amount', 'Date'])
+
+    chunk = []
+    async for order_id, phone, table_number, order_status, is_paid, final_amount, created_at in _newest_first(querysets):
+        chunk.append(writer.writerow([
+            order_id,
+            phone or 'N/A',
+            table_number,
+            order_status,
+            'Paid' if is_paid else 'Unpaid',
+            final_amount if final_amount is not None else '0.00',
+            created_at.strftime('%Y-%m-%d %H:%M'),
+        ]))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def broadcast_stats_view(request):
+    """
+    Counters from the order broadcast service: logical order events published,
+    WebSocket messages sent and the average fan-out per event.
+    """
+    return Response(broadcast_stats.snapshot())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def ingestion_stats_view(request):
+    """
+    State of the order ingestion queue: whether batching is on, the queue
+    depth, and how many orders went into each written group.
+    """
+    return Response(ingestion.snapshot())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def live_board_status(request):
+    """
+    State of the in-memory live board plus a consistency check against the
+    database. Pass ?repair=1 to reload the board after checking.
+    """
+    repair = request.query_params.get('repair') in ('1', 'true')
+    return Response({
+        'board': live_board.snapshot(),
+        'check': live_board.verify(repair=repair),
+    })
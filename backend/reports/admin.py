@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import SalesRollup, ZReport
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('business_date', 'hour', 'revenue', 'discounts', 'bills', 'orders', 'cancelled_orders')
+    list_filter = ('business_date',)
+    # Maintained by the app; rebuild with `manage.py rebuild_sales_rollup` instead of editing.
+    readonly_fields = list_display + ('coin_discounts',)
+
+
+@admin.register(ZReport)
+class ZReportAdmin(admin.ModelAdmin):
+    list_display = ('business_date', 'paid_bills', 'paid_total', 'tax', 'discounts', 'unpaid_bills', 'cancelled_orders', 'generated_at')
+    # Snapshots; regenerate with `manage.py generate_z_report --replace` instead of editing.
+    readonly_fields = [field.name for field in ZReport._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,53 @@
+# reports/management/commands/generate_z_report.py
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.business_day import business_date
+from reports.zreport import generate, is_closed
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the end-of-day (Z) report of a finished business day, by default "
+        "the last one. Use --date, or --from/--to (YYYY-MM-DD, inclusive), for "
+        "other days; days that already have a report are skipped unless --replace "
+        "is given. Run it after closing, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="The business day to report on.")
+        parser.add_argument('--from', dest='first_day', help="First business day of a range.")
+        parser.add_argument('--to', dest='last_day', help="Last business day of a range (default: the last finished one).")
+        parser.add_argument('--replace', action='store_true', help="Regenerate reports that already exist.")
+
+    def parse_day(self, value, option):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"--{option} must be a date in YYYY-MM-DD format.")
+
+    def handle(self, *args, **options):
+        last_closed = business_date() - timedelta(days=1)
+
+        if options['date']:
+            first_day = last_day = self.parse_day(options['date'], 'date')
+        else:
+            last_day = self.parse_day(options['last_day'], 'to') if options['last_day'] else last_closed
+            first_day = self.parse_day(options['first_day'], 'from') if options['first_day'] else last_day
+
+        if first_day > last_day:
+            raise CommandError("The first day is after the last day.")
+        if not is_closed(last_day):
+            raise CommandError(f"Business day {last_day} is not over yet; the last finished one is {last_closed}.")
+
+        day = first_day
+        while day <= last_day:
+            report = generate(day, replace=options['replace'])
+            self.stdout.write(
+                f"{day}: {report.paid_bills} paid bill(s), ₹{report.paid_total}; "
+                f"{report.unpaid_bills} unpaid; {report.cancelled_orders} cancelled order(s)"
+            )
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Z-reports stored for {first_day} to {last_day}."))
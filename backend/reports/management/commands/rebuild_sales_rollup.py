@@ -0,0 +1,61 @@
+# reports/management/commands/rebuild_sales_rollup.py
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from billing.models import ArchivedBill, Bill
+from orders.business_day import business_date
+from orders.models import ArchivedOrder, Order
+from reports.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily/hourly sales rollup from the raw orders and bills. "
+        "By default every business day since the first bill or order is rebuilt; "
+        "use --from/--to (YYYY-MM-DD, inclusive) or --days to limit the range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_day', help="First business day to rebuild.")
+        parser.add_argument('--to', dest='last_day', help="Last business day to rebuild (default: today).")
+        parser.add_argument('--days', type=int, help="Rebuild only the last N business days.")
+
+    def parse_day(self, value, option):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"--{option} must be a date in YYYY-MM-DD format.")
+
+    def handle(self, *args, **options):
+        last_day = self.parse_day(options['last_day'], 'to') if options['last_day'] else business_date()
+
+        if options['first_day']:
+            first_day = self.parse_day(options['first_day'], 'from')
+        elif options['days']:
+            first_day = last_day - timedelta(days=options['days'] - 1)
+        else:
+            earliest = [
+                value for value in (
+                    Bill.objects.aggregate(first=Min('paid_at'))['first'],
+                    Order.objects.aggregate(first=Min('created_at'))['first'],
+                    ArchivedBill.objects.aggregate(first=Min('paid_at'))['first'],
+                    ArchivedOrder.objects.aggregate(first=Min('created_at'))['first'],
+                ) if value is not None
+            ]
+            if not earliest:
+                self.stdout.write("No orders or bills yet; nothing to rebuild.")
+                return
+            first_day = business_date(min(earliest))
+
+        if first_day > last_day:
+            raise CommandError("The first day is after the last day.")
+
+        rows = rebuild(first_day, last_day)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the sales rollup for {first_day} to {last_day}: {len(rows)} hourly row(s), "
+            f"{sum(row.bills for row in rows)} paid bill(s), "
+            f"{sum(row.cancelled_orders for row in rows)} cancelled order(s)."
+        ))
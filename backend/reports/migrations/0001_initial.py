@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:26
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('coin_discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('bills', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['business_date', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('business_date', 'hour'), name='unique_sales_rollup_hour')],
+            },
+        ),
+    ]
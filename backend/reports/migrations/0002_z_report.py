@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:08
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField(unique=True)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+                ('paid_bills', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('coin_discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('coins_redeemed', models.IntegerField(default=0)),
+                ('tax', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('unpaid_bills', models.IntegerField(default=0)),
+                ('unpaid_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('cancelled_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('breakdown', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['-business_date'],
+            },
+        ),
+    ]
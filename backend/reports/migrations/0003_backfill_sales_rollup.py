@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+from django.utils import timezone
+
+from orders.business_day import business_date
+
+
+def backfill(apps, schema_editor):
+    # The dashboards read only the rollup, so fill it from the existing bills
+    # and orders (the same rules as reports.rollup.compute). Later changes are
+    # kept in step by the app; `manage.py rebuild_sales_rollup` redoes a range.
+    SalesRollup = apps.get_model('reports', 'SalesRollup')
+    if SalesRollup.objects.exists():
+        return
+
+    fields = ('revenue', 'discounts', 'coin_discounts', 'bills', 'orders', 'cancelled_orders')
+    buckets = defaultdict(lambda: dict.fromkeys(fields, 0))
+
+    def bucket(moment):
+        return business_date(moment), timezone.localtime(moment).hour
+
+    for app_label, bill_name in (('billing', 'Bill'), ('billing', 'ArchivedBill')):
+        paid_bills = apps.get_model(app_label, bill_name).objects.filter(
+            is_paid=True, paid_at__isnull=False
+        ).exclude(
+            orders__status='Cancelled'
+        ).annotate(
+            order_count=Count('orders')
+        ).values_list('paid_at', 'final_amount', 'discount_amount', 'coin_discount', 'order_count')
+        for paid_at, final_amount, discount_amount, coin_discount, order_count in paid_bills.iterator():
+            row = buckets[bucket(paid_at)]
+            row['revenue'] += final_amount
+            row['discounts'] += discount_amount
+            row['coin_discounts'] += coin_discount
+            row['bills'] += 1
+            row['orders'] += order_count
+
+    for order_name in ('Order', 'ArchivedOrder'):
+        cancelled = apps.get_model('orders', order_name).objects.filter(status='Cancelled').values_list('created_at', flat=True)
+        for created_at in cancelled.iterator():
+            buckets[bucket(created_at)]['cancelled_orders'] += 1
+
+    SalesRollup.objects.bulk_create(
+        (SalesRollup(business_date=day, hour=hour, **values) for (day, hour), values in sorted(buckets.items())),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_z_report'),
+        ('billing', '0006_archivedbill'),
+        ('orders', '0010_archived_orders'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
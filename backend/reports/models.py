@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.db import models
+
+
+class SalesRollup(models.Model):
+    """
+    Paid sales per business day and clock hour, so the dashboards do not
+    have to re-join every order and bill on each load.
+
+    Rows are kept up to date by reports.rollup as bills are paid and orders
+    are cancelled, and can be recomputed from the raw orders and bills with
+    `python manage.py rebuild_sales_rollup`. A bill counts once, in the hour
+    it was paid; bills with a cancelled order are left out, as before.
+    """
+    business_date = models.DateField()
+    hour = models.PositiveSmallIntegerField()  # local clock hour, 0-23
+
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    discounts = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    coin_discounts = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Plain integers: the counters are moved with F() deltas and must never
+    # fail a payment over a CHECK constraint.
+    bills = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['business_date', 'hour'], name='unique_sales_rollup_hour'),
+        ]
+        ordering = ['business_date', 'hour']
+
+    def __str__(self):
+        return f"{self.business_date} {self.hour:02d}:00 - ₹{self.revenue}"
+
+
+class ZReport(models.Model):
+    """
+    The end-of-day (Z) report of one business day, computed once by
+    reports.zreport and stored. Later requests for the day read this row
+    instead of re-scanning its bills and orders.
+
+    A snapshot is never edited: if the day's data changes afterwards (a late
+    cancellation, say), regenerate it with
+    `python manage.py generate_z_report --date YYYY-MM-DD --replace`.
+    The top-line figures are columns; the breakdowns (discounts by code,
+    orders by status, dishes sold) are in `breakdown`.
+    """
+    business_date = models.DateField(unique=True)
+    generated_at = models.DateTimeField(auto_now_add=True)
+
+    # Bills paid on the day (by paid_business_date).
+    paid_bills = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    discounts = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    coin_discounts = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    coins_redeemed = models.IntegerField(default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    paid_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Bills opened on the day and still unpaid when the report was generated.
+    unpaid_bills = models.IntegerField(default=0)
+    unpaid_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Orders placed on the day.
+    orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    cancelled_value = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    breakdown = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-business_date']
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Z-reports are snapshots; generate a new one instead of editing it.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Z-report {self.business_date} - ₹{self.paid_total}"
@@ -0,0 +1,174 @@
+# reports/rollup.py
+"""
+Keeps reports.SalesRollup in step with payments and cancellations.
+
+The views that pay a bill or cancel an order call record_bill_paid() /
+record_order_cancelled() (record_bills_paid() for a batch settlement, and
+record_order_restored() when a cancelled order is brought back) inside
+their transaction, so the rollup moves together with the change (or not at
+all). Each call is an upsert of one (business_date, hour) row with F()
+deltas, so concurrent requests do not overwrite each other. rebuild() recomputes a date range from the raw bills
+and orders, and is what `manage.py rebuild_sales_rollup` runs.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from billing.models import ArchivedBill, Bill
+from orders.business_day import business_date
+from orders.models import ArchivedOrder, Order
+from .models import SalesRollup
+
+MONEY_FIELDS = ('revenue', 'discounts', 'coin_discounts')
+COUNT_FIELDS = ('bills', 'orders', 'cancelled_orders')
+
+
+def _bucket(moment):
+    return business_date(moment), timezone.localtime(moment).hour
+
+
+def _apply(moment, changes):
+    """Adds `changes` ({field: delta}) to the rollup row `moment` falls into."""
+    _apply_row(*_bucket(moment), changes)
+
+
+def _apply_row(day, hour, changes):
+    changes = {field: delta for field, delta in changes.items() if delta}
+    if not changes:
+        return
+    updates = {field: F(field) + delta for field, delta in changes.items()}
+    if SalesRollup.objects.filter(business_date=day, hour=hour).update(**updates):
+        return
+    try:
+        # The first event of the hour creates the row; a savepoint keeps a
+        # lost race from breaking the caller's transaction.
+        with transaction.atomic():
+            SalesRollup.objects.create(business_date=day, hour=hour, **changes)
+    except IntegrityError:
+        SalesRollup.objects.filter(business_date=day, hour=hour).update(**updates)
+
+
+def _add_paid_bills(buckets, paid_bills):
+    """Adds the paid bills in `paid_bills` to `buckets`, skipping any with a cancelled order."""
+    paid_bills = paid_bills.exclude(
+        orders__status='Cancelled'
+    ).annotate(
+        order_count=Count('orders')
+    ).values_list('paid_at', 'final_amount', 'discount_amount', 'coin_discount', 'order_count')
+
+    for paid_at, final_amount, discount_amount, coin_discount, order_count in paid_bills.iterator():
+        row = buckets[_bucket(paid_at)]
+        row['revenue'] += final_amount
+        row['discounts'] += discount_amount
+        row['coin_discounts'] += coin_discount
+        row['bills'] += 1
+        row['orders'] += order_count
+
+
+def _bill_contribution(bill, sign=1):
+    return {
+        'revenue': sign * (bill.final_amount or Decimal('0.00')),
+        'discounts': sign * (bill.discount_amount or Decimal('0.00')),
+        'coin_discounts': sign * (bill.coin_discount or Decimal('0.00')),
+        'bills': sign,
+        'orders': sign * bill.orders.count(),
+    }
+
+
+def record_bill_paid(bill):
+    """Call once a bill has been marked paid (is_paid and paid_at set)."""
+    if bill.orders.filter(status='Cancelled').exists():
+        # Bills with a cancelled order stay out of the sales figures.
+        return
+    _apply(bill.paid_at, _bill_contribution(bill))
+
+
+def record_bills_paid(bill_ids):
+    """
+    record_bill_paid() for many bills settled together: their contributions
+    are added up per (business_date, hour) in one query and applied once per
+    row instead of once per bill.
+    """
+    buckets = defaultdict(lambda: dict.fromkeys(MONEY_FIELDS + COUNT_FIELDS, 0))
+    _add_paid_bills(buckets, Bill.objects.filter(id__in=bill_ids, is_paid=True, paid_at__isnull=False))
+    for (day, hour), changes in buckets.items():
+        _apply_row(day, hour, changes)
+
+
+def record_order_cancelled(order):
+    """Call once an order has been saved as Cancelled."""
+    _apply(order.created_at, {'cancelled_orders': 1})
+
+    bill = order.bill
+    if bill is None or not bill.is_paid or bill.paid_at is None:
+        return
+    if bill.orders.filter(status='Cancelled').exclude(pk=order.pk).exists():
+        # An earlier cancellation already took this bill out.
+        return
+    _apply(bill.paid_at, _bill_contribution(bill, sign=-1))
+
+
+def record_order_restored(order, bill):
+    """
+    Call once a Cancelled order has been saved with another status; undoes
+    record_order_cancelled(). `bill` is the bill the order was on while it
+    was cancelled (it may have been moved to another one since).
+    """
+    _apply(order.created_at, {'cancelled_orders': -1})
+
+    if bill is None or not bill.is_paid or bill.paid_at is None:
+        return
+    if bill.orders.filter(status='Cancelled').exists():
+        # Another cancelled order still keeps this bill out.
+        return
+    _apply(bill.paid_at, _bill_contribution(bill))
+
+
+def compute(first_day, last_day):
+    """The rollup rows for business days first_day..last_day, computed from raw data."""
+    buckets = defaultdict(lambda: dict.fromkeys(MONEY_FIELDS + COUNT_FIELDS, 0))
+
+    # Old bills and orders may have been moved to the archive tables.
+    for bill_model in (Bill, ArchivedBill):
+        _add_paid_bills(buckets, bill_model.objects.filter(
+            is_paid=True, paid_business_date__gte=first_day, paid_business_date__lte=last_day
+        ))
+
+    for order_model in (Order, ArchivedOrder):
+        cancelled = order_model.objects.filter(
+            status='Cancelled', business_date__gte=first_day, business_date__lte=last_day
+        ).values_list('created_at', flat=True)
+        for created_at in cancelled.iterator():
+            buckets[_bucket(created_at)]['cancelled_orders'] += 1
+
+    return [
+        SalesRollup(business_date=day, hour=hour, **values)
+        for (day, hour), values in sorted(buckets.items())
+    ]
+
+
+def rebuild(first_day, last_day):
+    """Replaces the rollup rows for first_day..last_day with freshly computed ones."""
+    rows = compute(first_day, last_day)
+    with transaction.atomic():
+        SalesRollup.objects.filter(business_date__gte=first_day, business_date__lte=last_day).delete()
+        SalesRollup.objects.bulk_create(rows)
+    return rows
+
+
+def daily_totals(first_day, last_day, fields=('revenue',)):
+    """{business_date: {field: total}} for every day in the range, zero-filled."""
+    totals = {
+        first_day + timedelta(days=i): dict.fromkeys(fields, Decimal('0.00'))
+        for i in range((last_day - first_day).days + 1)
+    }
+    rows = SalesRollup.objects.filter(
+        business_date__gte=first_day, business_date__lte=last_day
+    ).values('business_date').annotate(**{field: Sum(field) for field in fields})
+    for row in rows:
+        totals[row['business_date']] = {field: row[field] for field in fields}
+    return totals
@@ -0,0 +1,18 @@
+# reports/serializers.py
+
+from rest_framework import serializers
+from .models import ZReport
+
+class ZReportSerializer(serializers.ModelSerializer):
+    """
+    A Z-report snapshot. `final` is False for the current business day,
+    whose report is computed on request and not stored.
+    """
+    final = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ZReport
+        exclude = ['id']
+
+    def get_final(self, obj):
+        return obj.pk is not None
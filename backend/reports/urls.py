@@ -0,0 +1,8 @@
+# reports/urls.py
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('z-report/', views.z_report, name='z-report'),
+]
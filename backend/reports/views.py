@@ -0,0 +1,29 @@
+# reports/views.py
+
+from datetime import date
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework import status
+
+from orders.business_day import business_date
+from .serializers import ZReportSerializer
+from .zreport import get_report
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def z_report(request):
+    """
+    The end-of-day report of ?date=YYYY-MM-DD (default: the current business
+    day). Past days are read from their stored snapshot.
+    """
+    day = request.query_params.get('date')
+    try:
+        day = date.fromisoformat(day) if day else business_date()
+    except ValueError:
+        return Response({'error': 'date must be in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+    if day > business_date():
+        return Response({'error': 'That business day has not started yet.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(ZReportSerializer(get_report(day)).data)
@@ -0,0 +1,158 @@
+# reports/zreport.py
+"""
+The end-of-day (Z) report: everything about one business day in a fixed
+handful of grouped queries, stored as a reports.ZReport snapshot.
+
+For each of the live and the archive tables there is one aggregate over
+the bills paid that day (grouped by discount code), one over the day's
+orders (grouped by status) and one over the day's order items (grouped by
+dish and order status). Every one of them is narrowed by an indexed
+business-day column (Bill.paid_business_date, Order.business_date), so the
+cost depends on the size of the day, not of the history. The day's unpaid
+bills are only ever in the live table.
+
+Unlike the sales rollup, a paid bill with a cancelled order still counts
+here: its total already leaves the cancelled order out, and the money was
+taken.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from billing import pricing
+from billing.models import ArchivedBill, Bill
+from orders.business_day import business_date, business_day_range
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .models import ZReport
+
+BILL_SUMS = {
+    'subtotal': 'subtotal',
+    'discounts': 'discount_amount',
+    'coin_discounts': 'coin_discount',
+    'tax': 'tax_amount',
+    'paid_total': 'final_amount',
+}
+
+
+def _money(value):
+    # SQLite sums decimals as floats; round back to whole paise.
+    return pricing.to_rupees(pricing.to_paise(value or 0))
+
+
+def compute(day):
+    """The figures of business day `day`, as ZReport field values (unsaved)."""
+    totals = dict.fromkeys(BILL_SUMS, Decimal('0.00'))
+    paid_bills = coins_redeemed = 0
+    by_code = defaultdict(lambda: {'bills': 0, 'amount': Decimal('0.00')})
+
+    for bill_model in (Bill, ArchivedBill):
+        groups = bill_model.objects.filter(is_paid=True, paid_business_date=day).values(
+            'applied_discount__code'
+        ).annotate(
+            bills=Count('id'), coins=Sum('coins_redeemed'),
+            **{name: Sum(column) for name, column in BILL_SUMS.items()},
+        ).order_by()
+        for group in groups:
+            paid_bills += group['bills']
+            coins_redeemed += group['coins'] or 0
+            for name in BILL_SUMS:
+                totals[name] += _money(group[name])
+            if group['applied_discount__code'] or group['discounts']:
+                row = by_code[group['applied_discount__code'] or '']
+                row['bills'] += group['bills']
+                row['amount'] += _money(group['discounts'])
+
+    start, end = business_day_range(day)
+    unpaid = Bill.objects.filter(is_paid=False, created_at__gte=start, created_at__lt=end).aggregate(
+        bills=Count('id'), total=Sum('final_amount')
+    )
+
+    by_status = defaultdict(int)
+    dishes = {}
+    cancelled_value = Decimal('0.00')
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        for status, count in order_model.objects.filter(business_date=day).values_list('status').annotate(
+            count=Count('id')
+        ).order_by():
+            by_status[status] += count
+
+        items = item_model.objects.filter(order__business_date=day).values(
+            'dish_id', 'dish__name', 'order__status'
+        ).annotate(
+            units=Sum('quantity'),
+            value=Sum(F('quantity') * F('dish__price'), output_field=DecimalField()),
+        ).order_by()
+        for item in items:
+            if item['order__status'] == 'Cancelled':
+                cancelled_value += _money(item['value'])
+                continue
+            dish = dishes.setdefault(item['dish_id'], {
+                'dish_id': item['dish_id'], 'name': item['dish__name'], 'quantity': 0, 'value': Decimal('0.00'),
+            })
+            dish['quantity'] += item['units']
+            dish['value'] += _money(item['value'])
+
+    return {
+        'business_date': day,
+        'paid_bills': paid_bills,
+        'coins_redeemed': coins_redeemed,
+        **totals,
+        'unpaid_bills': unpaid['bills'],
+        'unpaid_total': _money(unpaid['total']),
+        'orders': sum(by_status.values()),
+        'cancelled_orders': by_status.get('Cancelled', 0),
+        'cancelled_value': cancelled_value,
+        'breakdown': {
+            'discounts_by_code': [
+                {'code': code, 'bills': row['bills'], 'amount': str(row['amount'])}
+                for code, row in sorted(by_code.items())
+            ],
+            'orders_by_status': dict(sorted(by_status.items())),
+            'dishes': [
+                {**dish, 'value': str(dish['value'])}
+                for dish in sorted(dishes.values(), key=lambda dish: (-dish['quantity'], dish['name']))
+            ],
+        },
+    }
+
+
+def is_closed(day):
+    """Whether business day `day` is over, so its report can be stored."""
+    return day < business_date()
+
+
+def generate(day, replace=False):
+    """
+    Computes and stores the Z-report of `day`. Returns the existing snapshot
+    untouched unless `replace` is set, in which case it is swapped for a
+    fresh one.
+    """
+    with transaction.atomic():
+        existing = ZReport.objects.select_for_update().filter(business_date=day).first()
+        if existing is not None and not replace:
+            return existing
+        report = ZReport(**compute(day))
+        if existing is not None:
+            existing.delete()
+        report.save()
+    return report
+
+
+def get_report(day):
+    """
+    The Z-report of `day`: the stored snapshot if there is one; for a day
+    that is over, generated and stored now; for the current day, computed
+    but not stored (the day is still changing).
+    """
+    report = ZReport.objects.filter(business_date=day).first()
+    if report is not None:
+        return report
+    if is_closed(day):
+        try:
+            return generate(day)
+        except IntegrityError:
+            # Another request stored it first.
+            return ZReport.objects.get(business_date=day)
+    return ZReport(**compute(day))
@@ -3,9 +3,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import Staff
 from .serializers import StaffLoginSerializer, StaffSerializer
-from orders.models import Order
+from orders.models import Order, ArchivedOrder
 from orders.serializers import OrderSerializer
+from orders.live_board import board as live_board
 from django.db.models import Count
+from collections import Counter
 
 @api_view(['POST'])
 def staff_login(request):
@@ -33,16 +35,28 @@ def staff_login(request):
 @api_view(['GET'])
 def staff_orders(request, role):
     if role == 'kitchen':
+        board_orders = live_board.select(['Pending', 'Preparing'])
         orders = Order.objects.filter(status__in=['Pending', 'Preparing']).order_by('created_at')
     elif role == 'waitstaff':
+        board_orders = live_board.select(['Ready'], newest_first=True)
         orders = Order.objects.filter(status__in=['Ready']).order_by('-created_at')
     else:
         return Response({'error': 'Invalid role'}, status=400)
+
+    # Served from the in-memory live board; the queries above are the fallback.
+    if board_orders is not None:
+        return Response(board_orders)
     
+    orders = OrderSerializer.setup_eager_loading(orders)
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
 def admin_summary(request):
-    summary = Order.objects.values('status').annotate(count=Count('id'))
+    # Archived orders are all Served or Cancelled; count them in too.
+    counts = Counter()
+    for model in (Order, ArchivedOrder):
+        for row in model.objects.values('status').annotate(count=Count('id')):
+            counts[row['status']] += row['count']
+    summary = [{'status': order_status, 'count': count} for order_status, count in counts.items()]
     return Response(summary)
@@ -0,0 +1,23 @@
+import { useRef, useCallback } from 'react';
+
+// Gives every order attempt an Idempotency-Key. Retrying the same order
+// (same request body) reuses the key, so a request that timed out but
+// actually reached the server is not placed a second time. Call reset()
+// once the order went through.
+export const useIdempotencyKey = () => {
+    const current = useRef({ body: null, key: null });
+
+    const keyFor = useCallback((payload) => {
+        const body = JSON.stringify(payload);
+        if (current.current.body !== body) {
+            current.current = { body, key: crypto.randomUUID() };
+        }
+        return current.current.key;
+    }, []);
+
+    const reset = useCallback(() => {
+        current.current = { body: null, key: null };
+    }, []);
+
+    return { keyFor, reset };
+};
@@ -4,11 +4,13 @@ import { useCart } from '../context/CartContext';
 import styles from './CartPage.module.css'; // Create this CSS file for styling
 import apiClient from '../api/axiosConfig';
 import toast from 'react-hot-toast';
+import { useIdempotencyKey } from '../hooks/useIdempotencyKey';
 
 // The component now expects `customer` and `requestLogin` from App.jsx
 const CartPage = ({customer, requestLogin, onOrderPlaced }) => {
   const { cart, setCart } = useCart(); 
   const navigate = useNavigate();
+  const idempotency = useIdempotencyKey();
 
   // REMOVED: No more local state for the login modal
   // const [isLoginModalOpen, setIsLoginModalOpen] = useState(false);
@@ -47,7 +49,10 @@ const CartPage = ({customer, requestLogin, onOrderPlaced }) => {
       };
 
       try {
-        const response = await apiClient.post('/orders/place/', orderData);
+        const response = await apiClient.post('/orders/place/', orderData, {
+          headers: { 'Idempotency-Key': idempotency.keyFor(orderData) },
+        });
+        idempotency.reset();
         toast.success("✅ Order placed successfully!");
         setCart([]);
         localStorage.removeItem("cart");
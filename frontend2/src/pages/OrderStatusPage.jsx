@@ -81,8 +81,9 @@ const OrderStatusPage = () => {
         return null;
     };
   const customerId = getCustomerId();
+  // The socket only accepts the customer it belongs to, so send the access token along.
   const socketUrl = customerId 
-        ? `ws://127.0.0.1:8000/ws/customer/${customerId}/` 
+        ? `ws://127.0.0.1:8000/ws/customer/${customerId}/?token=${encodeURIComponent(localStorage.getItem('customer_access_token'))}` 
         : null;
   const { lastMessage } = useWebSocket(socketUrl);
   // useEffect hook to fetch data on component mount and set up polling
@@ -97,11 +98,13 @@ const OrderStatusPage = () => {
         // This part runs every time a new message comes from the WebSocket
         if (lastMessage !== null) {
             const data = JSON.parse(lastMessage.data);
-            if (data.type === 'order_update') {
+            // 'order_update' carries a full order, 'order_patch' only the fields that changed,
+            // 'bill_update' a bill of ours (discount, coins, payment).
+            if (data.type === 'order_update' || data.type === 'order_patch' || data.type === 'bill_update') {
                 // Here, you would write logic to find and update the specific
                 // order in your state (inKitchenOrders, pastOrders, etc.)
                 // This removes the need for polling.
-                console.log('Received real-time update:', data.order);
+                console.log('Received real-time update:', data.order || data.changes);
                 fetchCustomerData(); // Or update state manually for better performance
             }
         }